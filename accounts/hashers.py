@@ -0,0 +1,17 @@
+"""Hasher mật khẩu theo chính sách trong settings.
+
+``PBKDF2PasswordHasher`` giữ nguyên thuật toán ``pbkdf2_sha256`` của Django
+(hash cũ vẫn kiểm tra được) nhưng số vòng lấy từ ``PBKDF2_ITERATIONS``. Khi
+số vòng trong hash khác chính sách, ``must_update`` trả True và
+``User.check_password`` tự băm lại + lưu ngay lần đăng nhập đúng kế tiếp.
+Đổi hẳn thuật toán (``PASSWORD_HASHER=scrypt``/``argon2``) cũng được băm lại
+như vậy, vì Django luôn dùng hasher đầu tiên trong ``PASSWORD_HASHERS``.
+"""
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, "PBKDF2_ITERATIONS", hashers.PBKDF2PasswordHasher.iterations)
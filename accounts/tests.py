@@ -0,0 +1,52 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+@override_settings(LOGIN_RATE_LIMIT_USERNAME=3, LOGIN_RATE_LIMIT_IP=5, PBKDF2_ITERATIONS=1000)
+class AuthThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("alice", password="right-password")
+
+    def login(self, username="alice", password="wrong", **extra):
+        return self.client.post(reverse("login"), {"username": username, "password": password}, **extra)
+
+    def test_username_is_blocked_before_hashing(self):
+        for _ in range(3):
+            self.assertEqual(self.login().status_code, 302)
+        with mock.patch("accounts.views.authenticate") as authenticate:
+            response = self.login(password="right-password")
+        self.assertEqual(response.status_code, 429)
+        authenticate.assert_not_called()
+        # IP khác vẫn bị chặn theo username
+        self.assertEqual(self.login(REMOTE_ADDR="10.0.0.9").status_code, 429)
+
+    def test_ip_limit_across_usernames_and_success_resets(self):
+        for _ in range(2):
+            self.login()
+        self.assertRedirects(self.login(password="right-password"), reverse("product_list"), fetch_redirect_response=False)
+        self.client.logout()
+        for i in range(3):
+            self.login(username=f"ghost{i}")
+        self.assertEqual(self.login(password="right-password").status_code, 429)
+
+    def test_signup_relies_on_unique_constraint(self):
+        data = {"username": "alice", "email": "", "password": "x", "confirm": "x"}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse("signup"), data)
+        self.assertRedirects(response, reverse("signup"), fetch_redirect_response=False)
+        self.assertFalse([q for q in queries if q["sql"].startswith("SELECT") and "auth_user" in q["sql"]])
+        self.assertEqual(User.objects.filter(username="alice").count(), 1)
+
+    def test_login_rehashes_to_current_policy(self):
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+        with override_settings(PBKDF2_ITERATIONS=1200):
+            self.login(password="right-password")
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1200$"))
@@ -0,0 +1,56 @@
+"""Chặn dò mật khẩu ở trang đăng nhập / đăng ký (dùng products/ratelimit.py).
+
+Đếm số lần đăng nhập *sai* theo IP và theo username trong
+``LOGIN_RATE_WINDOW`` giây. Khi vượt ``LOGIN_RATE_LIMIT_IP`` /
+``LOGIN_RATE_LIMIT_USERNAME``, request bị từ chối (429) *trước*
+``authenticate()`` -> không tốn một lần băm PBKDF2 nào, kể cả với username
+không tồn tại (Django vẫn băm "giả" để chống dò username qua thời gian).
+Đăng nhập đúng xóa bộ đếm của username đó.
+
+Đăng ký: mỗi IP tối đa ``SIGNUP_RATE_LIMIT`` lần / ``SIGNUP_RATE_WINDOW`` giây.
+
+Bộ đếm dùng chung cho mọi worker: trong cache khi ``CACHE_URL`` là
+Redis/Memcached, ngược lại trong DB (``RATELIMIT_BACKEND``), nên số lần thử
+không bị nhân lên theo số process gunicorn.
+"""
+import hashlib
+
+from django.conf import settings
+
+from products import ratelimit
+
+
+def client_ip(request):
+    if settings.LOGIN_TRUST_X_FORWARDED_FOR:
+        # Sau proxy tin cậy: IP đầu tiên là của client
+        forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _username_key(username):
+    # Username tùy ý (khoảng trắng, unicode, rất dài) -> khóa cache gọn
+    return hashlib.sha256((username or "").strip().lower().encode()).hexdigest()[:32]
+
+
+def login_blocked(request, username):
+    window = settings.LOGIN_RATE_WINDOW
+    return (
+        ratelimit.count("login-ip", client_ip(request), window) >= settings.LOGIN_RATE_LIMIT_IP
+        or ratelimit.count("login-user", _username_key(username), window) >= settings.LOGIN_RATE_LIMIT_USERNAME
+    )
+
+
+def login_failed(request, username):
+    window = settings.LOGIN_RATE_WINDOW
+    ratelimit.hit("login-ip", client_ip(request), window)
+    ratelimit.hit("login-user", _username_key(username), window)
+
+
+def login_succeeded(request, username):
+    ratelimit.reset("login-user", _username_key(username), settings.LOGIN_RATE_WINDOW)
+
+
+def signup_allowed(request):
+    return ratelimit.allow("signup-ip", client_ip(request), settings.SIGNUP_RATE_LIMIT, settings.SIGNUP_RATE_WINDOW)
@@ -1,7 +1,11 @@
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
+from django.db import IntegrityError, transaction
 from django.shortcuts import render, redirect
 from django.contrib import messages
+from products import cart as cart_service
+from products.tasks import send_welcome_email
+from . import throttling
 
 def signup_view(request):
     if request.method == 'POST':
@@ -14,11 +18,20 @@ def signup_view(request):
             messages.error(request, "Passwords do not match.")
             return redirect('signup')
 
-        if User.objects.filter(username=username).exists():
+        if not throttling.signup_allowed(request):
+            messages.error(request, "Too many signups from your network. Please try again later.")
+            return render(request, 'accounts/signup.html', status=429)
+
+        # Không kiểm tra exists() trước: ràng buộc unique của username quyết định
+        # (không có khe hở giữa kiểm tra và INSERT khi hai người đăng ký cùng lúc)
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username=username, email=email, password=password)
+        except IntegrityError:
             messages.error(request, "Username already exists.")
             return redirect('signup')
-
-        user = User.objects.create_user(username=username, email=email, password=password)
+        if email:
+            send_welcome_email.enqueue(user.pk, key=f"welcome:{user.pk}")
         messages.success(request, "Signup successful! You can now login.")
         return redirect('login')
 
@@ -28,12 +41,21 @@ def login_view(request):
     if request.method == 'POST':
         username = request.POST.get('username')
         password = request.POST.get('password')
+        # Chặn trước authenticate(): request bị từ chối không tốn lần băm nào
+        if throttling.login_blocked(request, username):
+            messages.error(request, "Too many failed login attempts. Please try again later.")
+            return render(request, 'accounts/login.html', status=429)
+
         user = authenticate(request, username=username, password=password)
         if user is not None:
+            throttling.login_succeeded(request, username)
             login(request, user)
+            # Gộp giỏ hàng lúc chưa đăng nhập (lưu trong session) vào giỏ của user
+            cart_service.merge_guest_cart(user, request.session)
             return redirect('product_list')
             
         else:
+            throttling.login_failed(request, username)
             messages.error(request, "Invalid username or password.")
             return redirect('login')
 
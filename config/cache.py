@@ -0,0 +1,52 @@
+"""Cấu hình CACHES từ biến môi trường (dùng trong config/settings.py).
+
+``CACHE_URL`` chọn backend cho cache ``default``:
+
+* không đặt / ``locmem://``: LocMemCache, riêng từng process -> chỉ hợp với
+  ``runserver`` hoặc một process gunicorn.
+* ``redis://host:6379/0`` (``rediss://`` khi có TLS; nhiều URL cách nhau
+  bởi dấu phẩy = primary + replica): RedisCache của Django, cần gói ``redis``.
+* ``memcached://host1:11211,host2:11211``: PyMemcacheCache, cần ``pymemcache``.
+* ``dummy://``: không cache gì (đo hiệu năng khi không có cache).
+
+``CACHE_KEY_PREFIX`` tách khóa khi nhiều site dùng chung một Redis.
+"""
+import os
+from urllib.parse import urlsplit
+
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_config(url):
+    scheme = urlsplit(url).scheme if url else 'locmem'
+    if scheme == 'locmem':
+        config = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'sazo-default'}
+    elif scheme in ('redis', 'rediss'):
+        config = {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': [u.strip() for u in url.split(',') if u.strip()],
+        }
+    elif scheme == 'memcached':
+        hosts = url.split('://', 1)[1]
+        config = {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': [h.strip() for h in hosts.split(',') if h.strip()],
+        }
+    elif scheme == 'dummy':
+        config = {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}
+    else:
+        raise ValueError(f"CACHE_URL không hỗ trợ scheme '{scheme}'")
+    config['KEY_PREFIX'] = os.environ.get('CACHE_KEY_PREFIX', '')
+    return config
+
+
+def caches():
+    return {'default': cache_config(os.environ.get('CACHE_URL', '').strip())}
+
+
+def is_shared(config):
+    """Cache có dùng chung giữa các process (Redis/Memcached) hay không."""
+    return config['BACKEND'] not in LOCAL_BACKENDS
@@ -0,0 +1,52 @@
+"""Cấu hình DATABASES từ biến môi trường (dùng trong config/settings.py).
+
+* ``DATABASE_URL``: DB chính (ghi), mặc định SQLite ``db.sqlite3``.
+* ``DATABASE_REPLICA_URLS``: danh sách URL replica, cách nhau bởi dấu phẩy
+  -> alias ``replica1``, ``replica2``... (chỉ đọc, xem products/routers.py).
+* ``DB_CONN_MAX_AGE``: giữ kết nối giữa các request (giây, 0 = đóng mỗi request).
+* ``DB_POOL=1``: pool kết nối của Django (PostgreSQL + psycopg 3); khi bật
+  pool thì ``CONN_MAX_AGE`` phải là 0.
+"""
+import os
+
+import dj_database_url
+
+
+def _sqlite_options(config):
+    # IMMEDIATE: transaction lấy khóa ghi ngay từ đầu, tránh lỗi
+    # "database is locked" khi nhiều request cùng sửa giỏ hàng.
+    config.setdefault('OPTIONS', {}).update({'transaction_mode': 'IMMEDIATE', 'timeout': 20})
+
+
+def database_config(url, replica=False, test_name=None):
+    conn_max_age = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+    pool = os.environ.get('DB_POOL') == '1'
+    config = dj_database_url.parse(url, conn_max_age=0 if pool else conn_max_age, conn_health_checks=True)
+
+    if config['ENGINE'] == 'django.db.backends.sqlite3':
+        _sqlite_options(config)
+    elif config['ENGINE'] == 'django.db.backends.postgresql' and pool:
+        config.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+        }
+
+    if replica:
+        # Khi chạy test, replica dùng chung DB test của default
+        config['TEST'] = {'MIRROR': 'default'}
+    elif test_name:
+        config['TEST'] = {'NAME': test_name}
+    return config
+
+
+def databases(base_dir):
+    primary = os.environ.get('DATABASE_URL') or f"sqlite:///{base_dir / 'db.sqlite3'}"
+    result = {
+        # DB test dạng file (không dùng in-memory shared cache) để test
+        # đồng thời nhiều thread hoạt động giống môi trường thật.
+        'default': database_config(primary, test_name=base_dir / 'test_db.sqlite3'),
+    }
+    urls = [u.strip() for u in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if u.strip()]
+    for i, url in enumerate(urls, 1):
+        result[f'replica{i}'] = database_config(url, replica=True)
+    return result
@@ -0,0 +1,130 @@
+"""Phục vụ file media (ảnh upload, ảnh thu nhỏ) ở môi trường production.
+
+* ``If-Modified-Since`` / ``If-Range`` so với mtime của file -> 304 / bỏ Range.
+* Ảnh phái sinh (tên có hash) -> ``immutable``; file khác -> ``MEDIA_CACHE_SECONDS``.
+* ``Range: bytes=...`` (một khoảng) -> 206 + ``Content-Range``; khoảng sai -> 416.
+* Nội dung trả bằng ``FileResponse`` trên file đã mở: dưới gunicorn,
+  ``wsgi.file_wrapper`` dùng ``sendfile()`` từ vị trí đã ``seek`` và đúng
+  ``Content-Length``, nên byte không đi qua Python.
+* ``MEDIA_ACCEL_REDIRECT=/protected-media/``: chỉ trả header
+  ``X-Accel-Redirect`` cho nginx (location ``internal``) tự gửi file và tự
+  xử lý Range.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.static import was_modified_since
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+# Tên file là hash nội dung (products/images.py) -> không bao giờ đổi
+IMMUTABLE_DIRS = ("derivatives/",)
+
+
+class FileRange:
+    """File đã ``seek`` tới đầu khoảng, ``read()`` dừng ở cuối khoảng.
+
+    Giữ ``fileno()`` để ``wsgi.file_wrapper`` vẫn dùng được ``sendfile()``;
+    không có ``tell``/``seek`` nên ``FileResponse`` không tự tính lại
+    ``Content-Length``.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.name = file.name
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size is None or size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """``"bytes=0-99"`` -> ``(0, 99)``; None = gửi cả file; ``ValueError`` = 416."""
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match:
+        # Không có Range, nhiều khoảng hoặc đơn vị lạ: gửi cả file (RFC 9110 cho phép)
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # bytes=-500: 500 byte cuối
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _if_range_matches(request, mtime):
+    value = request.META.get("HTTP_IF_RANGE")
+    if not value:
+        return True
+    # Chỉ hỗ trợ dạng ngày (không phát ETag cho media)
+    since = parse_http_date_safe(value)
+    return since is not None and int(mtime) <= since
+
+
+def serve_media(request, path):
+    path = posixpath.normpath(path).lstrip("/")
+    # Đường dẫn ra ngoài MEDIA_ROOT -> SuspiciousFileOperation (400)
+    fullpath = safe_join(settings.MEDIA_ROOT, path)
+    try:
+        stat = os.stat(fullpath)
+    except (FileNotFoundError, NotADirectoryError):
+        raise Http404("Không tìm thấy file")
+    if not os.path.isfile(fullpath):
+        raise Http404("Không tìm thấy file")
+
+    if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"), stat.st_mtime):
+        return HttpResponseNotModified()
+
+    accel = getattr(settings, "MEDIA_ACCEL_REDIRECT", "")
+    if accel:
+        response = HttpResponse(content_type=mimetypes.guess_type(fullpath)[0] or "application/octet-stream")
+        response["X-Accel-Redirect"] = accel.rstrip("/") + "/" + path
+    else:
+        size = stat.st_size
+        try:
+            byte_range = parse_range(request.META.get("HTTP_RANGE"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        if byte_range and not _if_range_matches(request, stat.st_mtime):
+            byte_range = None
+
+        file = open(fullpath, "rb")
+        if byte_range:
+            start, end = byte_range
+            response = FileResponse(FileRange(file, start, end - start + 1), status=206)
+            response["Content-Length"] = end - start + 1
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        else:
+            response = FileResponse(file)
+        response["Accept-Ranges"] = "bytes"
+
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    if path.startswith(IMMUTABLE_DIRS):
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response["Cache-Control"] = f"public, max-age={settings.MEDIA_CACHE_SECONDS}"
+    return response
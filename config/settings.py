@@ -1,11 +1,15 @@
 from pathlib import Path
 import os
+import warnings
+
+from .cache import caches, is_shared
+from .database import databases
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-temp-key'
-DEBUG = True
-ALLOWED_HOSTS = []
+DEBUG = os.environ.get('DEBUG', '1') == '1'
+ALLOWED_HOSTS = [host for host in os.environ.get('ALLOWED_HOSTS', '').split(',') if host]
 
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -13,17 +17,24 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # runserver cũng phục vụ static qua WhiteNoise -> giống production
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     'users',
     'accounts',
     'products',
     'django.contrib.humanize',
+    'rest_framework',
 
    
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Trả static trước mọi middleware khác (không session, không đếm truy vấn)
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'products.middleware.QueryBudgetMiddleware',
+    'products.middleware.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -49,18 +60,78 @@ TEMPLATES = [
         },
     },
 ]
+if not DEBUG:
+    # Production: cached loader ghi rõ (mỗi template chỉ đọc + parse một lần
+    # mỗi process). Khi DEBUG, Django tự bọc cached loader có autoreload.
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+
+# Bình luận (products/comments.py): bật duyệt trước khi hiển thị, và giới hạn
+# mỗi user tối đa COMMENT_RATE_LIMIT bình luận / COMMENT_RATE_WINDOW giây
+COMMENT_MODERATION = os.environ.get('COMMENT_MODERATION', '0') == '1'
+COMMENT_RATE_LIMIT = 5
+COMMENT_RATE_WINDOW = 60
+
+# Admin: bảng có nhiều hơn ngần này dòng thì changelist dùng số đếm ước lượng
+ADMIN_EXACT_COUNT_LIMIT = 10_000
+
+# API JSON chỉ đọc (products/api.py): không cần session/CSRF, chỉ trả JSON
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.AllowAny'],
+    'UNAUTHENTICATED_USER': None,
 }
 
+# DB chính + replica đọc lấy từ biến môi trường (xem config/database.py):
+#   DATABASE_URL=postgres://...  DATABASE_REPLICA_URLS=postgres://replica1,...
+# Thử ở máy cá nhân với hai file SQLite:
+#   DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3 python manage.py sync_replica
+DATABASES = databases(BASE_DIR)
+DATABASE_ROUTERS = ['products.routers.PrimaryReplicaRouter']
+
+# Sau khi ghi, trình duyệt đó đọc từ DB chính trong bấy nhiêu giây
+# (đủ lâu hơn độ trễ replication)
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+REPLICA_PIN_COOKIE = 'dbpin'
+
 AUTH_PASSWORD_VALIDATORS = []
 
+# Băm mật khẩu (accounts/hashers.py): hasher đầu tiên dùng cho mật khẩu mới;
+# hash cũ theo hasher / số vòng khác được băm lại khi user đăng nhập đúng.
+# 'pbkdf2' (mặc định) | 'scrypt' | 'argon2' (cần gói argon2-cffi)
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 1_000_000))
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'accounts.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'argon2': 'django.contrib.auth.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASHER]] + [
+    hasher for name, hasher in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER
+] + [
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Chống dò mật khẩu (accounts/throttling.py): số lần đăng nhập sai tối đa
+# trong LOGIN_RATE_WINDOW giây, theo IP và theo username
+LOGIN_RATE_LIMIT_IP = int(os.environ.get('LOGIN_RATE_LIMIT_IP', 30))
+LOGIN_RATE_LIMIT_USERNAME = int(os.environ.get('LOGIN_RATE_LIMIT_USERNAME', 5))
+LOGIN_RATE_WINDOW = 900
+# Chỉ bật khi chạy sau proxy (nginx) tự ghi đè X-Forwarded-For
+LOGIN_TRUST_X_FORWARDED_FOR = os.environ.get('LOGIN_TRUST_X_FORWARDED_FOR', '0') == '1'
+SIGNUP_RATE_LIMIT = 10
+SIGNUP_RATE_WINDOW = 3600
+
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'UTC'
 USE_I18N = True
@@ -69,8 +140,104 @@ USE_TZ = True
 STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Static: `manage.py collectstatic` gom vào STATIC_ROOT. Khi DEBUG=0, tên file
+# có hash nội dung (manifest) + bản nén .gz/.br (br cần gói Brotli); WhiteNoise
+# trả file có hash với `Cache-Control: max-age=315360000, immutable`, file
+# không hash (favicon...) với WHITENOISE_MAX_AGE giây.
+STATIC_ROOT = os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles')
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage' if DEBUG
+        else 'whitenoise.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+WHITENOISE_MAX_AGE = 0 if DEBUG else int(os.environ.get('WHITENOISE_MAX_AGE', 3600))
+if DEBUG:
+    # Khi dev, WhiteNoise đọc thẳng từ các app (finders), chưa cần collectstatic
+    warnings.filterwarnings('ignore', message='No directory at')
+
+# Media: phục vụ bởi config/media.py (Range, If-Modified-Since, sendfile).
+# SERVE_MEDIA=0 khi nginx/CDN phục vụ thẳng MEDIA_ROOT; MEDIA_ACCEL_REDIRECT
+# (vd. '/protected-media/') để Django chỉ trả header X-Accel-Redirect.
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+SERVE_MEDIA = os.environ.get('SERVE_MEDIA', '1') == '1'
+MEDIA_ACCEL_REDIRECT = os.environ.get('MEDIA_ACCEL_REDIRECT', '')
+MEDIA_CACHE_SECONDS = int(os.environ.get('MEDIA_CACHE_SECONDS', 86400))
+
+# Cache lấy từ CACHE_URL (xem config/cache.py): không đặt thì LocMem, riêng
+# từng process. Production nhiều worker: CACHE_URL=redis://... hoặc memcached://...
+CACHES = caches()
+CACHE_SHARED = is_shared(CACHES['default'])
+
+# Session: có cache dùng chung (CACHE_URL) thì mặc định cached_db (đọc từ
+# cache, chỉ ghi DB khi session đổi); với LocMem thì mặc định db, vì mỗi
+# process giữ bản cache riêng và có thể đọc session cũ sau khi process khác
+# đã sửa. Có thể chọn 'django.contrib.sessions.backends.cache' (không chạm
+# DB, cần cache dùng chung) hoặc
+# 'django.contrib.sessions.backends.signed_cookies' (không lưu phía server).
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if CACHE_SHARED else 'django.contrib.sessions.backends.db',
+)
+SESSION_CACHE_ALIAS = 'default'
+
+# Bộ đếm giới hạn tần suất (products/ratelimit.py): 'cache' khi cache dùng
+# chung giữa các process, ngược lại 'db' (bảng RateLimitCounter)
+RATELIMIT_BACKEND = os.environ.get('RATELIMIT_BACKEND', 'cache' if CACHE_SHARED else 'db')
+
+# Thời gian (giây) giữ trang / fragment catalog; vô hiệu hóa sớm qua signal (products/cache.py)
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 300))
+
+# Tìm kiếm sản phẩm: 'auto' | 'sqlite' | 'postgres' | 'python' (xem products/search.py)
+PRODUCT_SEARCH_BACKEND = os.environ.get('PRODUCT_SEARCH_BACKEND', 'auto')
+
+# Thời gian (giây) giữ hàng cho khách ở trang thanh toán (products/checkout.py)
+STOCK_RESERVATION_TTL = int(os.environ.get('STOCK_RESERVATION_TTL', 600))
+
+# Phân trang danh sách sản phẩm / blog: 'offset' (Paginator) hoặc 'cursor' (keyset)
+CATALOG_PAGINATION = os.environ.get('CATALOG_PAGINATION', 'offset')
+
+# Số sản phẩm gợi ý tính trước cho mỗi sản phẩm (products/recommendations.py)
+RECOMMENDATIONS_PER_PRODUCT = 8
+
+# Hàng đợi việc nền (products/tasks.py, manage.py runworker).
+# TASKS_ALWAYS_EAGER=1: chạy task ngay sau commit trong process web, không
+# cần worker. Mặc định bật khi không có cache dùng chung: worker là process
+# riêng, mọi thứ nó ghi vào LocMem (bump_generation, cache sản phẩm) web
+# không thấy, nên runworker đòi CACHE_URL.
+TASKS_ALWAYS_EAGER = os.environ.get('TASKS_ALWAYS_EAGER', '0' if CACHE_SHARED else '1') == '1'
+TASK_RETRY_BACKOFF = 10
+TASK_RETRY_BACKOFF_MAX = 3600
+TASK_LOCK_TIMEOUT = 600
+
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL', 'no-reply@localhost')
+
+# Dùng view async (products/async_views.py) cho catalog / giỏ hàng khi chạy ASGI
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
+
+# Ngân sách số truy vấn SQL cho mỗi view (xem products/middleware.py)
+QUERY_PROFILING = os.environ.get('QUERY_PROFILING', '1') == '1'
+QUERY_BUDGET_DEFAULT = 20
+QUERY_BUDGETS = {
+    'product_list': 6,
+    'product_detail': 8,
+    'cart': 6,
+    'update_item': 10,
+    'add_to_cart': 10,
+    'my_profile': 10,
+    # đơn đầu tiên của khách: thêm 2 truy vấn tạo dòng CustomerSales;
+    # +1 đọc session khi SESSION_ENGINE là db (không có cache dùng chung)
+    'checkout': 29,
+    # đăng nhập + gộp giỏ hàng khách vào Order (cart.merge_guest_cart)
+    'login': 24,
+    'blog_list': 4,
+    'blog_detail': 4,
+}
+QUERY_BUDGET_STRICT = False
+QUERY_PROFILE_LOG = os.environ.get('QUERY_PROFILE_LOG') or None
 
 LOGIN_URL = '/auth/login/'
 LOGIN_REDIRECT_URL = '/users/'
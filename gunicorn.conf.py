@@ -0,0 +1,37 @@
+# gunicorn.conf.py — `gunicorn config.wsgi` tự đọc file này ở thư mục hiện tại.
+#
+# Mặc định: worker gthread, (2 x CPU + 1) process x 4 thread. Request của
+# shop phần lớn chờ DB / cache nên thread rẻ hơn thêm process; mỗi thread
+# giữ một kết nối DB (DB_CONN_MAX_AGE), nên tổng kết nối = workers x threads.
+# Chạy ASGI (ASYNC_VIEWS=1):
+#   GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn config.asgi
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread" if threads > 1 else "sync")
+
+# Nạp Django một lần ở master rồi fork (tiết kiệm RAM, worker khởi động nhanh).
+# Kết nối DB chỉ mở khi có request nên không bị chia sẻ giữa các worker.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"
+
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+graceful_timeout = 30
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+# Khởi động lại worker định kỳ để chặn rò rỉ bộ nhớ; jitter tránh restart cùng lúc
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = 100
+
+# Heartbeat của worker ghi vào RAM thay vì đĩa (tránh treo khi đĩa chậm)
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+# FileResponse (static qua WhiteNoise, media qua config/media.py) -> sendfile()
+sendfile = True
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
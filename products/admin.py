@@ -1,41 +1,222 @@
-from django.contrib import admin
-from .models import Product, Order, OrderItem, ShippingAddress, Comment, Feedback
+import io
 
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.shortcuts import redirect, render
+from django.urls import path
+from django.utils import timezone
+from django.utils.functional import cached_property
 
+from . import comments, search
+from .importexport import FORMATS, export_response, import_products
+from .models import Product, Order, OrderItem, ShippingAddress, Comment, Feedback, Task
+
+
+# ====================== CHANGELIST CHO BẢNG LỚN ======================
+def estimated_row_count(model, using):
+    """Số dòng ước lượng từ thống kê của DB (không quét bảng); None nếu không có."""
+    connection = connections[using]
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        elif connection.vendor == "sqlite":
+            # rowid lớn nhất: tra B-tree, không đếm; lệch khi đã xóa nhiều dòng
+            cursor.execute(f"SELECT MAX(_rowid_) FROM {table}")
+        else:
+            return None
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """``COUNT(*)`` chính xác chỉ tới ``ADMIN_EXACT_COUNT_LIMIT`` dòng.
+
+    * Không lọc: lấy số ước lượng của DB (``pg_class.reltuples`` / rowid).
+    * Có lọc / tìm kiếm: ``COUNT`` trên ``LIMIT n + 1`` nên dừng sớm; kết
+      quả vượt ngưỡng thì chỉ phân trang trong ``n + 1`` dòng đầu.
+    """
+
+    @cached_property
+    def count(self):
+        limit = getattr(settings, "ADMIN_EXACT_COUNT_LIMIT", 10_000)
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_row_count(queryset.model, queryset.db)
+            if estimate is not None and estimate > limit:
+                return estimate
+        return queryset.order_by()[:limit + 1].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    # Không chạy thêm COUNT(*) toàn bảng cho dòng "x of y selected"
+    show_full_result_count = False
+
+
+class IndexedSearchMixin:
+    """Ô tìm kiếm dùng chỉ mục toàn văn sản phẩm (products/search.py) thay cho
+    ``LIKE '%...%'`` trên cột text.
+
+    * ``product_lookup``: đường dẫn tới Product (``"pk"`` cho chính Product,
+      None = không tìm theo sản phẩm).
+    * Từ khóa là số -> khớp các ``id_lookups``.
+    * ``search_fields`` chỉ nên là so khớp chính xác (``field__exact``) để
+      dùng được chỉ mục B-tree (``=``/``^`` không phân biệt hoa thường nên
+      vẫn quét bảng).
+    """
+    product_lookup = "product"
+    id_lookups = ("pk",)
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        condition = Q(pk__in=[])
+        if self.product_lookup:
+            condition |= Q(**{f"{self.product_lookup}__in": search.search_ids(term)})
+        if term.isdigit():
+            for lookup in self.id_lookups:
+                condition |= Q(**{lookup: int(term)})
+        matched, may_have_duplicates = super().get_search_results(request, queryset, term)
+        return matched | queryset.filter(condition), may_have_duplicates
+
+
+# ====================== BÌNH LUẬN ======================
 @admin.register(Comment)
-class CommentAdmin(admin.ModelAdmin):
-    list_display = ('id', 'product', 'user', 'content', 'created_at')
-    search_fields = ('product__name', 'user__username', 'content')
-    list_filter = ('created_at',)
+class CommentAdmin(IndexedSearchMixin, LargeTableAdmin):
+    """Hàng chờ duyệt: lọc "Is active: No" rồi chọn và duyệt / ẩn hàng loạt.
 
+    Tìm kiếm: tên / mô tả sản phẩm (chỉ mục), username chính xác hoặc id.
+    """
+    list_display = ('id', 'product', 'user', 'content', 'is_active', 'created_at')
+    list_select_related = ('product', 'user')
+    search_fields = ('user__username__exact',)
+    autocomplete_fields = ('product', 'user')
+    list_filter = ('is_active', 'created_at')
+    actions = ('approve_comments', 'hide_comments')
+
+    @admin.action(description="Duyệt (hiển thị) bình luận đã chọn")
+    def approve_comments(self, request, queryset):
+        updated = comments.set_active(queryset, True)
+        self.message_user(request, f"Đã duyệt {updated} bình luận.", messages.SUCCESS)
+
+    @admin.action(description="Ẩn bình luận đã chọn")
+    def hide_comments(self, request, queryset):
+        updated = comments.set_active(queryset, False)
+        self.message_user(request, f"Đã ẩn {updated} bình luận.", messages.SUCCESS)
+
+# ====================== SẢN PHẨM ======================
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'brand', 'formatted_price', 'stock', 'created_at')
-    search_fields = ('name', 'brand')
+class ProductAdmin(IndexedSearchMixin, LargeTableAdmin):
+    list_display = ('id', 'sku', 'name', 'brand', 'formatted_price', 'stock', 'created_at')
+    # Tên / mô tả tìm qua chỉ mục; cũng là nguồn cho autocomplete ở các admin khác
+    search_fields = ('sku__exact',)
+    product_lookup = 'pk'
     list_filter = ('brand',)
     ordering = ('-created_at',)
+    actions = ('export_csv', 'export_jsonl')
+    change_list_template = 'admin/products/product/change_list.html'
+
+    @admin.action(description="Xuất sản phẩm đã chọn (CSV)")
+    def export_csv(self, request, queryset):
+        return export_response(queryset, 'csv')
+
+    @admin.action(description="Xuất sản phẩm đã chọn (JSONL)")
+    def export_jsonl(self, request, queryset):
+        return export_response(queryset, 'jsonl')
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='products_product_import'),
+        ]
+        return urls + super().get_urls()
+
+    def import_view(self, request):
+        """Upload file CSV/JSONL rồi upsert theo SKU (xem products/importexport.py)."""
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect('admin:products_product_changelist')
+
+        if request.method == 'POST' and request.FILES.get('file'):
+            upload = request.FILES['file']
+            fmt = request.POST.get('format') or ('jsonl' if upload.name.endswith('.jsonl') else 'csv')
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            result = import_products(stream, fmt)
 
+            level = messages.WARNING if result.failed else messages.SUCCESS
+            self.message_user(
+                request,
+                f"{result.created} thêm mới, {result.updated} cập nhật, {result.failed} lỗi.",
+                level,
+            )
+            for line, errors in result.errors[:20]:
+                self.message_user(request, f"Dòng {line}: {' | '.join(errors)}", messages.ERROR)
+            return redirect('admin:products_product_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'formats': FORMATS,
+            'title': "Nhập sản phẩm",
+        }
+        return render(request, 'admin/products/product/import.html', context)
+
+# ====================== ĐƠN HÀNG ======================
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ('id', 'user', 'complete', 'date_ordered', 'transaction_id')
+class OrderAdmin(IndexedSearchMixin, LargeTableAdmin):
+    # total_price / total_items là cột đã tính sẵn, không tổng hợp theo từng dòng
+    list_display = ('id', 'user', 'complete', 'total_items', 'total_price', 'date_ordered', 'completed_at', 'transaction_id')
+    list_select_related = ('user',)
     list_filter = ('complete',)
-    search_fields = ('user__username',)
+    search_fields = ('user__username__exact', 'transaction_id__exact')
+    product_lookup = None
+    autocomplete_fields = ('user',)
     ordering = ('-date_ordered',)
 
+
 @admin.register(OrderItem)
-class OrderItemAdmin(admin.ModelAdmin):
+class OrderItemAdmin(IndexedSearchMixin, LargeTableAdmin):
     list_display = ('id', 'order', 'product', 'quantity', 'get_total')
-    search_fields = ('product__name',)
+    # Order.__str__ dùng user, get_total dùng product.price
+    list_select_related = ('order__user', 'product')
+    search_fields = ('order__transaction_id__exact',)
+    id_lookups = ('order_id',)
+    autocomplete_fields = ('order', 'product')
     list_filter = ('order__complete',)
 
+
 @admin.register(ShippingAddress)
-class ShippingAddressAdmin(admin.ModelAdmin):
+class ShippingAddressAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'address', 'city', 'state', 'zipcode', 'date_added')
-    search_fields = ('user__username', 'address', 'city')
+    list_select_related = ('user',)
+    search_fields = ('user__username__exact',)
+    autocomplete_fields = ('user', 'order')
 
 
 @admin.register(Feedback)
-class FeedbackAdmin(admin.ModelAdmin):
+class FeedbackAdmin(LargeTableAdmin):
     list_display = ('id', 'user', 'subject', 'created_at')
-    search_fields = ('user__username', 'subject', 'message')
+    list_select_related = ('user',)
+    search_fields = ('user__username__exact',)
+    autocomplete_fields = ('user',)
     list_filter = ('created_at',)
+
+
+# ====================== HÀNG ĐỢI TASK ======================
+@admin.register(Task)
+class TaskAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('idempotency_key__exact',)
+    readonly_fields = ('attempts', 'locked_by', 'locked_at', 'last_error', 'created_at', 'finished_at')
+    actions = ['retry']
+
+    @admin.action(description="Chạy lại các task đã chọn")
+    def retry(self, request, queryset):
+        updated = queryset.exclude(status=Task.RUNNING).update(
+            status=Task.PENDING, run_at=timezone.now(), attempts=0, finished_at=None
+        )
+        self.message_user(request, f"Đã xếp lại {updated} task.", messages.SUCCESS)
@@ -0,0 +1,243 @@
+# products/analytics.py
+"""Bảng doanh số tổng hợp (rollup) cho lịch sử đơn hàng và dashboard.
+
+* ``DailySales`` / ``DailyBrandSales`` / ``DailyProductSales``: số đơn
+  (đếm riêng biệt), số lượng, doanh thu theo ngày thanh toán (giờ địa phương).
+* ``CustomerSales``: tổng của từng user, đọc ở trang lịch sử / hồ sơ;
+  ``complete_checkout`` tính lại dòng của khách ngay khi thanh toán.
+
+Hai đường cập nhật:
+
+1. Tăng dần: ``record_order`` (task ``analytics.record_order`` sau mỗi lần
+   thanh toán) cộng đơn đó vào các bảng bằng ``UPDATE ... SET x = x + n``.
+2. Dựng lại: ``build(start, end)`` (``manage.py build_sales_rollups``, chạy
+   hằng đêm) tính lại trọn các ngày trong khoảng. Gom nhóm bằng NumPy
+   (``np.unique`` theo khóa + ``np.bincount`` có trọng số) nếu có, ngược lại
+   dùng dict.
+
+``Order.sales_recorded`` đảm bảo mỗi đơn chỉ được cộng một lần dù hai đường
+chạy đan xen. Doanh thu tính theo ``OrderItem.unit_price`` (đơn giá chốt lúc
+thanh toán), nên dựng lại bao nhiêu lần cũng ra cùng số liệu.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .cache import bump_generation
+from .models import (
+    CustomerSales, DailyBrandSales, DailyProductSales, DailySales, Order, OrderItem,
+)
+
+try:
+    import numpy as np
+except ImportError:  # NumPy là tùy chọn
+    np = None
+
+# Cấp tổng hợp -> (model, cột gom nhóm, cột khóa duy nhất trong bảng)
+LEVELS = {
+    "day": (DailySales, ("date",), ("date",)),
+    "brand": (DailyBrandSales, ("date", "brand"), ("date", "brand")),
+    # brand đi theo product_id, gom cùng để ghi vào bảng
+    "product": (DailyProductSales, ("date", "product_id", "brand"), ("date", "product_id")),
+}
+
+
+def _rows(orders):
+    """Một dòng mỗi OrderItem: (order_id, ngày, product_id, brand, quantity, price)."""
+    rows = OrderItem.objects.filter(order__in=orders).values_list(
+        "order_id", "order__completed_at", "product_id", "product__brand", "quantity",
+        # Đơn thanh toán trước khi có unit_price (migration 0019 đã điền) -> giá hiện tại
+        Coalesce("unit_price", "product__price"),
+    )
+    return [
+        (order_id, timezone.localdate(completed_at), pid, brand, qty, int(price))
+        for order_id, completed_at, pid, brand, qty, price in rows
+    ]
+
+
+# ====================== GOM NHÓM ======================
+def _aggregate_python(rows):
+    result = {}
+    for level, (_, keys, _) in LEVELS.items():
+        groups = defaultdict(lambda: [set(), 0, 0])
+        for order_id, day, pid, brand, qty, price in rows:
+            values = {"date": day, "product_id": pid, "brand": brand}
+            group = groups[tuple(values[k] for k in keys)]
+            group[0].add(order_id)
+            group[1] += qty
+            group[2] += qty * price
+        result[level] = {key: (len(o), units, revenue) for key, (o, units, revenue) in groups.items()}
+    return result
+
+
+def _aggregate_numpy(rows):
+    order_ids, days, pids, brands, qty, price = zip(*rows)
+    order_ids = np.asarray(order_ids, dtype=np.int64)
+    ordinals = np.fromiter((d.toordinal() for d in days), dtype=np.int64, count=len(days))
+    pids = np.asarray(pids, dtype=np.int64)
+    brand_names, brand_codes = np.unique(np.asarray(brands, dtype=object).astype(str), return_inverse=True)
+    qty = np.asarray(qty, dtype=np.int64)
+    revenue = qty * np.asarray(price, dtype=np.int64)
+    columns = {"date": ordinals, "product_id": pids, "brand": brand_codes}
+    decode = {
+        "date": lambda v: datetime.fromordinal(int(v)).date(),
+        "product_id": int,
+        "brand": lambda v: str(brand_names[v]),
+    }
+
+    result = {}
+    for level, (_, keys, _) in LEVELS.items():
+        groups, inverse = np.unique(np.stack([columns[k] for k in keys], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        n = len(groups)
+        units = np.bincount(inverse, weights=qty, minlength=n)
+        money = np.bincount(inverse, weights=revenue, minlength=n)
+        # Số đơn riêng biệt: bỏ trùng cặp (nhóm, đơn) rồi đếm theo nhóm
+        pairs = np.unique(np.stack([inverse, order_ids], axis=1), axis=0)
+        orders = np.bincount(pairs[:, 0], minlength=n)
+        result[level] = {
+            tuple(decode[k](v) for k, v in zip(keys, group)): (int(o), int(u), int(m))
+            for group, o, u, m in zip(groups, orders, units, money)
+        }
+    return result
+
+
+def aggregate(rows):
+    """``{level: {khóa: (orders, units, revenue)}}`` cho ``LEVELS``."""
+    if not rows:
+        return {level: {} for level in LEVELS}
+    compute = _aggregate_numpy if np is not None else _aggregate_python
+    return compute(rows)
+
+
+# ====================== GHI ======================
+def _instances(level, groups):
+    model, keys, _ = LEVELS[level]
+    return [
+        model(**dict(zip(keys, key)), orders=o, units=u, revenue=r)
+        for key, (o, u, r) in groups.items()
+    ]
+
+
+def _increment(model, lookup, extra, orders, units, revenue):
+    rows = model.objects.filter(**lookup)
+    change = {"orders": F("orders") + orders, "units": F("units") + units, "revenue": F("revenue") + revenue}
+    if rows.update(**change):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **extra, orders=orders, units=units, revenue=revenue)
+    except IntegrityError:
+        # Request khác vừa tạo dòng này -> cộng vào đó
+        rows.update(**change)
+
+
+def refresh_customers(user_ids):
+    """Tính lại ``CustomerSales`` từ cột tổng đã chốt của các đơn đã thanh toán."""
+    user_ids = [pk for pk in set(user_ids) if pk is not None]
+    totals = (
+        Order.objects.filter(user__in=user_ids, complete=True)
+        .values("user").order_by()
+        .annotate(n=Count("id"), units=Sum("total_items"), revenue=Sum("total_price"), last=Max("completed_at"))
+    )
+    rows = [
+        CustomerSales(user_id=t["user"], orders=t["n"], units=t["units"], revenue=t["revenue"], last_order_at=t["last"])
+        for t in totals
+    ]
+    CustomerSales.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=["user"],
+        update_fields=["orders", "units", "revenue", "last_order_at"],
+    )
+    return len(rows)
+
+
+def add_customer_order(order):
+    """Cộng ``order`` vừa thanh toán vào ``CustomerSales`` của người mua (gọi trong transaction thanh toán)."""
+    if order.user_id is None:
+        return
+    added = CustomerSales.objects.filter(user_id=order.user_id).update(
+        orders=F("orders") + 1, units=F("units") + order.total_items,
+        revenue=F("revenue") + order.total_price, last_order_at=order.completed_at,
+    )
+    if not added:
+        # Đơn đầu tiên của khách: tính trọn từ các đơn đã thanh toán (gồm cả đơn này)
+        refresh_customers([order.user_id])
+
+
+def record_order(order_id):
+    """Cộng một đơn vừa thanh toán vào các bảng doanh số. Trả về False nếu đã cộng."""
+    with transaction.atomic():
+        claimed = Order.objects.filter(pk=order_id, complete=True, sales_recorded=False).update(sales_recorded=True)
+        if not claimed:
+            return False
+        groups = aggregate(_rows(Order.objects.filter(pk=order_id)))
+        for level, (model, keys, unique) in LEVELS.items():
+            for key, (o, u, r) in groups[level].items():
+                values = dict(zip(keys, key))
+                lookup = {k: values.pop(k) for k in unique}
+                _increment(model, lookup, values, o, u, r)
+        refresh_customers(Order.objects.filter(pk=order_id).values_list("user_id", flat=True))
+    bump_generation("sales")
+    return True
+
+
+def _bounds(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def build(start, end, chunk_days=31):
+    """Dựng lại mọi bảng ngày trong ``[start, end]`` (ngày địa phương). Trả về số đơn đã gom."""
+    total = 0
+    day = start
+    while day <= end:
+        chunk_end = min(day + timedelta(days=chunk_days - 1), end)
+        total += _build_chunk(day, chunk_end)
+        day = chunk_end + timedelta(days=1)
+    bump_generation("sales")
+    return total
+
+
+def _build_chunk(start, end):
+    with transaction.atomic():
+        orders = Order.objects.filter(
+            complete=True, completed_at__gte=_bounds(start), completed_at__lt=_bounds(end + timedelta(days=1)),
+        )
+        # Đánh dấu trước khi đọc: record_order chạy sau đó sẽ bỏ qua các đơn này
+        orders.update(sales_recorded=True)
+        groups = aggregate(_rows(orders))
+        for level, (model, _, _) in LEVELS.items():
+            model.objects.filter(date__range=(start, end)).delete()
+            model.objects.bulk_create(_instances(level, groups[level]), batch_size=1000)
+        refresh_customers(orders.values_list("user_id", flat=True).distinct())
+        return sum(o for o, _, _ in groups["day"].values())
+
+
+def rebuild_all(chunk_days=31):
+    first = Order.objects.filter(complete=True).order_by("completed_at").values_list("completed_at", flat=True).first()
+    if first is None:
+        return 0
+    return build(timezone.localdate(first), timezone.localdate(), chunk_days=chunk_days)
+
+
+# ====================== ĐỌC (DASHBOARD) ======================
+def report(start, end, top=10):
+    """Số liệu cho dashboard trong ``[start, end]``, chỉ đọc các bảng rollup."""
+    days = list(
+        DailySales.objects.filter(date__range=(start, end)).order_by("date").values("date", "orders", "units", "revenue")
+    )
+    totals = {field: sum(day[field] for day in days) for field in ("orders", "units", "revenue")}
+    brands = list(
+        DailyBrandSales.objects.filter(date__range=(start, end))
+        .values("brand").annotate(orders=Sum("orders"), units=Sum("units"), revenue=Sum("revenue"))
+        .order_by("-revenue")
+    )
+    products = list(
+        DailyProductSales.objects.filter(date__range=(start, end))
+        .values("product_id", "product__name", "brand").annotate(units=Sum("units"), revenue=Sum("revenue"))
+        .order_by("-revenue", "product_id")[:top]
+    )
+    return {"days": days, "totals": totals, "brands": brands, "products": products}
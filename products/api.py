@@ -0,0 +1,152 @@
+# products/api.py
+"""API JSON chỉ đọc cho app mobile: ``/api/products/``, ``/api/blogs/``.
+
+* ``?fields=id,name,price``: chỉ trả (và chỉ SELECT) các field cần.
+* ``ETag`` / ``Last-Modified`` lấy từ ``updated_at``; ``@condition`` so với
+  ``If-None-Match`` / ``If-Modified-Since`` *trước* khi vào view, nên 304
+  chỉ tốn một truy vấn ``MAX(updated_at)`` và không serialize gì.
+* Danh sách dùng ``CursorPaginator`` sắp theo ``(updated_at, id)``: ``next``
+  luôn có khi trang không rỗng, client lưu lại và gọi định kỳ để nhận các
+  sản phẩm mới thêm / mới sửa (``has_more`` = còn trang ngay lúc này).
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from django.shortcuts import get_object_or_404
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from .cache import version_key
+from .models import Blog, Product
+from .pagination import NEXT, CursorPaginator, encode_cursor
+from .serializers import BlogSerializer, ProductDetailSerializer, ProductSerializer
+from .views import filter_catalog
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+# ====================== ETAG / LAST-MODIFIED ======================
+def _django_request(request):
+    return getattr(request, "_request", request)
+
+
+def conditional(state_func):
+    """``@condition`` với ETag + Last-Modified từ một lần gọi ``state_func``.
+
+    ``state_func(request, **kwargs)`` trả về ``(last_modified, extra)`` hoặc
+    None (không tồn tại -> để view trả 404).
+    """
+    def state(request, *args, **kwargs):
+        if not hasattr(request, "_api_state"):
+            request._api_state = state_func(request, *args, **kwargs)
+        return request._api_state
+
+    def etag(request, *args, **kwargs):
+        current = state(request, *args, **kwargs)
+        if current is None:
+            return None
+        last_modified, extra = current
+        raw = f"{last_modified.isoformat() if last_modified else ''}|{extra}|{request.GET.urlencode()}"
+        return hashlib.sha1(raw.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        current = state(request, *args, **kwargs)
+        return current[0] if current else None
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def _summary(queryset):
+    row = queryset.order_by().aggregate(last=Max("updated_at"), n=Count("id"))
+    return row["last"], row["n"]
+
+
+# ====================== DANH SÁCH (CURSOR) ======================
+def _page_size(request):
+    try:
+        return max(1, min(int(request.GET.get("limit", PAGE_SIZE)), MAX_PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+
+
+def _page_url(request, cursor):
+    params = request.GET.copy()
+    params["cursor"] = cursor
+    return request.build_absolute_uri(f"{request.path}?{urlencode(params, doseq=True)}")
+
+
+def paginated_response(request, queryset, serializer_class):
+    fields = serializer_class.parse_fields(request.GET.get("fields"))
+    paginator = CursorPaginator(
+        queryset.only(*serializer_class.model_columns(fields)), _page_size(request), ordering=("updated_at", "id"),
+    )
+    cursor = request.GET.get("cursor")
+    page = paginator.page(cursor)
+    if page.object_list:
+        next_cursor = encode_cursor(NEXT, paginator.key_for(page.object_list[-1]))
+    else:
+        next_cursor = cursor
+    data = serializer_class(page.object_list, many=True, fields=fields, context={"request": request}).data
+    return Response({
+        "next": _page_url(request, next_cursor) if next_cursor else None,
+        "previous": _page_url(request, page.previous_cursor) if page.previous_cursor else None,
+        "has_more": page.has_next(),
+        "results": data,
+    })
+
+
+def _products(request):
+    request = _django_request(request)
+    if not hasattr(request, "_api_products"):
+        request._api_products = filter_catalog(request)[0]
+    return request._api_products
+
+
+def _published_blogs():
+    return Blog.objects.filter(is_published=True)
+
+
+# ====================== SẢN PHẨM ======================
+@conditional(lambda request: _summary(_products(request)))
+@api_view(["GET"])
+def product_list(request):
+    return paginated_response(request, _products(request), ProductSerializer)
+
+
+def _product_state(request, product_id):
+    updated_at = Product.objects.filter(pk=product_id).values_list("updated_at", flat=True).first()
+    if updated_at is None:
+        return None
+    # Gợi ý được tính lại độc lập với sản phẩm -> thêm generation vào ETag
+    return updated_at, version_key(("recommendations",))
+
+
+@conditional(_product_state)
+@api_view(["GET"])
+def product_detail(request, product_id):
+    fields = ProductDetailSerializer.parse_fields(request.GET.get("fields"))
+    product = get_object_or_404(Product.objects.only(*ProductDetailSerializer.model_columns(fields)), pk=product_id)
+    return Response(ProductDetailSerializer(product, fields=fields, context={"request": request}).data)
+
+
+# ====================== BLOG ======================
+@conditional(lambda request: _summary(_published_blogs()))
+@api_view(["GET"])
+def blog_list(request):
+    return paginated_response(request, _published_blogs(), BlogSerializer)
+
+
+def _blog_state(request, pk):
+    updated_at = _published_blogs().filter(pk=pk).values_list("updated_at", flat=True).first()
+    return (updated_at, "") if updated_at else None
+
+
+@conditional(_blog_state)
+@api_view(["GET"])
+def blog_detail(request, pk):
+    fields = BlogSerializer.parse_fields(request.GET.get("fields"))
+    blog = get_object_or_404(_published_blogs().only(*BlogSerializer.model_columns(fields)), pk=pk)
+    return Response(BlogSerializer(blog, fields=fields, context={"request": request}).data)
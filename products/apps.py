@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from . import profiling, signals  # noqa: F401
+
+        # Mọi kết nối (kể cả của thread sync_to_async) đều báo truy vấn cho recorder đang chạy
+        connection_created.connect(profiling.install, dispatch_uid="products.profiling")
@@ -0,0 +1,177 @@
+# products/async_views.py
+"""Bản async của các view catalog / giỏ hàng, dùng async ORM của Django.
+
+Bật bằng ``settings.ASYNC_VIEWS`` (products/urls.py trỏ các route
+``product_list``, ``product_detail``, ``cart``, ``update_item`` sang đây)
+và chạy dưới ASGI (config/asgi.py). Khi chờ DB, event loop vẫn phục vụ
+request khác thay vì giữ nguyên một worker thread.
+
+Lưu ý: driver DB của Django vẫn là sync; ``aget``/``acount``/``async for``
+chạy truy vấn qua ``sync_to_async`` nên với SQLite các truy vấn trong
+``asyncio.gather`` vẫn thực thi lần lượt. Lợi ích thật sự phụ thuộc vào
+backend DB và số kết nối — đo bằng ``manage.py benchmark --driver both
+--async-views``.
+
+Template được render trong thread (``sync_to_async(render)``) vì context
+processor ``auth`` đọc ``request.user`` một cách đồng bộ.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import Page, Paginator
+from django.http import Http404, JsonResponse
+from django.shortcuts import render
+
+from . import cart as cart_service
+from . import comments as comment_service
+from . import facets
+from . import recommendations
+from .cache import aget_cached_product, cache_anonymous_page, cache_timeout, version_key
+from .models import Product
+from .pagination import CursorPaginator
+from .views import catalog_context, filter_catalog, use_cursor_pagination
+
+arender = sync_to_async(render)
+aversion_key = sync_to_async(version_key, thread_sensitive=False)
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def _offset_page(queryset, per_page, number):
+    """Như ``Paginator.get_page`` nhưng COUNT và trang dữ liệu chạy song song."""
+    try:
+        number = max(1, int(number or 1))
+    except ValueError:
+        number = 1
+    offset = (number - 1) * per_page
+    count, rows = await asyncio.gather(
+        queryset.acount(), _alist(queryset[offset:offset + per_page])
+    )
+    paginator = Paginator(queryset, per_page)
+    paginator.count = count
+    if number > paginator.num_pages:
+        # Số trang vượt quá -> trang cuối (giống get_page)
+        number = paginator.num_pages
+        offset = (number - 1) * per_page
+        rows = await _alist(queryset[offset:offset + per_page])
+    return paginator, Page(rows, number, paginator)
+
+
+# ====================== SẢN PHẨM ======================
+@cache_anonymous_page(lambda request: [("product",), ("images",)])
+async def product_list(request):
+    """Danh sách sản phẩm có tìm kiếm, lọc & đếm facet (async)"""
+    # Tìm kiếm toàn văn dùng raw SQL nên chạy trong thread
+    products, base, filters = await sync_to_async(filter_catalog)(request)
+    query = filters.query
+
+    cursor_mode = use_cursor_pagination(request) and not query
+    if cursor_mode:
+        paginator = CursorPaginator(products, 12, ordering=("id",))
+        page_obj = await sync_to_async(paginator.page)(request.GET.get("cursor"))
+        page_range = None
+    else:
+        paginator, page_obj = await _offset_page(products, 12, request.GET.get("page"))
+        page_range = paginator.get_elided_page_range(page_obj.number, on_each_side=2, on_ends=1)
+
+    context = {
+        **catalog_context(filters, await facets.afacet_counts(base, filters)),
+        "page_obj": page_obj,
+        "page_range": page_range,
+        "cursor_mode": cursor_mode,
+        "cache_timeout": cache_timeout(),
+        "images_version": await aversion_key(("images",)),
+    }
+    return await arender(request, "products/product_list.html", context)
+
+
+@cache_anonymous_page(lambda request, product_id: [
+    ("product", product_id), ("comments", product_id), ("product",), ("images",), ("recommendations",),
+])
+async def product_detail(request, product_id):
+    """Chi tiết sản phẩm + bình luận (async).
+
+    Sản phẩm, sản phẩm gợi ý (tính trước) và bình luận được tải song song.
+    """
+    comments_cursor = request.GET.get("comments", "")
+    product, related, comments_page, comments_version, catalog_version, images_version = await asyncio.gather(
+        aget_cached_product(product_id),
+        _alist(recommendations.for_product(product_id)),
+        sync_to_async(comment_service.page)(product_id, comments_cursor or None),
+        aversion_key(("comments", product_id)),
+        aversion_key(("product",), ("recommendations",)),
+        aversion_key(("images",)),
+    )
+    if product is None:
+        raise Http404("Không tìm thấy sản phẩm")
+
+    context = {
+        "product": product,
+        "related_products": related,
+        "comments_page": comments_page,
+        "comments_cursor": comments_cursor,
+        "cache_timeout": cache_timeout(),
+        "comments_version": comments_version,
+        "catalog_version": catalog_version,
+        "images_version": images_version,
+    }
+    return await arender(request, "products/product_detail.html", context)
+
+
+# ====================== GIỎ HÀNG ======================
+def _update_guest_cart(session, product_id, action):
+    if action == "add":
+        cart_service.guest_add_item(session, product_id)
+    else:
+        cart_service.guest_remove_item(session, product_id)
+    return cart_service.guest_cart(session)
+
+
+async def cart(request):
+    user = await request.auser()
+    if not user.is_authenticated:
+        # Session có thể nằm trong DB (cached_db) -> đọc trong thread
+        order = await sync_to_async(cart_service.guest_cart)(request.session)
+        return await arender(request, "products/cart.html", {"order": order, "items": order.items})
+    order = await sync_to_async(cart_service.peek_open_order)(user)
+    items = await _alist(order.order_items.select_related("product")) if order.pk else []
+    return await arender(request, "products/cart.html", {"order": order, "items": items})
+
+
+async def update_item(request):
+    """AJAX: thêm / giảm số lượng trong giỏ hàng (async)"""
+    if request.method == "POST":
+        data = json.loads(request.body)
+        product_id = data.get("productId")
+        action = data.get("action")
+
+        try:
+            product = await Product.objects.aget(id=product_id)
+        except Product.DoesNotExist:
+            raise Http404("Không tìm thấy sản phẩm")
+
+        if action not in ("add", "remove"):
+            return JsonResponse({"error": "Invalid action"}, status=400)
+
+        # Thao tác giỏ cần transaction + select_for_update -> chạy sync trong thread
+        user = await request.auser()
+        if not user.is_authenticated:
+            try:
+                order = await sync_to_async(_update_guest_cart)(request.session, product.pk, action)
+            except ValueError as exc:
+                return JsonResponse({"error": str(exc)}, status=400)
+        elif action == "add":
+            order = await sync_to_async(cart_service.add_item)(user, product)
+        else:
+            order = await sync_to_async(cart_service.remove_item)(user, product)
+
+        return JsonResponse({
+            "status": "success",
+            "cart_total": order.total_items,
+            "cart_price": int(order.total_price),
+        })
+
+    return JsonResponse({"error": "Invalid request"}, status=400)
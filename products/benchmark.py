@@ -0,0 +1,395 @@
+# products/benchmark.py
+"""Benchmark các endpoint công khai trên dữ liệu seed (products/seed.py).
+
+Mỗi kịch bản (scenario) sinh ra một request (method, path, cần đăng nhập hay
+không). Hai driver:
+
+* ``run_wsgi``: Django test ``Client`` (đi qua toàn bộ middleware WSGI), chạy
+  song song bằng thread, đo cả số truy vấn SQL mỗi request.
+* ``run_asgi``: gọi trực tiếp ``config.asgi.application`` với nhiều client
+  đồng thời trên một event loop; cũng đếm truy vấn (kể cả trong thread
+  ``sync_to_async``).
+
+Với ``--driver both``, cùng một request phải chạy cùng số truy vấn trên hai
+driver (``query_mismatches``): view async sinh N+1 thì lệch ngay.
+
+Kết quả (p50/p95/p99, truy vấn/request, throughput) có thể lưu làm baseline
+JSON và so sánh ở lần chạy sau (``compare``).
+
+So sánh view sync (WSGI) với view async (ASGI, products/async_views.py)::
+
+    manage.py benchmark --driver both --async-views \
+        --scenarios browse,detail,cart,update_item --concurrency 16
+
+Đăng nhập (``login``: mật khẩu đúng, ``login_bad``: dò mật khẩu; số request/s
+phụ thuộc ``PBKDF2_ITERATIONS``, request bị chặn hiện là 429)::
+
+    PBKDF2_ITERATIONS=600000 manage.py benchmark --scenarios login,login_bad --concurrency 1
+"""
+import asyncio
+import importlib
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import clear_url_caches, reverse
+from django.utils.crypto import get_random_string
+
+from .models import Product
+from .profiling import record_queries
+from .seed import WORDS
+
+
+FORM = "application/x-www-form-urlencoded"
+
+
+@dataclass
+class Scenario:
+    name: str
+    build: object  # callable(rng, data) -> (method, path) hoặc (method, path, body)
+    login: bool = False
+    content_type: str = "application/json"
+
+
+@dataclass
+class Result:
+    scenario: str
+    driver: str
+    requests: int
+    errors: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_queries: float
+    throughput: float
+    status_codes: dict = field(default_factory=dict)
+
+
+class BenchData:
+    """Id mẫu lấy một lần từ DB để kịch bản chọn ngẫu nhiên."""
+
+    def __init__(self, prefix="seed"):
+        self.product_ids = list(Product.objects.values_list("id", flat=True))
+        self.user_ids = list(
+            User.objects.filter(username__startswith=f"{prefix}-user-").values_list("id", flat=True)
+        )
+        self.pages = max(1, len(self.product_ids) // 12)
+
+
+def _browse(rng, data):
+    params = {}
+    if rng.random() < 0.5:
+        params["brand"] = rng.choice([value for value, _ in Product.BRAND_CHOICES])
+    if rng.random() < 0.5:
+        params["page"] = rng.randint(1, max(1, data.pages // 5))
+    return "GET", reverse("product_list") + ("?" + urlencode(params) if params else "")
+
+
+def _search(rng, data):
+    return "GET", reverse("product_list") + "?" + urlencode({"q": rng.choice(WORDS)})
+
+
+def _detail(rng, data):
+    return "GET", reverse("product_detail", args=[rng.choice(data.product_ids)])
+
+
+def _add_to_cart(rng, data):
+    return "GET", reverse("add_to_cart", args=[rng.choice(data.product_ids)])
+
+
+def _cart(rng, data):
+    return "GET", reverse("cart")
+
+
+def _update_item(rng, data):
+    body = {"productId": rng.choice(data.product_ids), "action": rng.choice(["add", "add", "remove"])}
+    return "POST", reverse("update_item"), json.dumps(body)
+
+
+def _profile(rng, data):
+    return "GET", reverse("my_profile")
+
+
+def _login(rng, data, password="bench-password"):
+    username = User.objects.filter(pk=rng.choice(data.user_ids)).values_list("username", flat=True).get()
+    return "POST", reverse("login"), urlencode({"username": username, "password": password})
+
+
+def _login_bad(rng, data):
+    # Dò mật khẩu: sau LOGIN_RATE_LIMIT_* lần sai, request bị chặn (429) trước khi băm
+    return _login(rng, data, password="wrong-password")
+
+
+SCENARIOS = {
+    s.name: s
+    for s in [
+        Scenario("browse", _browse),
+        Scenario("search", _search),
+        Scenario("detail", _detail),
+        Scenario("add_to_cart", _add_to_cart, login=True),
+        Scenario("cart", _cart, login=True),
+        Scenario("update_item", _update_item, login=True),
+        Scenario("profile", _profile, login=True),
+        Scenario("login", _login, content_type=FORM),
+        Scenario("login_bad", _login_bad, content_type=FORM),
+    ]
+}
+
+
+def _build(scenario, rng, data):
+    method, path, body = (*scenario.build(rng, data), None)[:3]
+    return method, path, body
+
+
+def _reload_urlconf():
+    from config import urls as root_urls
+    from products import urls as product_urls
+
+    importlib.reload(product_urls)
+    importlib.reload(root_urls)
+    clear_url_caches()
+
+
+@contextmanager
+def use_async_views(enabled=True):
+    """Tạm trỏ route catalog / giỏ hàng sang products/async_views.py (``ASYNC_VIEWS``)."""
+    if enabled == settings.ASYNC_VIEWS:
+        yield
+        return
+    try:
+        with override_settings(ASYNC_VIEWS=enabled):
+            _reload_urlconf()
+            yield
+    finally:
+        _reload_urlconf()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def _summarize(scenario, driver, samples, elapsed):
+    latencies = [s[0] for s in samples]
+    queries = [s[1] for s in samples if s[1] is not None]
+    codes = {}
+    for _, _, status in samples:
+        codes[str(status)] = codes.get(str(status), 0) + 1
+    return Result(
+        scenario=scenario,
+        driver=driver,
+        requests=len(samples),
+        errors=sum(1 for _, _, status in samples if status >= 500),
+        p50_ms=round(percentile(latencies, 50), 3),
+        p95_ms=round(percentile(latencies, 95), 3),
+        p99_ms=round(percentile(latencies, 99), 3),
+        mean_queries=round(statistics.fmean(queries), 2) if queries else 0.0,
+        throughput=round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        status_codes=codes,
+    )
+
+
+# ====================== WSGI ======================
+def run_wsgi(scenario, data, requests=200, concurrency=4, seed=0):
+    """Chạy ``requests`` request qua test Client trên ``concurrency`` thread."""
+    local = threading.local()
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def client_for_thread():
+        if not hasattr(local, "client"):
+            local.client = Client()
+            local.rng = random.Random(f"{seed}-{threading.get_ident()}")
+            if scenario.login:
+                local.client.force_login(User.objects.get(pk=local.rng.choice(data.user_ids)))
+        return local.client, local.rng
+
+    def worker():
+        close_old_connections()
+        samples = []
+        client, rng = client_for_thread()
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            method, path, body = _build(scenario, rng, data)
+            start = time.perf_counter()
+            with record_queries() as recorder:
+                response = client.generic(method, path, body or "", content_type=scenario.content_type)
+            samples.append(((time.perf_counter() - start) * 1000, recorder.count, response.status_code))
+        return samples
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [pool.submit(worker) for _ in range(concurrency)]
+        samples = [s for f in futures for s in f.result()]
+    return _summarize(scenario.name, "wsgi", samples, time.perf_counter() - start)
+
+
+# ====================== ASGI ======================
+async def _asgi_request(app, method, path, cookies="", body=None, content_type="application/json"):
+    path, _, query = path.partition("?")
+    body = (body or "").encode()
+    headers = [(b"host", b"testserver")]
+    if body:
+        # Token CSRF dạng chưa mask (32 ký tự) vừa làm cookie vừa làm header
+        token = get_random_string(32)
+        cookies = f"{cookies}; csrftoken={token}" if cookies else f"csrftoken={token}"
+        headers += [
+            (b"content-type", content_type.encode()),
+            (b"content-length", str(len(body)).encode()),
+            (b"x-csrftoken", token.encode()),
+        ]
+    headers.append((b"cookie", cookies.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "headers": headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("testserver", 80),
+    }
+    status = 500
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await asyncio.sleep(3600)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def run_asgi(scenario, data, requests=200, concurrency=16, seed=0, label="asgi"):
+    """Gửi request trực tiếp vào ``config.asgi.application`` với ``concurrency`` client."""
+    from config.asgi import application
+
+    cookies = ""
+    if scenario.login:
+        client = Client()
+        client.force_login(User.objects.get(pk=random.Random(seed).choice(data.user_ids)))
+        cookies = "; ".join(f"{k}={v.value}" for k, v in client.cookies.items())
+
+    # Dựng sẵn request ngoài event loop: vài kịch bản (login) đọc DB khi dựng
+    rngs = [random.Random(f"{seed}-{index}") for index in range(concurrency)]
+    planned = iter([_build(scenario, rngs[i % concurrency], data) for i in range(requests)])
+
+    async def main():
+        samples = []
+
+        async def worker():
+            for method, path, body in planned:
+                start = time.perf_counter()
+                # Mỗi worker là một task riêng context -> recorder không lẫn giữa các request song song
+                with record_queries() as recorder:
+                    status = await _asgi_request(application, method, path, cookies, body, scenario.content_type)
+                samples.append(((time.perf_counter() - start) * 1000, recorder.count, status))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return samples, time.perf_counter() - start
+
+    samples, elapsed = asyncio.run(main())
+    return _summarize(scenario.name, label, samples, elapsed)
+
+
+def probe_queries(scenario, data, seed=0, async_views=False):
+    """Số truy vấn của cùng một request qua WSGI rồi qua ASGI: ``(wsgi, asgi)``.
+
+    Cache được xóa trước mỗi lần đo; request được gửi một lần trước đó để bỏ
+    qua những gì chỉ xảy ra lần đầu (tạo giỏ, tạo dòng hàng...).
+    """
+    from config.asgi import application
+
+    method, path, body = _build(scenario, random.Random(seed), data)
+    client = Client()
+    cookies = ""
+    if scenario.login:
+        client.force_login(User.objects.get(pk=random.Random(seed).choice(data.user_ids)))
+        cookies = "; ".join(f"{k}={v.value}" for k, v in client.cookies.items())
+
+    def wsgi():
+        cache.clear()
+        with record_queries() as recorder:
+            client.generic(method, path, body or "", content_type=scenario.content_type)
+        return recorder.count
+
+    async def asgi():
+        await cache.aclear()
+        with record_queries() as recorder:
+            await _asgi_request(application, method, path, cookies, body, scenario.content_type)
+        return recorder.count
+
+    wsgi()
+    counts = wsgi()
+    with use_async_views(async_views):
+        return counts, asyncio.run(asgi())
+
+
+def query_mismatches(scenarios, data, seed=0, async_views=False):
+    """Kịch bản mà driver ASGI chạy số truy vấn khác WSGI cho cùng một request (vd. N+1 trong view async)."""
+    mismatches = []
+    for scenario in scenarios:
+        wsgi, asgi = probe_queries(scenario, data, seed, async_views)
+        if wsgi != asgi:
+            mismatches.append(f"{scenario.name}: wsgi {wsgi} truy vấn, asgi {asgi}")
+    return mismatches
+
+
+# ====================== BASELINE ======================
+def save_baseline(results, path, meta=None):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump({"meta": meta or {}, "results": [asdict(r) for r in results]}, fh, indent=2)
+
+
+def compare(results, path, threshold=0.2):
+    """So với baseline: trả về danh sách mô tả các chỉ số bị hồi quy quá ``threshold``."""
+    with open(path, encoding="utf-8") as fh:
+        baseline = {(r["scenario"], r["driver"]): r for r in json.load(fh)["results"]}
+
+    regressions = []
+    for result in results:
+        base = baseline.get((result.scenario, result.driver))
+        if not base:
+            continue
+        label = f"{result.scenario}/{result.driver}"
+        for metric in ("p50_ms", "p95_ms"):
+            if base[metric] and getattr(result, metric) > base[metric] * (1 + threshold):
+                regressions.append(f"{label}: {metric} {base[metric]} -> {getattr(result, metric)}")
+        if result.mean_queries > base["mean_queries"] + 0.5:
+            regressions.append(f"{label}: mean_queries {base['mean_queries']} -> {result.mean_queries}")
+        if base["throughput"] and result.throughput < base["throughput"] * (1 - threshold):
+            regressions.append(f"{label}: throughput {base['throughput']} -> {result.throughput}")
+        if result.errors > base["errors"]:
+            regressions.append(f"{label}: errors {base['errors']} -> {result.errors}")
+    return regressions
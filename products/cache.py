@@ -0,0 +1,159 @@
+# products/cache.py
+"""Cache trang / fragment cho catalog, vô hiệu hóa bằng "generation key".
+
+Mỗi namespace (``("product",)``, ``("product", 5)``, ``("comments", 5)``,
+``("blog",)``...) có một số thế hệ lưu trong cache. Khóa cache của trang
+hoặc fragment chứa các số thế hệ mà nó phụ thuộc; khi model thay đổi,
+signal chỉ cần tăng số thế hệ (products/signals.py) là mọi khóa cũ tự
+động không còn được dùng nữa, không cần xóa từng khóa.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+
+GENERATION_PREFIX = "gen"
+PAGE_PREFIX = "page"
+
+
+def cache_timeout():
+    return getattr(settings, "CATALOG_CACHE_TIMEOUT", 300)
+
+
+def _generation_key(parts):
+    return ":".join([GENERATION_PREFIX, *map(str, parts)])
+
+
+def _new_generation():
+    # Giá trị khởi tạo theo thời gian: nếu khóa bị evict rồi tạo lại
+    # thì không "quay về" một thế hệ cũ còn trang đã cache.
+    return time.time_ns() // 1000
+
+
+# ====================== GENERATION ======================
+def get_generations(*namespaces):
+    """Đọc số thế hệ của nhiều namespace trong một lần ``get_many``."""
+    keys = [_generation_key(ns) for ns in namespaces]
+    found = cache.get_many(keys)
+    missing = {key: _new_generation() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def get_generation(*parts):
+    return get_generations(parts)[0]
+
+
+def bump_generation(*parts):
+    key = _generation_key(parts)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), None)
+
+
+def version_key(*namespaces):
+    return ".".join(str(gen) for gen in get_generations(*namespaces))
+
+
+# ====================== CACHE OBJECT / TRANG ======================
+def get_cached_product(product_id):
+    """Lấy Product từ cache (theo thế hệ của chính sản phẩm đó), trả về None nếu không có."""
+    from .models import Product
+
+    key = f"product:{product_id}:{get_generation('product', product_id)}"
+    product = cache.get(key)
+    if product is None:
+        product = Product.objects.filter(pk=product_id).first()
+        if product is not None:
+            cache.set(key, product, cache_timeout())
+    return product
+
+
+async def aget_cached_product(product_id):
+    """Bản async của ``get_cached_product`` cho products/async_views.py."""
+    from .models import Product
+
+    generation = await sync_to_async(get_generation, thread_sensitive=False)("product", product_id)
+    key = f"product:{product_id}:{generation}"
+    product = await cache.aget(key)
+    if product is None:
+        product = await Product.objects.filter(pk=product_id).afirst()
+        if product is not None:
+            await cache.aset(key, product, cache_timeout())
+    return product
+
+
+def _page_key(request, view, namespaces):
+    versions = version_key(*namespaces)
+    url_hash = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"{PAGE_PREFIX}:{view.__name__}:{url_hash}:{versions}"
+
+
+def _cacheable(response):
+    return response.status_code == 200 and not response.streaming and not response.cookies
+
+
+def cache_anonymous_page(namespaces_for):
+    """Cache toàn bộ HTML của view GET cho khách chưa đăng nhập.
+
+    ``namespaces_for(request, *args, **kwargs)`` trả về danh sách namespace
+    mà trang phụ thuộc; khóa cache gồm URL đầy đủ + số thế hệ của chúng.
+    Dùng được cho cả view sync lẫn async.
+    """
+    def decorator(view):
+        if iscoroutinefunction(view):
+            return _async_cache_page(view, namespaces_for)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (
+                request.method != "GET"
+                or request.user.is_authenticated
+                or len(get_messages(request))
+            ):
+                return view(request, *args, **kwargs)
+
+            key = _page_key(request, view, namespaces_for(request, *args, **kwargs))
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                return HttpResponse(content, content_type=content_type)
+
+            response = view(request, *args, **kwargs)
+            if _cacheable(response):
+                cache.set(key, (response.content, response["Content-Type"]), cache_timeout())
+            return response
+        return wrapper
+    return decorator
+
+
+def _async_cache_page(view, namespaces_for):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # request.user là lazy và truy vấn DB đồng bộ -> dùng request.auser()
+        if request.method != "GET" or (await request.auser()).is_authenticated:
+            return await view(request, *args, **kwargs)
+        if await sync_to_async(lambda: len(get_messages(request)))():
+            return await view(request, *args, **kwargs)
+
+        key = await sync_to_async(_page_key, thread_sensitive=False)(
+            request, view, namespaces_for(request, *args, **kwargs)
+        )
+        cached = await cache.aget(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = await view(request, *args, **kwargs)
+        if _cacheable(response):
+            await cache.aset(key, (response.content, response["Content-Type"]), cache_timeout())
+        return response
+    return wrapper
@@ -0,0 +1,253 @@
+# products/cart.py
+"""Các thao tác trên giỏ hàng, an toàn khi có nhiều request song song.
+
+* Một user chỉ có một ``Order`` đang mở (ràng buộc ``unique_open_order_per_user``),
+  nên ``get_or_create`` song song không tạo ra giỏ trùng.
+* Mỗi sản phẩm chỉ có một ``OrderItem`` trong một đơn (``unique_order_product``).
+* Số lượng thay đổi bằng ``UPDATE ... SET quantity = quantity + n`` (biểu thức
+  ``F``) trong transaction đã khóa dòng Order bằng ``select_for_update``, nên
+  không mất lượt cộng khi người dùng bấm liên tục.
+* Khóa luôn kèm điều kiện ``complete=False``: thao tác phải chờ
+  ``complete_checkout`` sẽ thấy đơn đã thanh toán và chuyển sang giỏ mới,
+  không thêm hàng (chưa giữ, chưa tính tiền) vào đơn đã chốt.
+
+Khách chưa đăng nhập: giỏ nằm trong session (``SESSION_KEY``), mã hóa gọn
+dạng ``"12:1,15:3"`` (id sản phẩm:số lượng) để vừa cookie khi dùng
+``signed_cookies``; không có dòng ``Order`` nào cho khách. Khi đăng nhập,
+``merge_guest_cart`` gộp vào ``Order`` đang mở trong một transaction.
+"""
+from dataclasses import dataclass
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+
+from .currency import format_vnd
+from .models import Order, OrderItem, Product
+
+SESSION_KEY = "cart"
+MAX_GUEST_LINES = 50
+
+
+def get_open_order(user):
+    """Giỏ hàng đang mở của ``user`` (tạo mới nếu chưa có)."""
+    order, _ = Order.objects.get_or_create(user=user, complete=False)
+    return order
+
+
+def peek_open_order(user):
+    """Giỏ đang mở để hiển thị; chưa có thì trả ``Order`` chưa lưu (xem giỏ không INSERT)."""
+    return Order.objects.filter(user=user, complete=False).first() or Order(user=user)
+
+
+def _lock(order_id):
+    """Khóa giỏ ``order_id`` nếu vẫn đang mở; None nếu đơn đã được thanh toán."""
+    return Order.objects.select_for_update().filter(pk=order_id, complete=False).first()
+
+
+def _lock_open_order(user):
+    """Khóa giỏ đang mở của ``user`` (tạo mới nếu chưa có). Gọi trong transaction.
+
+    Trả về ``(order, created)``; giỏ vừa tạo chắc chắn chưa có dòng nào.
+    """
+    # Cùng một truy vấn tìm và khóa: nếu phải chờ một checkout, khi được
+    # khóa thì dòng đó đã complete=True và không còn khớp -> tạo giỏ mới
+    locked = Order.objects.select_for_update().filter(user=user, complete=False)
+    order = locked.first()
+    if order is not None:
+        return order, False
+    # INSERT ... ON CONFLICT DO NOTHING: request khác vừa tạo giỏ mở
+    # (unique_open_order_per_user) thì bỏ qua, không cần savepoint để bắt lỗi
+    Order.objects.bulk_create([Order(user=user)], ignore_conflicts=True)
+    return locked.get(), True
+
+
+def _finish(order):
+    # QuerySet.update() không phát signal -> tự tính lại cột tổng
+    Order.objects.filter(pk=order.pk).refresh_totals()
+    order.refresh_from_db(fields=["total_price", "total_items"])
+    return order
+
+
+def _shift_totals(order, product, quantity):
+    """Cộng ``quantity`` (có thể âm) x giá ``product`` vào cột tổng của giỏ đã khóa.
+
+    Một câu UPDATE thay cho tính lại cả giỏ + đọc lại; giá trị trên ``order``
+    (vừa đọc khi khóa) được cập nhật theo. Lệch do giá đổi giữa chừng thì
+    ``reconcile_order_totals`` sửa.
+    """
+    price = product.price * quantity
+    Order.objects.filter(pk=order.pk).update(
+        total_items=F("total_items") + quantity, total_price=F("total_price") + price
+    )
+    order.total_items += quantity
+    order.total_price += price
+    return order
+
+
+def add_item(user, product, quantity=1):
+    """Thêm ``quantity`` sản phẩm vào giỏ của ``user``. Trả về Order đã cập nhật tổng."""
+    with transaction.atomic():
+        order, created = _lock_open_order(user)
+        if created or not OrderItem.objects.filter(order=order, product=product).update(
+            quantity=F("quantity") + quantity
+        ):
+            # Giỏ đang bị khóa nên không request nào chen vào tạo dòng này;
+            # bulk_create không phát post_save (cột tổng do _shift_totals lo)
+            OrderItem.objects.bulk_create([OrderItem(order=order, product=product, quantity=quantity)])
+        return _shift_totals(order, product, quantity)
+
+
+def remove_item(user, product, quantity=1):
+    """Giảm ``quantity``; xóa dòng khi số lượng về 0."""
+    with transaction.atomic():
+        order, _ = _lock_open_order(user)
+        item = OrderItem.objects.filter(order=order, product=product).only("order", "quantity").first()
+        if item is None:
+            return order
+        if item.quantity > quantity:
+            OrderItem.objects.filter(pk=item.pk).update(quantity=F("quantity") - quantity)
+            return _shift_totals(order, product, -quantity)
+        # post_delete của OrderItem đã ghi lại cột tổng -> chỉ sửa giá trị trong bộ nhớ
+        item.delete()
+        order.total_items -= item.quantity
+        order.total_price -= product.price * item.quantity
+        return order
+
+
+def set_quantity(item, quantity):
+    """Đặt số lượng cho một dòng giỏ hàng; ``quantity <= 0`` nghĩa là xóa.
+
+    Trả về None (không đổi gì) nếu đơn chứa dòng đó vừa được thanh toán.
+    """
+    with transaction.atomic():
+        order = _lock(item.order_id)
+        if order is None:
+            return None
+        items = OrderItem.objects.filter(pk=item.pk)
+        if quantity > 0:
+            items.update(quantity=quantity)
+        else:
+            items.delete()
+        return _finish(order)
+
+
+def delete_item(item):
+    with transaction.atomic():
+        order = _lock(item.order_id)
+        if order is None:
+            return None
+        OrderItem.objects.filter(pk=item.pk).delete()
+        return _finish(order)
+
+
+# ====================== GIỎ HÀNG KHÁCH (SESSION) ======================
+@dataclass
+class GuestItem:
+    product: Product
+    quantity: int
+
+    @property
+    def id(self):
+        # Template dùng item.id cho URL sửa / xóa; với khách đó là id sản phẩm
+        return self.product.pk
+
+    @property
+    def get_total(self):
+        return self.product.price * self.quantity
+
+    @property
+    def formatted_price(self):
+        return format_vnd(self.get_total)
+
+
+@dataclass
+class GuestCart:
+    items: list
+
+    @property
+    def total_items(self):
+        return sum(item.quantity for item in self.items)
+
+    @property
+    def total_price(self):
+        return sum((item.get_total for item in self.items), 0)
+
+
+def decode_lines(raw):
+    """``"12:1,15:3"`` -> ``{12: 1, 15: 3}`` (bỏ qua phần hỏng)."""
+    lines = {}
+    for part in (raw or "").split(","):
+        pid, _, qty = part.partition(":")
+        try:
+            pid, qty = int(pid), int(qty)
+        except ValueError:
+            continue
+        if qty > 0:
+            lines[pid] = qty
+    return lines
+
+
+def encode_lines(lines):
+    return ",".join(f"{pid}:{qty}" for pid, qty in sorted(lines.items()) if qty > 0)
+
+
+def guest_lines(session):
+    return decode_lines(session.get(SESSION_KEY))
+
+
+def _save_lines(session, lines):
+    # Chỉ ghi session khi giỏ thực sự đổi: duyệt catalog không làm session "modified"
+    if lines:
+        session[SESSION_KEY] = encode_lines(lines)
+    elif SESSION_KEY in session:
+        del session[SESSION_KEY]
+
+
+def guest_set_quantity(session, product_id, quantity):
+    lines = guest_lines(session)
+    if quantity > 0:
+        if product_id not in lines and len(lines) >= MAX_GUEST_LINES:
+            raise ValueError("Giỏ hàng đã đủ số mặt hàng tối đa.")
+        lines[product_id] = quantity
+    else:
+        lines.pop(product_id, None)
+    _save_lines(session, lines)
+    return lines
+
+
+def guest_add_item(session, product_id, quantity=1):
+    return guest_set_quantity(session, product_id, guest_lines(session).get(product_id, 0) + quantity)
+
+
+def guest_remove_item(session, product_id, quantity=1):
+    return guest_set_quantity(session, product_id, guest_lines(session).get(product_id, 0) - quantity)
+
+
+def guest_cart(session):
+    """``GuestCart`` để render (một truy vấn lấy sản phẩm; sản phẩm đã xóa bị bỏ qua)."""
+    lines = guest_lines(session)
+    products = Product.objects.in_bulk(list(lines))
+    return GuestCart([GuestItem(products[pid], qty) for pid, qty in sorted(lines.items()) if pid in products])
+
+
+def merge_guest_cart(user, session):
+    """Gộp giỏ khách vào giỏ đang mở của ``user`` (cộng dồn số lượng) rồi xóa giỏ khách."""
+    lines = guest_lines(session)
+    if not lines:
+        return None
+    with transaction.atomic():
+        order, _ = _lock_open_order(user)
+        # Một truy vấn: sản phẩm còn tồn tại + đã có trong giỏ hay chưa
+        rows = Product.objects.filter(pk__in=list(lines)).annotate(
+            in_order=Exists(OrderItem.objects.filter(order=order, product=OuterRef("pk")))
+        ).values_list("pk", "in_order")
+        new = []
+        for pid, in_order in rows:
+            if in_order:
+                OrderItem.objects.filter(order=order, product_id=pid).update(quantity=F("quantity") + lines[pid])
+            else:
+                new.append(OrderItem(order=order, product_id=pid, quantity=lines[pid]))
+        OrderItem.objects.bulk_create(new)
+        order = _finish(order)
+    del session[SESSION_KEY]
+    return order
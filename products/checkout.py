@@ -0,0 +1,194 @@
+# products/checkout.py
+"""Giữ hàng và thanh toán đơn hàng mà không bán vượt tồn kho.
+
+Tồn kho chỉ bị trừ bằng một câu ``UPDATE ... SET stock = stock - n
+WHERE id = %s AND stock >= n``. Câu lệnh này chỉ khóa đúng dòng sản phẩm đó
+trong chốc lát (không khóa bảng), nên hàng trăm lượt thanh toán song song
+trên cùng một SKU "hot" vẫn chạy được và không bao giờ làm stock âm.
+
+Luồng xử lý:
+
+1. ``reserve_order``: khi khách vào trang thanh toán, trừ stock cho từng
+   dòng giỏ hàng và ghi ``StockReservation`` có hạn ``STOCK_RESERVATION_TTL``.
+2. ``complete_checkout``: làm mới các khoản giữ, xóa chúng (stock đã trừ
+   rồi), chốt ``OrderItem.unit_price`` theo giá hiện tại, tạo
+   ``ShippingAddress`` và đánh dấu ``Order.complete``.
+3. ``release_expired``: trả lại stock của các khoản giữ đã quá hạn
+   (``manage.py release_expired_reservations``).
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Now
+from django.utils import timezone
+
+from . import analytics, tasks
+from .cache import bump_generation
+from .models import Order, OrderItem, Product, ShippingAddress, StockReservation
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class EmptyCart(CheckoutError):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    def __init__(self, product, requested):
+        self.product = product
+        self.requested = requested
+        super().__init__(f"{product.name}: không đủ hàng cho {requested} sản phẩm")
+
+
+def reservation_ttl():
+    return timedelta(seconds=getattr(settings, "STOCK_RESERVATION_TTL", 600))
+
+
+# ====================== TỒN KHO ======================
+# update() bỏ qua auto_now -> tự đặt updated_at, để ETag / Last-Modified và
+# cursor "có gì mới" của API (products/api.py) thấy tồn kho đã đổi
+def _take_stock(product_id, quantity):
+    """Trừ stock có điều kiện. Trả về False nếu không đủ hàng."""
+    return bool(
+        Product.objects.filter(pk=product_id, stock__gte=quantity)
+        .update(stock=F("stock") - quantity, updated_at=Now())
+    )
+
+
+def _return_stock(product_id, quantity):
+    Product.objects.filter(pk=product_id).update(stock=F("stock") + quantity, updated_at=Now())
+
+
+def _stock_changed(product_ids):
+    # update() không phát signal -> tự vô hiệu hóa cache trang chi tiết
+    def bump():
+        for pk in product_ids:
+            bump_generation("product", pk)
+    if product_ids:
+        transaction.on_commit(bump)
+
+
+def release_reservations(reservations, expired_before=None):
+    """Xóa từng khoản giữ rồi mới trả stock: nếu hai tiến trình cùng giải phóng
+    một khoản thì chỉ tiến trình xóa được dòng (count == 1) mới cộng lại stock.
+
+    Với ``expired_before``, khoản giữ vừa được gia hạn sẽ không bị xóa.
+    """
+    released = []
+    for reservation in reservations:
+        rows = StockReservation.objects.filter(pk=reservation.pk)
+        if expired_before is not None:
+            rows = rows.filter(expires_at__lt=expired_before)
+        with transaction.atomic():
+            deleted, _ = rows.delete()
+            if deleted:
+                _return_stock(reservation.product_id, reservation.quantity)
+                released.append(reservation.product_id)
+    _stock_changed(released)
+    return len(released)
+
+
+# ====================== GIỮ HÀNG ======================
+def reserve_order(order):
+    """Đồng bộ các khoản giữ hàng với giỏ hiện tại và gia hạn chúng.
+
+    Raise ``OutOfStock`` (và hoàn tác toàn bộ) nếu một sản phẩm không đủ hàng.
+    """
+    now = timezone.now()
+    expires_at = now + reservation_ttl()
+
+    # Khoản giữ đã hết hạn của chính đơn này -> trả lại trước rồi giữ lại từ đầu
+    release_reservations(list(order.reservations.filter(expires_at__lt=now)), expired_before=now)
+
+    with transaction.atomic():
+        # Gia hạn có điều kiện: khoản nào còn hạn thì không thể bị
+        # release_expired lấy mất trong lúc ta đang xử lý.
+        order.reservations.filter(expires_at__gte=now).update(expires_at=expires_at)
+        held = {r.product_id: r for r in order.reservations.all()}
+        wanted = {}
+        for item in order.order_items.select_related("product"):
+            wanted[item.product_id] = (item.product, item.quantity)
+        if not wanted:
+            raise EmptyCart("Giỏ hàng trống")
+
+        changed = []
+        # Luôn xử lý theo thứ tự product_id để hai đơn không khóa chéo nhau
+        for product_id in sorted(wanted):
+            product, quantity = wanted[product_id]
+            current = held.pop(product_id, None)
+            delta = quantity - (current.quantity if current else 0)
+            if delta > 0 and not _take_stock(product_id, delta):
+                raise OutOfStock(product, quantity)
+            if delta < 0:
+                _return_stock(product_id, -delta)
+            if delta:
+                changed.append(product_id)
+
+            if current is None:
+                StockReservation.objects.create(
+                    order=order, product_id=product_id, quantity=quantity, expires_at=expires_at
+                )
+            elif delta:
+                StockReservation.objects.filter(pk=current.pk).update(quantity=quantity)
+
+        # Sản phẩm đã bị bỏ khỏi giỏ -> trả hàng
+        for reservation in held.values():
+            StockReservation.objects.filter(pk=reservation.pk).delete()
+            _return_stock(reservation.product_id, reservation.quantity)
+            changed.append(reservation.product_id)
+        _stock_changed(changed)
+    return expires_at
+
+
+def release_expired(now=None, batch_size=500):
+    """Trả stock cho mọi khoản giữ đã quá hạn. Trả về số khoản đã giải phóng."""
+    now = now or timezone.now()
+    total = 0
+    while True:
+        batch = list(StockReservation.objects.filter(expires_at__lt=now).order_by("pk")[:batch_size])
+        if not batch:
+            return total
+        total += release_reservations(batch, expired_before=now)
+        if len(batch) < batch_size:
+            return total
+
+
+# ====================== THANH TOÁN ======================
+def complete_checkout(order, address="", city="", state="", zipcode=""):
+    """Hoàn tất đơn: chốt stock đã giữ, lưu địa chỉ giao hàng, sinh transaction_id."""
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(pk=order.pk)
+        if order.complete:
+            raise CheckoutError("Đơn hàng đã được thanh toán")
+
+        reserve_order(order)
+        # Stock đã bị trừ khi giữ hàng -> chỉ cần xóa khoản giữ
+        order.reservations.all().delete()
+        # Chốt đơn giá: lịch sử đơn / doanh số không đổi theo giá mới về sau
+        items = list(order.order_items.select_related("product"))
+        for item in items:
+            item.unit_price = item.product.price
+        OrderItem.objects.bulk_update(items, ["unit_price"])
+        order.total_price = sum(item.get_total for item in items)
+        order.total_items = sum(item.quantity for item in items)
+
+        ShippingAddress.objects.create(
+            user_id=order.user_id, order=order, address=address, city=city, state=state, zipcode=zipcode
+        )
+        order.complete = True
+        order.transaction_id = uuid.uuid4().hex
+        order.completed_at = timezone.now()
+        order.save(update_fields=["complete", "transaction_id", "completed_at", "total_price", "total_items"])
+        # Tổng của khách (trang hồ sơ / lịch sử) cập nhật ngay, không chờ worker
+        analytics.add_customer_order(order)
+        tasks.send_order_confirmation.enqueue(order.pk, key=f"order-confirmation:{order.pk}")
+        tasks.record_order_sales.enqueue(order.pk, key=f"analytics:order:{order.pk}")
+        tasks.refresh_recommendations.enqueue(
+            [item.product_id for item in items], key=f"recommendations:order:{order.pk}",
+        )
+    return order
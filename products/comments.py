@@ -0,0 +1,72 @@
+# products/comments.py
+"""Bình luận: phân trang, đếm sẵn ``Product.comment_count`` và duyệt hàng loạt.
+
+* ``Product.comment_count`` = số bình luận đang hiển thị. Thêm một bình luận
+  -> ``UPDATE ... SET comment_count = comment_count + 1`` (signal); các thao
+  tác hàng loạt gọi ``refresh_counts`` (một ``UPDATE`` với subquery đếm).
+* ``COMMENT_MODERATION = True``: bình luận mới ở trạng thái chờ duyệt
+  (``is_active=False``); admin duyệt / ẩn nhiều bình luận bằng ``set_active``.
+* Trang bình luận dùng ``CursorPaginator`` (không ``COUNT``/``OFFSET``),
+  tổng số lấy từ ``comment_count``.
+"""
+from django.conf import settings
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .cache import bump_generation
+from .models import Comment, Product
+from .pagination import CursorPaginator
+
+PER_PAGE = 10
+
+
+def requires_approval():
+    return getattr(settings, "COMMENT_MODERATION", False)
+
+
+def page(product_id, cursor=None, per_page=PER_PAGE):
+    return CursorPaginator(
+        Comment.objects.filter(product_id=product_id, is_active=True).select_related("user"),
+        per_page,
+        ordering=("-created_at", "-id"),
+    ).page(cursor)
+
+
+def _changed(product_ids):
+    for pk in product_ids:
+        bump_generation("comments", pk)
+        # Product đã cache (get_cached_product) chứa comment_count cũ
+        bump_generation("product", pk)
+
+
+def increment(product_id, delta=1):
+    Product.objects.filter(pk=product_id).update(comment_count=F("comment_count") + delta)
+    _changed([product_id])
+
+
+def refresh_counts(product_ids):
+    """Đếm lại ``comment_count`` cho các sản phẩm trong một câu ``UPDATE``."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return 0
+    active = (
+        Comment.objects.filter(product=OuterRef("pk"), is_active=True)
+        .order_by().values("product").annotate(n=Count("id")).values("n")
+    )
+    updated = Product.objects.filter(pk__in=product_ids).update(
+        comment_count=Coalesce(Subquery(active), Value(0))
+    )
+    _changed(product_ids)
+    return updated
+
+
+def set_active(queryset, active):
+    """Duyệt (``True``) hoặc ẩn (``False``) các bình luận trong ``queryset``.
+
+    Một ``UPDATE`` cho bình luận + một ``UPDATE`` đếm lại; trả về số bình luận đã đổi.
+    """
+    queryset = queryset.filter(~Q(is_active=active))
+    product_ids = set(queryset.values_list("product_id", flat=True))
+    updated = queryset.update(is_active=active)
+    refresh_counts(product_ids)
+    return updated
@@ -0,0 +1,25 @@
+# products/currency.py
+"""Định dạng tiền VNĐ: ``1250000`` -> ``"1,250,000 VNĐ"``.
+
+Cùng kết quả với ``intcomma`` (không bật ``USE_THOUSAND_SEPARATOR``) nhưng
+chỉ là một ``format(int, ",")``; giá trong catalog lặp lại nhiều nên kết quả
+được nhớ bằng ``lru_cache`` theo số nguyên.
+"""
+from functools import lru_cache
+
+SUFFIX = "VNĐ"
+
+
+@lru_cache(maxsize=4096)
+def _format(amount):
+    return f"{amount:,} {SUFFIX}"
+
+
+def format_vnd(value):
+    """Số (int / Decimal / chuỗi số) -> chuỗi VNĐ; None / "" -> ""."""
+    if value is None or value == "":
+        return ""
+    try:
+        return _format(int(value))
+    except (TypeError, ValueError):
+        return str(value)
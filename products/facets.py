@@ -0,0 +1,135 @@
+# products/facets.py
+"""Bộ lọc + đếm facet cho danh sách sản phẩm (hãng, khoảng giá, còn hàng).
+
+Mỗi facet đếm trên tập đã áp dụng mọi bộ lọc *khác* (faceting kiểu
+"disjunctive"): chọn hãng HP vẫn thấy số lượng của Lenovo để chuyển qua.
+Toàn bộ số đếm nằm trong một câu ``SELECT COUNT(...) FILTER (WHERE ...)``
+(``aggregate`` với ``Count(filter=Q)``), không ``GROUP BY`` riêng cho từng facet.
+"""
+from dataclasses import dataclass
+
+from django.db.models import Count, Q
+
+from .models import Product
+
+# (khóa, nhãn, giá tối thiểu, giá tối đa). Link khoảng giá gửi ``?price=<khóa>``
+# và lọc nửa mở [min, max): sản phẩm đúng 10 triệu chỉ nằm trong "10 - 20 triệu".
+# min_price / max_price người dùng tự nhập thì gồm cả hai đầu.
+PRICE_BUCKETS = [
+    ("under-5m", "Dưới 5 triệu", None, 5_000_000),
+    ("5m-10m", "5 - 10 triệu", 5_000_000, 10_000_000),
+    ("10m-20m", "10 - 20 triệu", 10_000_000, 20_000_000),
+    ("over-20m", "Trên 20 triệu", 20_000_000, None),
+]
+
+
+@dataclass
+class CatalogFilters:
+    query: str = ""
+    brand: str = ""
+    min_price: int = None
+    max_price: int = None
+    in_stock: bool = False
+    price_bucket: str = ""  # khóa trong PRICE_BUCKETS khi chọn qua link khoảng giá
+
+
+def _int_or_none(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_filters(params):
+    brand = params.get("brand") or ""
+    filters = CatalogFilters(
+        query=params.get("q") or "",
+        brand="" if brand == "all" else brand,
+        min_price=_int_or_none(params.get("min_price")),
+        max_price=_int_or_none(params.get("max_price")),
+        in_stock=params.get("in_stock") == "1",
+    )
+    # Khoảng giá có sẵn chỉ áp dụng khi không tự nhập min / max
+    if filters.min_price is None and filters.max_price is None:
+        for key, _, low, high in PRICE_BUCKETS:
+            if params.get("price") == key:
+                filters.price_bucket, filters.min_price, filters.max_price = key, low, high
+    return filters
+
+
+def _price_q(min_price, max_price, half_open=False):
+    q = Q()
+    if min_price is not None:
+        q &= Q(price__gte=min_price)
+    if max_price is not None:
+        q &= Q(price__lt=max_price) if half_open else Q(price__lte=max_price)
+    return q
+
+
+def conditions(filters):
+    """Điều kiện của từng facet đang được chọn: ``{"brand": Q, "price": Q, "stock": Q}``."""
+    return {
+        "brand": Q(brand=filters.brand) if filters.brand else Q(),
+        "price": _price_q(filters.min_price, filters.max_price, half_open=bool(filters.price_bucket)),
+        "stock": Q(stock__gt=0) if filters.in_stock else Q(),
+    }
+
+
+def apply(queryset, filters):
+    return queryset.filter(*conditions(filters).values())
+
+
+def facet_counts(base, filters):
+    """Đếm facet trên ``base`` (đã lọc theo từ khóa) trong một truy vấn."""
+    return _build_result(base.order_by().aggregate(**_aggregates(filters)), filters)
+
+
+async def afacet_counts(base, filters):
+    return _build_result(await base.order_by().aaggregate(**_aggregates(filters)), filters)
+
+
+def _count(q):
+    # Q() rỗng -> đếm tất cả (không sinh FILTER (WHERE ...) rỗng)
+    return Count("id", filter=q if q else None)
+
+
+def _aggregates(filters):
+    cond = conditions(filters)
+
+    def others(*names):
+        q = Q()
+        for name, value in cond.items():
+            if name not in names:
+                q &= value
+        return q
+
+    aggregates = {}
+    for i, (value, _) in enumerate(Product.BRAND_CHOICES):
+        aggregates[f"brand_{i}"] = _count(Q(brand=value) & others("brand"))
+    for i, (_, _, low, high) in enumerate(PRICE_BUCKETS):
+        aggregates[f"price_{i}"] = _count(_price_q(low, high, half_open=True) & others("price"))
+    aggregates["in_stock"] = _count(Q(stock__gt=0) & others("stock"))
+    aggregates["brand_all"] = _count(others("brand"))
+    return aggregates
+
+
+def _build_result(row, filters):
+    return {
+        "brands": [
+            {"value": value, "label": label, "count": row[f"brand_{i}"], "selected": value == filters.brand}
+            for i, (value, label) in enumerate(Product.BRAND_CHOICES)
+        ],
+        "brand_total": row["brand_all"],
+        "prices": [
+            {
+                "key": key,
+                "label": label,
+                "min": low,
+                "max": high,
+                "count": row[f"price_{i}"],
+                "selected": key == filters.price_bucket,
+            }
+            for i, (key, label, low, high) in enumerate(PRICE_BUCKETS)
+        ],
+        "in_stock": row["in_stock"],
+    }
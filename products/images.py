@@ -0,0 +1,131 @@
+# products/images.py
+"""Sinh ảnh phái sinh (thu nhỏ + WebP) cho ảnh upload bằng Pillow.
+
+* Mỗi ảnh gốc -> nhiều chiều rộng (``IMAGE_DERIVATIVE_WIDTHS`` theo loại),
+  mỗi chiều rộng một bản WebP và một bản dự phòng (JPEG, hoặc PNG nếu có
+  kênh alpha). Không phóng to quá kích thước gốc.
+* Tên file phái sinh là hash nội dung ảnh gốc (``derivatives/<hash>-<w>w.webp``)
+  nên nội dung không bao giờ đổi dưới cùng một URL -> cache vĩnh viễn được.
+* Việc sinh ảnh là task nền ``images.generate`` (products/tasks.py), request
+  upload không phải chờ.
+* Template dùng ``{% responsive_image %}`` (products/templatetags/responsive_images.py)
+  để in ``<picture>`` với ``srcset``; chưa có bản phái sinh thì dùng ảnh gốc.
+"""
+import hashlib
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .cache import bump_generation
+
+# model -> (tên field ảnh, loại kích thước)
+IMAGE_FIELDS = {
+    "products.Product": ("image", "product"),
+    "products.Blog": ("image", "blog"),
+    "users.User": ("avatar", "avatar"),
+}
+DEFAULT_WIDTHS = {
+    "product": (320, 640, 960),
+    "blog": (480, 960, 1440),
+    "avatar": (64, 128, 256),
+}
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg", "png": "png"}
+CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+DERIVATIVE_DIR = "derivatives"
+
+
+def widths_for(kind):
+    return getattr(settings, "IMAGE_DERIVATIVE_WIDTHS", {}).get(kind, DEFAULT_WIDTHS[kind])
+
+
+def _cache_key(name):
+    return "imgderiv:" + hashlib.md5(name.encode()).hexdigest()
+
+
+def _encode(image, fmt):
+    out = BytesIO()
+    if fmt == "webp":
+        image.save(out, "WEBP", quality=80, method=4)
+    elif fmt == "jpeg":
+        image.convert("RGB").save(out, "JPEG", quality=82, optimize=True, progressive=True)
+    else:
+        image.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+
+# ====================== SINH ẢNH ======================
+def generate(name, kind, force=False):
+    """Sinh (hoặc sinh lại khi ``force``) các bản phái sinh của file ``name``.
+
+    Trả về danh sách ``ImageDerivative``; rỗng nếu file không tồn tại.
+    """
+    from .models import ImageDerivative
+
+    if not name or not default_storage.exists(name):
+        return []
+    if not force:
+        existing = list(ImageDerivative.objects.filter(source=name))
+        if existing:
+            return existing
+
+    with default_storage.open(name, "rb") as fh:
+        data = fh.read()
+    digest = hashlib.sha256(data).hexdigest()[:16]
+
+    with Image.open(BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+    fallback = "png" if image.mode == "RGBA" else "jpeg"
+
+    rows = []
+    for width in sorted({min(w, image.width) for w in widths_for(kind)}):
+        height = max(1, round(image.height * width / image.width))
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in ("webp", fallback):
+            target = f"{DERIVATIVE_DIR}/{digest}-{width}w.{EXTENSIONS[fmt]}"
+            if not default_storage.exists(target):
+                target = default_storage.save(target, ContentFile(_encode(resized, fmt)))
+            rows.append(ImageDerivative(
+                source=name, digest=digest, format=fmt, width=width, height=height, file=target,
+            ))
+
+    with transaction.atomic():
+        ImageDerivative.objects.filter(source=name).delete()
+        ImageDerivative.objects.bulk_create(rows)
+    cache.delete(_cache_key(name))
+    # Fragment / trang đã cache đang trỏ tới ảnh gốc -> làm mới
+    bump_generation("images")
+    return rows
+
+
+def schedule(name, kind):
+    """Xếp task sinh ảnh cho ``name`` (chạy sau khi transaction hiện tại commit)."""
+    from .tasks import generate_image_derivatives
+
+    if name:
+        # Tên file upload là duy nhất -> mỗi ảnh chỉ cần một task
+        generate_image_derivatives.enqueue(name, kind, key=f"images:{name}")
+
+
+# ====================== TRA CỨU ======================
+def derivatives_for(name):
+    """``[(format, width, url), ...]`` theo width tăng dần, có cache."""
+    from .models import ImageDerivative
+
+    key = _cache_key(name)
+    rows = cache.get(key)
+    if rows is None:
+        rows = [
+            (fmt, width, default_storage.url(file))
+            for fmt, width, file in ImageDerivative.objects.filter(source=name)
+            .order_by("width").values_list("format", "width", "file")
+        ]
+        # Chưa có bản phái sinh -> chỉ nhớ ngắn để sớm thấy kết quả của worker
+        cache.set(key, rows, None if rows else 60)
+    return rows
@@ -0,0 +1,257 @@
+# products/importexport.py
+"""Nhập / xuất sản phẩm hàng loạt dạng CSV hoặc JSONL.
+
+* Nhập: đọc từng dòng (không nạp cả file vào bộ nhớ), kiểm tra theo các
+  field của ``Product`` (kể cả ``BRAND_CHOICES``), rồi upsert theo ``sku``
+  từng lô bằng ``bulk_create(update_conflicts=True)``. Sản phẩm đã có chỉ
+  đổi các cột có giá trị trong file; cột thiếu / ô trống giữ nguyên giá trị
+  cũ (sản phẩm mới thì nhận giá trị mặc định).
+* ``stock`` trong file là số hàng thực có trong kho, gồm cả phần đang giữ
+  cho các giỏ chưa thanh toán (``StockReservation``); ``Product.stock`` chỉ
+  lưu phần còn bán được, nên khi nhập trừ đi phần đang giữ, khi xuất cộng
+  lại. Số nhập nhỏ hơn phần đang giữ bị từ chối.
+* Xuất: generator sinh từng dòng từ ``queryset.iterator()`` để đưa thẳng
+  vào ``StreamingHttpResponse`` hoặc ghi ra file.
+"""
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.http import StreamingHttpResponse
+
+from .models import Product, StockReservation
+
+FORMATS = ("csv", "jsonl")
+FIELDS = ["sku", "name", "brand", "description", "price", "delprice", "stock"]
+UPDATE_FIELDS = ["name", "brand", "description", "price", "delprice", "stock", "updated_at"]
+MAX_REPORTED_ERRORS = 1000
+
+# Cho phép ghi nhãn hiển thị ("Khác") thay cho giá trị lưu trong DB ("Other")
+BRAND_LABELS = {label: value for value, label in Product.BRAND_CHOICES}
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+
+    @property
+    def processed(self):
+        return self.created + self.updated + self.failed
+
+    def add_error(self, line, messages):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, messages))
+
+
+# ====================== ĐỌC & KIỂM TRA ======================
+def iter_records(stream, fmt):
+    """Sinh ``(số dòng, dict)`` từ một luồng văn bản CSV/JSONL."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield line_no, ValueError(f"JSON không hợp lệ: {exc}")
+                continue
+            if not isinstance(record, dict):
+                yield line_no, ValueError("Mỗi dòng phải là một object JSON")
+                continue
+            yield line_no, record
+    else:
+        raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+
+
+def clean_record(record):
+    """Kiểm tra các cột có giá trị của một dòng; trả về dict đã chuẩn hóa.
+
+    Cột thiếu hoặc ô trống không có trong kết quả (``complete_new`` bổ sung
+    khi đó là sản phẩm mới).
+    """
+    cleaned, errors = {}, {}
+    brand = (record.get("brand") or "").strip()
+    record = {**record, "brand": BRAND_LABELS.get(brand, brand)}
+
+    for name in FIELDS:
+        field = Product._meta.get_field(name)
+        value = record.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in ("", None):
+            continue
+        try:
+            cleaned[name] = field.clean(value, None)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+
+    if not errors and not cleaned.get("sku"):
+        errors["sku"] = ["Thiếu mã SKU."]
+    if errors:
+        raise ValidationError(errors)
+    return cleaned
+
+
+def complete_new(values):
+    """Điền giá trị mặc định cho sản phẩm mới; thiếu trường bắt buộc -> ValidationError."""
+    complete, errors = {}, {}
+    for name in FIELDS:
+        if name in values:
+            complete[name] = values[name]
+            continue
+        field = Product._meta.get_field(name)
+        if field.has_default():
+            complete[name] = field.get_default()
+        elif field.null:
+            complete[name] = None
+        elif field.blank:
+            complete[name] = ""
+        else:
+            errors[name] = ["Trường này là bắt buộc."]
+    if errors:
+        raise ValidationError(errors)
+    return complete
+
+
+def _report(result, line_no, exc):
+    result.add_error(line_no, [f"{field}: {'; '.join(msgs)}" for field, msgs in exc.message_dict.items()])
+
+
+# ====================== NHẬP ======================
+def _reserved():
+    """Số hàng đang giữ của mỗi sản phẩm (subquery theo ``OuterRef("pk")``)."""
+    held = (
+        StockReservation.objects.filter(product=OuterRef("pk"))
+        .order_by().values("product").annotate(n=Sum("quantity")).values("n")
+    )
+    return Coalesce(Subquery(held), 0)
+
+
+def _flush(batch, result):
+    """Upsert một lô ``{sku: (số dòng, dict)}``."""
+    from .signals import products_changed_in_bulk
+
+    skus = list(batch)
+    with transaction.atomic():
+        # Khóa sản phẩm đã có: checkout không trừ stock chen vào giữa lúc đọc và ghi
+        current = {
+            row["sku"]: row
+            for row in Product.objects.select_for_update()
+            .filter(sku__in=skus).annotate(reserved=_reserved()).values(*FIELDS, "reserved")
+        }
+        products = []
+        for sku, (line_no, values) in batch.items():
+            row = current.get(sku)
+            try:
+                if row is None:
+                    values = complete_new(values)
+                else:
+                    if "stock" in values:
+                        if values["stock"] < row["reserved"]:
+                            raise ValidationError({"stock": [
+                                f"Đang giữ {row['reserved']} sản phẩm cho giỏ chưa thanh toán, "
+                                f"không thể đặt tồn kho {values['stock']}."
+                            ]})
+                        values = {**values, "stock": values["stock"] - row["reserved"]}
+                    values = {**{name: row[name] for name in FIELDS}, **values}
+            except ValidationError as exc:
+                _report(result, line_no, exc)
+                continue
+            products.append(Product(**values))
+            if row is None:
+                result.created += 1
+            else:
+                result.updated += 1
+        if not products:
+            return
+        Product.objects.bulk_create(
+            products,
+            update_conflicts=True,
+            unique_fields=["sku"],
+            update_fields=UPDATE_FIELDS,
+        )
+        ids = list(Product.objects.filter(sku__in=[p.sku for p in products]).values_list("id", flat=True))
+        products_changed_in_bulk(ids)
+
+
+def import_products(stream, fmt, batch_size=500, progress=None):
+    """Nhập sản phẩm từ luồng văn bản. ``progress(result)`` được gọi sau mỗi lô."""
+    result = ImportResult()
+    batch = {}
+    for line_no, record in iter_records(stream, fmt):
+        if isinstance(record, Exception):
+            result.add_error(line_no, [str(record)])
+            continue
+        try:
+            values = clean_record(record)
+        except ValidationError as exc:
+            _report(result, line_no, exc)
+            continue
+
+        sku = values["sku"]
+        if sku in batch:
+            # SKU trùng trong cùng lô: cột của dòng sau ghi đè dòng trước
+            result.updated += 1
+            values = {**batch[sku][1], **values}
+        batch[sku] = (line_no, values)
+        if len(batch) >= batch_size:
+            _flush(batch, result)
+            batch = {}
+            if progress:
+                progress(result)
+
+    if batch:
+        _flush(batch, result)
+        if progress:
+            progress(result)
+    return result
+
+
+# ====================== XUẤT ======================
+class _Echo:
+    """Đối tượng giả file cho csv.writer: trả luôn chuỗi thay vì ghi vào buffer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_export(queryset, fmt, chunk_size=2000):
+    """Sinh từng dòng CSV/JSONL cho ``queryset`` mà không nạp hết vào bộ nhớ."""
+    # stock xuất ra = còn bán được + đang giữ, để nhập lại đúng file này không đổi gì
+    columns = [name for name in FIELDS if name != "stock"]
+    rows = (
+        queryset.order_by("id").annotate(on_hand=F("stock") + _reserved())
+        .values_list(*columns, "on_hand").iterator(chunk_size=chunk_size)
+    )
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        yield writer.writerow(FIELDS)
+        for row in rows:
+            yield writer.writerow(row)
+    elif fmt == "jsonl":
+        for row in rows:
+            record = dict(zip(FIELDS, row))
+            for key in ("price", "delprice"):
+                if record[key] is not None:
+                    record[key] = int(record[key])
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+    else:
+        raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+
+
+def export_response(queryset, fmt, filename="products"):
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(iter_export(queryset, fmt), content_type=f"{content_type}; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{fmt}"'
+    return response
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from products import query_audit
+from products.seed import seed
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Gọi các trang nóng trên bộ dữ liệu mẫu, EXPLAIN đúng SQL mà view chạy và "
+        "đánh dấu các truy vấn quét toàn bảng"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--no-seed", action="store_true", help="Dùng dữ liệu đang có thay vì seed tạm")
+        parser.add_argument("--products", type=int, default=2000)
+        parser.add_argument("--verbose-plan", action="store_true", help="In toàn bộ query plan")
+        parser.add_argument("--fail-on-scan", action="store_true", help="Thoát với mã lỗi nếu có cảnh báo (CI)")
+
+    def handle(self, *args, **options):
+        flagged = 0
+        try:
+            with transaction.atomic():
+                if not options["no_seed"]:
+                    # Dữ liệu seed nằm trong transaction và bị rollback ở cuối
+                    seed(prefix="audit", products=options["products"], users=200, orders=1000, comments=5000,
+                         blogs=500, feedbacks=500)
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+                flagged = self.audit(options["verbose_plan"])
+                raise Rollback
+        except Rollback:
+            pass
+
+        if flagged:
+            self.stdout.write(self.style.WARNING(f"{flagged} truy vấn cần xem lại."))
+            if options["fail_on_scan"]:
+                raise CommandError("Phát hiện truy vấn quét toàn bảng.")
+        else:
+            self.stdout.write(self.style.SUCCESS("Tất cả truy vấn đều dùng chỉ mục."))
+
+    def audit(self, verbose):
+        ctx = query_audit.build_context()
+        if ctx.product is None or ctx.order is None or ctx.blog is None:
+            raise CommandError("Không đủ dữ liệu để audit (thử bỏ --no-seed).")
+
+        flagged = 0
+        for page, status, queries in query_audit.audit_pages(ctx):
+            if status >= 400:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f"[!] {page.name}: HTTP {status}"))
+                continue
+            self.stdout.write(f"{page.name} ({len(queries)} truy vấn)")
+            for sql, plan in queries:
+                problems, notes = query_audit.analyze_plan(plan, connection.vendor)
+                label = " ".join(sql.split())[:100]
+                if problems:
+                    flagged += 1
+                    self.stdout.write(self.style.WARNING(f"  [!] {label}: {', '.join(problems + notes)}"))
+                elif notes:
+                    self.stdout.write(f"  [ok] {label} ({', '.join(notes)})")
+                elif verbose:
+                    self.stdout.write(f"  [ok] {label}")
+                if verbose or problems:
+                    for line in plan.splitlines():
+                        self.stdout.write(f"        {line}")
+        return flagged
@@ -0,0 +1,81 @@
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from products import checkout
+from products.models import Order, OrderItem, Product
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark: nhiều khách cùng thanh toán một SKU 'hot'. "
+        "Kiểm tra không bán vượt tồn kho và in thông lượng / độ trễ."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=300, help="Số khách thanh toán")
+        parser.add_argument("--stock", type=int, default=100, help="Tồn kho ban đầu của SKU")
+        parser.add_argument("--quantity", type=int, default=1, help="Số lượng mỗi khách mua")
+        parser.add_argument("--concurrency", type=int, default=32, help="Số thread chạy song song")
+        parser.add_argument("--keep", action="store_true", help="Không xóa dữ liệu benchmark sau khi chạy")
+
+    def handle(self, *args, **options):
+        clients, stock, quantity = options["clients"], options["stock"], options["quantity"]
+        tag = uuid.uuid4().hex[:8]
+
+        product = Product.objects.create(
+            name=f"Flash sale {tag}", brand="Other", price=100000, stock=stock, sku=f"bench-{tag}"
+        )
+        users = User.objects.bulk_create([User(username=f"bench-{tag}-{i}") for i in range(clients)])
+        users = list(User.objects.filter(username__startswith=f"bench-{tag}-"))
+        orders = Order.objects.bulk_create([Order(user=u) for u in users])
+        orders = list(Order.objects.filter(user__in=users, complete=False))
+        OrderItem.objects.bulk_create([OrderItem(order=o, product=product, quantity=quantity) for o in orders])
+        Order.objects.filter(pk__in=[o.pk for o in orders]).refresh_totals()
+
+        def run(order):
+            close_old_connections()
+            start = time.perf_counter()
+            try:
+                checkout.complete_checkout(order, address="bench")
+                ok = True
+            except checkout.OutOfStock:
+                ok = False
+            finally:
+                connection.close()
+            return ok, time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(run, orders))
+        elapsed = time.perf_counter() - start
+
+        sold = sum(1 for ok, _ in results if ok)
+        latencies = sorted(duration * 1000 for _, duration in results)
+        product.refresh_from_db()
+        expected_sold = min(clients, stock // quantity)
+        oversold = product.stock < 0 or sold * quantity + product.stock != stock
+
+        self.stdout.write(f"Backend: {connection.vendor}, {clients} khách, {options['concurrency']} thread")
+        self.stdout.write(f"Thành công: {sold} (kỳ vọng {expected_sold}), hết hàng: {clients - sold}")
+        self.stdout.write(f"Tồn kho còn lại: {product.stock}")
+        self.stdout.write(f"Thông lượng: {clients / elapsed:.1f} checkout/s trong {elapsed:.2f}s")
+        self.stdout.write(
+            f"Độ trễ ms: p50={statistics.median(latencies):.1f} "
+            f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f} max={latencies[-1]:.1f}"
+        )
+
+        if not options["keep"]:
+            Order.objects.filter(user__in=users).delete()
+            User.objects.filter(pk__in=[u.pk for u in users]).delete()
+            product.delete()
+
+        if oversold or sold != expected_sold:
+            self.stderr.write(self.style.ERROR("LỖI: số lượng bán ra không khớp tồn kho!"))
+            raise SystemExit(1)
+        self.stdout.write(self.style.SUCCESS("OK: không bán vượt tồn kho."))
@@ -0,0 +1,122 @@
+import random
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+from django.contrib.humanize.templatetags.humanize import intcomma
+from django.core.management.base import BaseCommand, CommandError
+from django.template import Context, Engine
+
+LIBRARIES = {
+    "currency": "products.templatetags.currency",
+    "humanize": "django.contrib.humanize.templatetags.humanize",
+}
+
+# Cùng một lưới sản phẩm, chỉ khác cách định dạng giá
+GRID = """{%% load %(library)s %%}{%% for product in products %%}
+<div class="card"><h5>{{ product.name }}</h5>
+<p class="text-primary">%(price)s</p>
+{%% if %(has_delprice)s %%}<p class="text-danger">%(delprice)s</p>{%% endif %%}
+</div>{%% endfor %%}"""
+
+VARIANTS = {
+    # Như product_list.html trước đây: phương thức model + intcomma trên Decimal
+    "method+intcomma": {
+        "library": "humanize",
+        "price": "{{ product.legacy_price }}",
+        "has_delprice": "product.legacy_delprice",
+        "delprice": "{{ product.legacy_delprice }}",
+    },
+    "filter vnd": {
+        "library": "currency",
+        "price": "{{ product.price|vnd }}",
+        "has_delprice": "product.delprice",
+        "delprice": "{{ product.delprice|vnd }}",
+    },
+}
+
+
+class BenchProduct:
+    """Các field mà lưới dùng + cách định dạng giá cũ (mỗi lần gọi chạy lại intcomma)."""
+
+    def __init__(self, name, price, delprice):
+        self.name, self.price, self.delprice = name, price, delprice
+
+    def legacy_price(self):
+        return f"{intcomma(int(self.price))} VNĐ"
+
+    def legacy_delprice(self):
+        if self.delprice:
+            return f"{intcomma(self.delprice)} VNĐ"
+        return ""
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-benchmark render lưới N sản phẩm (không chạm DB): định dạng giá "
+        "bằng phương thức + intcomma so với filter |vnd, và loader thường so với cached loader"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--items", type=int, default=1000, help="Số sản phẩm trong lưới")
+        parser.add_argument("--repeat", type=int, default=20, help="Số lần render mỗi biến thể")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options["items"] < 1 or options["repeat"] < 1:
+            raise CommandError("--items và --repeat phải >= 1")
+        rng = random.Random(options["seed"])
+        # Giá lặp lại nhiều như catalog thật (bội số 10.000đ)
+        products = [
+            BenchProduct(
+                f"Sản phẩm {i}", Decimal(rng.randrange(10, 5000) * 10_000),
+                rng.randrange(10, 5000) * 10_000 if i % 2 else None,
+            )
+            for i in range(options["items"])
+        ]
+        context = {"products": products}
+
+        with tempfile.TemporaryDirectory() as tmp:
+            names = {}
+            for label, parts in VARIANTS.items():
+                names[label] = f"{label.replace(' ', '_').replace('+', '_')}.html"
+                Path(tmp, names[label]).write_text(GRID % parts, encoding="utf-8")
+
+            plain = Engine(dirs=[tmp], libraries=LIBRARIES, loaders=["django.template.loaders.filesystem.Loader"])
+            cached = Engine(dirs=[tmp], libraries=LIBRARIES, loaders=[
+                ("django.template.loaders.cached.Loader", ["django.template.loaders.filesystem.Loader"]),
+            ])
+
+            outputs = {}
+            results = []
+            for label, name in names.items():
+                for loader, engine in (("thường", plain), ("cached", cached)):
+                    timings = []
+                    for _ in range(options["repeat"]):
+                        # Như một request: lấy template qua loader rồi render
+                        start = time.perf_counter()
+                        html = engine.get_template(name).render(Context(context))
+                        timings.append((time.perf_counter() - start) * 1000)
+                    outputs[label] = html
+                    results.append((label, loader, statistics.median(timings)))
+
+            # Riêng phần đọc + parse template (cái cached loader bỏ được)
+            lookups = {}
+            for loader, engine in (("thường", plain), ("cached", cached)):
+                start = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    engine.get_template(names["filter vnd"])
+                lookups[loader] = (time.perf_counter() - start) * 1000 / options["repeat"]
+
+        if len(set(outputs.values())) != 1:
+            raise CommandError("Các biến thể render ra HTML khác nhau")
+
+        self.stdout.write(f"Lưới {options['items']} sản phẩm, {options['repeat']} lần render mỗi biến thể (trung vị):")
+        baseline = results[0][2]
+        for label, loader, median in results:
+            self.stdout.write(f"  {label:<16} loader {loader:<7} {median:8.2f} ms  x{baseline / median:.2f}")
+        self.stdout.write(
+            f"get_template(): loader thường {lookups['thường']:.3f} ms, cached {lookups['cached']:.3f} ms / lần"
+        )
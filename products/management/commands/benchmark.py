@@ -0,0 +1,107 @@
+import platform
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from products import benchmark
+from products.seed import DEFAULTS, seed
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark các endpoint công khai trên CSDL test tạm với dữ liệu seed: "
+        "p50/p95/p99, truy vấn/request, throughput; lưu và so sánh baseline JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scenarios", default=",".join(benchmark.SCENARIOS),
+                            help="Danh sách kịch bản, cách nhau bởi dấu phẩy")
+        parser.add_argument("--driver", choices=["wsgi", "asgi", "both"], default="wsgi")
+        parser.add_argument("--requests", type=int, default=200, help="Số request mỗi kịch bản")
+        parser.add_argument("--concurrency", type=int, default=4)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--async-views", action="store_true",
+                            help="Driver ASGI dùng view async (products/async_views.py)")
+        parser.add_argument("--cold-cache", action="store_true", help="Xóa cache trước mỗi kịch bản")
+        for name, default in DEFAULTS.items():
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, default=default,
+                                help=f"Số lượng {name} sinh ra (mặc định {default})")
+        parser.add_argument("--save-baseline", metavar="PATH", help="Ghi kết quả ra file JSON")
+        parser.add_argument("--baseline", metavar="PATH", help="So sánh với baseline JSON")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Tỉ lệ hồi quy cho phép so với baseline (0.25 = 25%%)")
+
+    def handle(self, *args, **options):
+        names = [n.strip() for n in options["scenarios"].split(",") if n.strip()]
+        unknown = set(names) - set(benchmark.SCENARIOS)
+        if unknown:
+            raise CommandError(f"Kịch bản không tồn tại: {', '.join(sorted(unknown))}")
+        drivers = ["wsgi", "asgi"] if options["driver"] == "both" else [options["driver"]]
+        volumes = {name: options[name] for name in DEFAULTS}
+
+        setup_test_environment()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            cache.clear()
+            self.stdout.write(f"Seed dữ liệu: {seed(seed=options['seed'], **volumes)}")
+            data = benchmark.BenchData()
+            results = []
+            for name in names:
+                for driver in drivers:
+                    if options["cold_cache"]:
+                        cache.clear()
+                    args = (benchmark.SCENARIOS[name], data, options["requests"],
+                                 options["concurrency"], options["seed"])
+                    if driver == "wsgi":
+                        result = benchmark.run_wsgi(*args)
+                    elif options["async_views"]:
+                        with benchmark.use_async_views():
+                            result = benchmark.run_asgi(*args, label="asgi-async")
+                    else:
+                        result = benchmark.run_asgi(*args)
+                    results.append(result)
+                    self.report(result)
+            mismatches = []
+            if len(drivers) > 1:
+                mismatches = benchmark.query_mismatches(
+                    [benchmark.SCENARIOS[name] for name in names], data, options["seed"], options["async_views"],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for line in mismatches:
+            self.stderr.write(self.style.ERROR(f"LỆCH TRUY VẤN {line}"))
+
+        meta = {
+            "python": platform.python_version(),
+            "vendor": connection.vendor,
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "async_views": options["async_views"],
+            "volumes": volumes,
+        }
+        if options["save_baseline"]:
+            benchmark.save_baseline(results, options["save_baseline"], meta)
+            self.stdout.write(f"Đã lưu baseline: {options['save_baseline']}")
+
+        if options["baseline"]:
+            regressions = benchmark.compare(results, options["baseline"], options["threshold"])
+            if regressions:
+                for line in regressions:
+                    self.stderr.write(self.style.ERROR(f"HỒI QUY {line}"))
+                raise CommandError(f"{len(regressions)} chỉ số vượt ngưỡng {options['threshold']:.0%}.")
+            self.stdout.write(self.style.SUCCESS("Không có hồi quy so với baseline."))
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} kịch bản có số truy vấn ASGI khác WSGI.")
+
+    def report(self, r):
+        line = (
+            f"{r.scenario:<12} {r.driver:<10} n={r.requests:<5} p50={r.p50_ms:>7.2f}ms "
+            f"p95={r.p95_ms:>7.2f}ms p99={r.p99_ms:>7.2f}ms q/req={r.mean_queries:>5.1f} "
+            f"{r.throughput:>7.1f} req/s  {r.status_codes}"
+        )
+        self.stdout.write(self.style.ERROR(line) if r.errors else line)
@@ -0,0 +1,28 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from products.importexport import FORMATS, iter_export
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Xuất toàn bộ sản phẩm ra CSV hoặc JSONL (ghi dần, không nạp hết vào bộ nhớ)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, default="csv")
+        parser.add_argument("--output", "-o", help="File đích (mặc định: stdout)")
+        parser.add_argument("--brand", help="Chỉ xuất một hãng")
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options["brand"]:
+            queryset = queryset.filter(brand=options["brand"])
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as fh:
+                for chunk in iter_export(queryset, options["format"]):
+                    fh.write(chunk)
+        else:
+            for chunk in iter_export(queryset, options["format"]):
+                sys.stdout.write(chunk)
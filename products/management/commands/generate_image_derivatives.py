@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from products import images
+
+
+class Command(BaseCommand):
+    help = "Sinh ảnh thu nhỏ / WebP cho ảnh đã upload (Product, Blog, avatar users.User)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model", action="append", choices=sorted(images.IMAGE_FIELDS),
+                            help="Chỉ xử lý model này (lặp lại được); mặc định tất cả")
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--force", action="store_true", help="Sinh lại kể cả khi đã có bản phái sinh")
+
+    def handle(self, *args, **options):
+        jobs = {}
+        for label in options["model"] or images.IMAGE_FIELDS:
+            field_name, kind = images.IMAGE_FIELDS[label]
+            model = apps.get_model(label)
+            try:
+                names = list(
+                    model._default_manager.exclude(**{field_name: ""}).exclude(**{f"{field_name}__isnull": True})
+                    .values_list(field_name, flat=True).distinct()
+                )
+            except DatabaseError as exc:
+                self.stderr.write(self.style.WARNING(f"Bỏ qua {label}: {exc}"))
+                close_old_connections()
+                continue
+            for name in names:
+                jobs.setdefault(name, kind)
+            self.stdout.write(f"{label}: {len(names)} ảnh")
+
+        def run(name, kind):
+            try:
+                return len(images.generate(name, kind, force=options["force"]))
+            finally:
+                close_old_connections()
+
+        done = failed = 0
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            futures = {pool.submit(run, name, kind): name for name, kind in jobs.items()}
+            for future in as_completed(futures):
+                try:
+                    if future.result():
+                        done += 1
+                except Exception as exc:
+                    failed += 1
+                    self.stderr.write(self.style.ERROR(f"{futures[future]}: {exc}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Xong: {done} ảnh có bản phái sinh, {len(jobs) - done - failed} bỏ qua, {failed} lỗi."
+        ))
@@ -0,0 +1,45 @@
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.importexport import FORMATS, import_products
+
+
+class Command(BaseCommand):
+    help = "Nhập / cập nhật sản phẩm hàng loạt (upsert theo SKU) từ file CSV hoặc JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Đường dẫn file, hoặc '-' để đọc từ stdin")
+        parser.add_argument("--format", choices=FORMATS, help="Mặc định: đoán theo đuôi file")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+
+        def progress(result):
+            self.stdout.write(
+                f"... {result.processed} dòng: {result.created} thêm mới, "
+                f"{result.updated} cập nhật, {result.failed} lỗi"
+            )
+
+        if path == "-":
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8-sig")
+            result = import_products(stream, fmt, options["batch_size"], progress)
+        else:
+            try:
+                with open(path, encoding="utf-8-sig", newline="") as stream:
+                    result = import_products(stream, fmt, options["batch_size"], progress)
+            except FileNotFoundError:
+                raise CommandError(f"Không tìm thấy file: {path}")
+
+        for line, messages in result.errors:
+            self.stderr.write(f"Dòng {line}: {' | '.join(messages)}")
+        if result.failed > len(result.errors):
+            self.stderr.write(f"... và {result.failed - len(result.errors)} lỗi khác")
+
+        style = self.style.WARNING if result.failed else self.style.SUCCESS
+        self.stdout.write(style(
+            f"Hoàn tất: {result.created} thêm mới, {result.updated} cập nhật, {result.failed} lỗi."
+        ))
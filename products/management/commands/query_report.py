@@ -0,0 +1,77 @@
+import json
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, pct):
+    if not values:
+        return 0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = "Tổng hợp QUERY_PROFILE_LOG: số truy vấn, thời gian DB và truy vấn trùng theo từng view"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", help="Đường dẫn file log (mặc định: settings.QUERY_PROFILE_LOG)")
+        parser.add_argument("--top", type=int, default=3, help="Số truy vấn trùng hiển thị cho mỗi view")
+        parser.add_argument("--json", action="store_true", help="Xuất báo cáo dạng JSON")
+
+    def handle(self, *args, **options):
+        path = options["log"] or getattr(settings, "QUERY_PROFILE_LOG", None)
+        if not path:
+            raise CommandError("Chưa cấu hình QUERY_PROFILE_LOG và không truyền --log.")
+
+        views = defaultdict(lambda: {"queries": [], "db_ms": [], "exceeded": 0, "budget": None,
+                                     "duplicates": Counter()})
+        try:
+            with open(path, encoding="utf-8") as fh:
+                for line in fh:
+                    if not line.strip():
+                        continue
+                    entry = json.loads(line)
+                    stats = views[entry["view"]]
+                    stats["queries"].append(entry["queries"])
+                    stats["db_ms"].append(entry["db_ms"])
+                    stats["exceeded"] += entry["exceeded"]
+                    stats["budget"] = entry["budget"]
+                    stats["duplicates"].update(entry["duplicates"])
+        except FileNotFoundError:
+            raise CommandError(f"Không tìm thấy file log: {path}")
+
+        report = []
+        for view, stats in views.items():
+            queries = stats["queries"]
+            report.append({
+                "view": view,
+                "requests": len(queries),
+                "avg_queries": round(sum(queries) / len(queries), 1),
+                "p95_queries": percentile(queries, 95),
+                "max_queries": max(queries),
+                "avg_db_ms": round(sum(stats["db_ms"]) / len(queries), 2),
+                "p95_db_ms": percentile(stats["db_ms"], 95),
+                "budget": stats["budget"],
+                "violations": stats["exceeded"],
+                "top_duplicates": stats["duplicates"].most_common(options["top"]),
+            })
+        report.sort(key=lambda row: (-row["violations"], -row["avg_queries"]))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report, ensure_ascii=False, indent=2))
+            return
+
+        header = f"{'view':<24}{'req':>7}{'avg q':>8}{'p95 q':>7}{'max q':>7}{'avg db ms':>11}{'budget':>8}{'vi phạm':>9}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for row in report:
+            line = (
+                f"{row['view']:<24}{row['requests']:>7}{row['avg_queries']:>8}{row['p95_queries']:>7}"
+                f"{row['max_queries']:>7}{row['avg_db_ms']:>11}{str(row['budget'] or '-'):>8}{row['violations']:>9}"
+            )
+            self.stdout.write(self.style.WARNING(line) if row["violations"] else line)
+            for fp, n in row["top_duplicates"]:
+                self.stdout.write(f"    {n}x {fp[:140]}")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from products import search
+
+
+class Command(BaseCommand):
+    help = "Xóa và đánh chỉ mục lại toàn bộ sản phẩm cho tìm kiếm toàn văn"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        total = search.rebuild(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã đánh chỉ mục {total} sản phẩm (backend: {backend.name})."
+        ))
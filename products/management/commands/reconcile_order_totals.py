@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Q
+
+from products.models import Order
+
+
+class Command(BaseCommand):
+    help = "Tìm và sửa các đơn hàng có cột total_price/total_items lệch so với OrderItem"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Chỉ báo cáo, không sửa")
+        parser.add_argument("--open-only", action="store_true", help="Chỉ kiểm tra giỏ hàng chưa hoàn tất")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        orders = Order.objects.all()
+        if options["open_only"]:
+            orders = orders.filter(complete=False)
+
+        drifted = (
+            orders.with_totals()
+            .filter(~Q(total_price=F("computed_total_price")) | ~Q(total_items=F("computed_total_items")))
+            .values_list("id", "total_price", "computed_total_price", "total_items", "computed_total_items")
+        )
+
+        ids = []
+        for order_id, price, real_price, items, real_items in drifted.iterator():
+            ids.append(order_id)
+            self.stdout.write(
+                f"Order #{order_id}: total_price {price} -> {real_price}, total_items {items} -> {real_items}"
+            )
+
+        if not ids:
+            self.stdout.write(self.style.SUCCESS("Không có đơn hàng nào bị lệch."))
+            return
+
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{len(ids)} đơn hàng bị lệch (dry-run, chưa sửa)."))
+            return
+
+        batch_size = options["batch_size"]
+        for start in range(0, len(ids), batch_size):
+            Order.objects.filter(pk__in=ids[start:start + batch_size]).refresh_totals()
+        self.stdout.write(self.style.SUCCESS(f"Đã sửa {len(ids)} đơn hàng."))
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        "Tính lại bảng gợi ý sản phẩm (mua cùng / cùng hãng / giá gần). "
+        "Mặc định chỉ các sản phẩm chưa có gợi ý hoặc có đơn mới."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Tính lại toàn bộ sản phẩm")
+        parser.add_argument("--product", type=int, nargs="+", help="Chỉ tính các sản phẩm này")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if options["full"]:
+            product_ids = None
+            scope = "toàn bộ"
+        else:
+            product_ids = options["product"] or sorted(recommendations.stale_product_ids())
+            scope = f"{len(product_ids)} sản phẩm"
+            if not product_ids:
+                self.stdout.write("Không có sản phẩm nào cần làm mới.")
+                return
+
+        engine = "NumPy" if recommendations.np is not None else "Python"
+        start = time.perf_counter()
+        written = recommendations.refresh(product_ids, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Đã ghi {written} gợi ý ({scope}, {engine}) trong {time.perf_counter() - start:.2f}s."
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.checkout import release_expired
+
+
+class Command(BaseCommand):
+    help = "Trả lại tồn kho cho các khoản giữ hàng đã hết hạn (chạy định kỳ, ví dụ mỗi phút)"
+
+    def handle(self, *args, **options):
+        released = release_expired()
+        self.stdout.write(self.style.SUCCESS(f"Đã giải phóng {released} khoản giữ hàng."))
@@ -0,0 +1,82 @@
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from products import tasks
+
+
+class Command(BaseCommand):
+    help = (
+        "Chạy worker xử lý hàng đợi task trong DB (products/tasks.py). "
+        "Có thể chạy nhiều process cùng lúc."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=4, help="Số task chạy song song")
+        parser.add_argument("--poll", type=float, default=1.0, help="Giây chờ khi hàng đợi rỗng")
+        parser.add_argument("--once", action="store_true", help="Chạy hết task đến hạn rồi thoát")
+        parser.add_argument("--purge-days", type=int, default=7,
+                            help="Xóa task đã xong cũ hơn N ngày (0 = không xóa)")
+
+    def handle(self, *args, **options):
+        if not settings.CACHE_SHARED:
+            # Task vô hiệu hóa cache (bump_generation) sẽ chỉ ghi vào LocMem của worker
+            raise CommandError(
+                "Worker cần cache dùng chung với web (CACHE_URL=redis://... hoặc memcached://...). "
+                "Không có cache dùng chung thì để TASKS_ALWAYS_EAGER=1 (mặc định) và không chạy worker."
+            )
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        threads = options["threads"]
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        self.stdout.write(f"Worker {worker_id} ({threads} thread)")
+        if options["purge_days"]:
+            purged = tasks.purge_finished(options["purge_days"])
+            if purged:
+                self.stdout.write(f"Đã xóa {purged} task cũ")
+
+        processed = 0
+        last_maintenance = 0
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="task-worker") as pool:
+            while not self.stopping:
+                if time.monotonic() - last_maintenance > 60:
+                    requeued = tasks.requeue_stale()
+                    if requeued:
+                        self.stdout.write(self.style.WARNING(f"Trả lại {requeued} task bị treo"))
+                    last_maintenance = time.monotonic()
+
+                claimed = tasks.claim(worker_id, threads - len(in_flight)) if len(in_flight) < threads else []
+                for task_row in claimed:
+                    in_flight.add(pool.submit(tasks.execute_in_thread, task_row))
+                close_old_connections()
+
+                if in_flight:
+                    done, in_flight = wait(in_flight, timeout=options["poll"], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        processed += 1
+                        if options["verbosity"] > 1:
+                            self.stdout.write(f"  {future.result()}")
+                elif options["once"]:
+                    break
+                else:
+                    time.sleep(options["poll"])
+
+            # Dừng: chờ các task đang chạy xong
+            for future in in_flight:
+                future.result()
+                processed += 1
+
+        self.stdout.write(self.style.SUCCESS(f"Đã xử lý {processed} task."))
+
+    def stop(self, signum, frame):
+        self.stdout.write("Đang dừng worker (chờ task đang chạy)...")
+        self.stopping = True
@@ -0,0 +1,35 @@
+import sqlite3
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from products import routers
+
+
+class Command(BaseCommand):
+    help = (
+        "Chép DB chính SQLite sang các file replica SQLite (giả lập replication "
+        "khi chạy thử router đọc/ghi ở máy cá nhân)."
+    )
+
+    def handle(self, *args, **options):
+        aliases = routers.replica_aliases()
+        if not aliases:
+            raise CommandError("Chưa khai báo replica (DATABASE_REPLICA_URLS).")
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("Chỉ dùng cho SQLite; với PostgreSQL hãy dùng streaming replication.")
+
+        primary.ensure_connection()
+        for alias in aliases:
+            replica = connections[alias]
+            if replica.vendor != "sqlite":
+                raise CommandError(f"{alias} không phải SQLite.")
+            replica.close()
+            # Backup API của SQLite: bản chụp nhất quán kể cả khi DB chính đang được ghi
+            target = sqlite3.connect(replica.settings_dict["NAME"])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(self.style.SUCCESS(f"{DEFAULT_DB_ALIAS} -> {alias} ({replica.settings_dict['NAME']})"))
@@ -0,0 +1,148 @@
+# products/middleware.py
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from . import routers
+from .profiling import QueryBudgetExceeded, format_report, record_queries
+
+logger = logging.getLogger("products.querybudget")
+
+
+class QueryBudgetMiddleware:
+    """Đếm số truy vấn SQL của mỗi request và so với ``settings.QUERY_BUDGETS``.
+
+    * Vượt ngân sách -> ghi log cảnh báo (hoặc raise nếu ``QUERY_BUDGET_STRICT``).
+    * Khi ``DEBUG`` -> thêm header ``X-Query-Count`` và ``Server-Timing``.
+    * Nếu có ``QUERY_PROFILE_LOG`` -> ghi mỗi request một dòng JSON để
+      ``manage.py query_report`` tổng hợp.
+
+    Hỗ trợ cả chuỗi middleware sync (WSGI) lẫn async (ASGI) để không ép
+    view async trong products/async_views.py chạy lại trong thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, "QUERY_PROFILING", True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.budgets = getattr(settings, "QUERY_BUDGETS", {})
+        self.default_budget = getattr(settings, "QUERY_BUDGET_DEFAULT", None)
+        self.strict = getattr(settings, "QUERY_BUDGET_STRICT", False)
+        self.log_path = getattr(settings, "QUERY_PROFILE_LOG", None)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            response = self.get_response(request)
+        return self._check(request, response, recorder, start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        with record_queries() as recorder:
+            response = await self.get_response(request)
+        return self._check(request, response, recorder, start)
+
+    def _check(self, request, response, recorder, start):
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+        budget = self.budgets.get(url_name, self.default_budget)
+        exceeded = budget is not None and recorder.count > budget
+
+        if exceeded:
+            report = format_report(recorder, budget)
+            logger.warning("Query budget exceeded for %s (%s): %s", url_name, request.path, report)
+            if self.strict:
+                raise QueryBudgetExceeded(f"{url_name}: {report}")
+
+        if settings.DEBUG:
+            db_ms = recorder.total_time * 1000
+            response["X-Query-Count"] = str(recorder.count)
+            response["Server-Timing"] = (
+                f'db;dur={db_ms:.1f};desc="{recorder.count} queries", '
+                f"total;dur={elapsed * 1000:.1f}"
+            )
+
+        if self.log_path and url_name:
+            self._write_log(url_name, request, recorder, elapsed, budget, exceeded)
+        return response
+
+    def _write_log(self, url_name, request, recorder, elapsed, budget, exceeded):
+        entry = {
+            "ts": time.time(),
+            "view": url_name,
+            "method": request.method,
+            "path": request.path,
+            "queries": recorder.count,
+            "db_ms": round(recorder.total_time * 1000, 3),
+            "total_ms": round(elapsed * 1000, 3),
+            "budget": budget,
+            "exceeded": exceeded,
+            "duplicates": recorder.duplicates(),
+        }
+        try:
+            with open(self.log_path, "a", encoding="utf-8") as fh:
+                fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except OSError:
+            logger.exception("Không ghi được QUERY_PROFILE_LOG")
+
+
+class ReplicaPinMiddleware:
+    """Sticky-after-write cho ``products.routers.PrimaryReplicaRouter``.
+
+    Request có cookie pin hợp lệ -> đọc từ DB chính. Request có ghi DB ->
+    đặt (gia hạn) cookie pin ``REPLICA_PIN_SECONDS`` giây. Không có replica
+    thì middleware tự gỡ khỏi chuỗi.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not routers.replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.cookie = getattr(settings, "REPLICA_PIN_COOKIE", "dbpin")
+        self.seconds = getattr(settings, "REPLICA_PIN_SECONDS", 5)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = routers.begin_request(self._pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+        return self._finish(response, wrote)
+
+    async def __acall__(self, request):
+        token = routers.begin_request(self._pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+        return self._finish(response, wrote)
+
+    def _pinned(self, request):
+        return request.get_signed_cookie(self.cookie, default=None, salt=self.cookie, max_age=self.seconds) is not None
+
+    def _finish(self, response, wrote):
+        if wrote:
+            response.set_signed_cookie(
+                self.cookie, "1", salt=self.cookie, max_age=self.seconds, httponly=True, samesite="Lax",
+            )
+        return response
@@ -0,0 +1,119 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:38
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import DatabaseError, migrations, models
+
+# Chép cố định từ products/search.py tại thời điểm tạo migration: migration
+# không import code ứng dụng, để sửa search.py sau này không đổi lịch sử
+FTS_TABLE = 'products_search_fts'
+PG_TABLE = 'products_search_pg'
+NAME_WEIGHT = 10
+DESCRIPTION_WEIGHT = 1
+TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Gấp dấu tiếng Việt, chữ thường, tách từ (như ``search.tokenize``)."""
+    if not text:
+        return []
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', text)
+    stripped = ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn')
+    return TOKEN_RE.findall(unicodedata.normalize('NFC', stripped).lower())
+
+
+def create_fulltext_tables(apps, schema_editor):
+    """Tạo bảng FTS5 (SQLite) hoặc tsvector + GIN (PostgreSQL) rồi nạp dữ liệu sẵn có."""
+    connection = schema_editor.connection
+    Product = apps.get_model('products', 'Product')
+    SearchToken = apps.get_model('products', 'SearchToken')
+
+    backend = 'python'
+    if connection.vendor == 'sqlite':
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    "USING fts5(name, description, tokenize='unicode61 remove_diacritics 2')"
+                )
+            backend = 'sqlite'
+        except DatabaseError:
+            # SQLite được build không có FTS5 -> dùng chỉ mục thuần Python
+            pass
+    elif connection.vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE TABLE IF NOT EXISTS {PG_TABLE} ("
+            "product_id bigint PRIMARY KEY REFERENCES products_product (id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {PG_TABLE}_document_gin ON {PG_TABLE} USING gin (document)"
+        )
+        backend = 'postgres'
+
+    products = Product.objects.only('id', 'name', 'description').iterator()
+    if backend == 'python':
+        tokens = []
+        for product in products:
+            weights = {}
+            for term in tokenize(product.name):
+                weights[term[:64]] = weights.get(term[:64], 0) + NAME_WEIGHT
+            for term in tokenize(product.description):
+                weights[term[:64]] = weights.get(term[:64], 0) + DESCRIPTION_WEIGHT
+            tokens.extend(
+                SearchToken(term=term, product_id=product.pk, weight=weight)
+                for term, weight in weights.items()
+            )
+        SearchToken.objects.bulk_create(tokens, batch_size=1000)
+        return
+
+    rows = [
+        (p.pk, ' '.join(tokenize(p.name)), ' '.join(tokenize(p.description)))
+        for p in products
+    ]
+    if not rows:
+        return
+    with connection.cursor() as cursor:
+        if backend == 'sqlite':
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)", rows
+            )
+        else:
+            cursor.executemany(
+                f"INSERT INTO {PG_TABLE} (product_id, document) VALUES "
+                "(%s, setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'D'))",
+                rows,
+            )
+
+
+def drop_fulltext_tables(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {PG_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_feedback'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_tokens', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term', 'product'], name='searchtoken_term_idx')],
+            },
+        ),
+        migrations.RunPython(create_fulltext_tables, drop_fulltext_tables),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:39
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Order = apps.get_model('products', 'Order')
+    OrderItem = apps.get_model('products', 'OrderItem')
+    items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    Order.objects.update(
+        total_price=Coalesce(
+            Subquery(items.annotate(s=Sum(F('quantity') * F('product__price'))).values('s')),
+            Value(0),
+            output_field=models.DecimalField(max_digits=14, decimal_places=0),
+        ),
+        total_items=Coalesce(Subquery(items.annotate(s=Sum('quantity')).values('s')), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0, verbose_name='Tổng số lượng'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='total_price',
+            field=models.DecimalField(decimal_places=0, default=0, max_digits=14, verbose_name='Tổng tiền'),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
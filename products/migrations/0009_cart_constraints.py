@@ -0,0 +1,60 @@
+# Generated by Django 5.2.1 on 2026-10-18 09:43
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def merge_duplicates(apps, schema_editor):
+    """Gộp các giỏ hàng mở trùng của cùng user và các OrderItem trùng sản phẩm."""
+    Order = apps.get_model('products', 'Order')
+    OrderItem = apps.get_model('products', 'OrderItem')
+
+    duplicated_users = (
+        Order.objects.filter(complete=False, user__isnull=False)
+        .values('user').annotate(n=Count('id')).filter(n__gt=1).values_list('user', flat=True)
+    )
+    for user_id in list(duplicated_users):
+        keep, *others = Order.objects.filter(user_id=user_id, complete=False).order_by('id')
+        OrderItem.objects.filter(order__in=others).update(order=keep)
+        Order.objects.filter(pk__in=[o.pk for o in others]).delete()
+
+    duplicated_items = (
+        OrderItem.objects.values('order', 'product')
+        .annotate(n=Count('id'), qty=Sum('quantity')).filter(n__gt=1)
+    )
+    for row in list(duplicated_items):
+        keep, *others = OrderItem.objects.filter(order_id=row['order'], product_id=row['product']).order_by('id')
+        OrderItem.objects.filter(pk=keep.pk).update(quantity=row['qty'])
+        OrderItem.objects.filter(pk__in=[i.pk for i in others]).delete()
+
+    items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+    Order.objects.filter(complete=False).update(
+        total_price=Coalesce(
+            Subquery(items.annotate(s=Sum(F('quantity') * F('product__price'))).values('s')),
+            Value(0),
+            output_field=models.DecimalField(max_digits=14, decimal_places=0),
+        ),
+        total_items=Coalesce(Subquery(items.annotate(s=Sum('quantity')).values('s')), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_sku'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(condition=models.Q(('complete', False)), fields=('user',), name='unique_open_order_per_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderitem',
+            constraint=models.UniqueConstraint(fields=('order', 'product'), name='unique_order_product'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:11
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_comment_count(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Comment = apps.get_model('products', 'Comment')
+    active = (
+        Comment.objects.filter(product=OuterRef('pk'), is_active=True)
+        .order_by().values('product').annotate(n=Count('id')).values('n')
+    )
+    Product.objects.update(comment_count=Coalesce(Subquery(active), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_product_updated_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='comment',
+            name='comment_user_active_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Số bình luận'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['user', '-created_at'], name='comment_user_created_idx'),
+        ),
+        migrations.RunPython(backfill_comment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0016_comment_count_moderation'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='transaction_id',
+            field=models.CharField(blank=True, db_index=True, max_length=200, null=True),
+        ),
+    ]
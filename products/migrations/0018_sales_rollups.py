@@ -0,0 +1,109 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_completed_at(apps, schema_editor):
+    # Đơn cũ không lưu thời điểm thanh toán -> dùng ngày tạo giỏ
+    Order = apps.get_model('products', 'Order')
+    Order.objects.filter(complete=True, completed_at__isnull=True).update(completed_at=F('date_ordered'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('products', '0017_order_transaction_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerSales',
+            fields=[
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Số đơn')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Số lượng bán')),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=16, verbose_name='Doanh thu')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='sales', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_order_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyBrandSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Số đơn')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Số lượng bán')),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=16, verbose_name='Doanh thu')),
+                ('date', models.DateField()),
+                ('brand', models.CharField(max_length=50)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Số đơn')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Số lượng bán')),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=16, verbose_name='Doanh thu')),
+                ('date', models.DateField()),
+                ('brand', models.CharField(max_length=50)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('orders', models.PositiveIntegerField(default=0, verbose_name='Số đơn')),
+                ('units', models.PositiveIntegerField(default=0, verbose_name='Số lượng bán')),
+                ('revenue', models.DecimalField(decimal_places=0, default=0, max_digits=16, verbose_name='Doanh thu')),
+                ('date', models.DateField(unique=True)),
+            ],
+            options={
+                'verbose_name': 'Doanh số theo ngày',
+                'verbose_name_plural': 'Doanh số theo ngày',
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Thanh toán lúc'),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='sales_recorded',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('complete', True)), fields=['user', '-completed_at', '-id'], name='order_history_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('complete', True)), fields=['completed_at'], name='order_completed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailybrandsales',
+            constraint=models.UniqueConstraint(fields=('date', 'brand'), name='unique_daily_brand_sales'),
+        ),
+        migrations.AddField(
+            model_name='dailyproductsales',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyproductsales',
+            index=models.Index(fields=['product', 'date'], name='daily_product_sales_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailyproductsales',
+            constraint=models.UniqueConstraint(fields=('date', 'product'), name='unique_daily_product_sales'),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+    ]
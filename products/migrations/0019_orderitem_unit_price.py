@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:37
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def snapshot_paid_prices(apps, schema_editor):
+    # Đơn đã thanh toán trước đây không lưu đơn giá -> chốt theo giá hiện tại,
+    # từ nay dựng lại doanh số không còn trôi theo giá mới
+    OrderItem = apps.get_model('products', 'OrderItem')
+    Product = apps.get_model('products', 'Product')
+    OrderItem.objects.filter(order__complete=True, unit_price__isnull=True).update(
+        unit_price=Subquery(Product.objects.filter(pk=OuterRef('product')).values('price')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0018_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=0, max_digits=10, null=True, verbose_name='Đơn giá'),
+        ),
+        migrations.RunPython(snapshot_paid_prices, migrations.RunPython.noop),
+    ]
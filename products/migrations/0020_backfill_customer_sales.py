@@ -0,0 +1,33 @@
+from django.db import migrations
+from django.db.models import Count, Max, Sum
+
+
+def backfill_customer_sales(apps, schema_editor):
+    # Bảng CustomerSales (0018) mới chỉ có dòng khi build_sales_rollups chạy
+    # -> điền cho mọi user đã từng thanh toán để trang hồ sơ không hiện 0 đơn
+    Order = apps.get_model('products', 'Order')
+    CustomerSales = apps.get_model('products', 'CustomerSales')
+    totals = (
+        Order.objects.filter(complete=True, user__isnull=False)
+        .values('user').order_by()
+        .annotate(n=Count('id'), units=Sum('total_items'), revenue=Sum('total_price'), last=Max('completed_at'))
+    )
+    rows = [
+        CustomerSales(user_id=t['user'], orders=t['n'], units=t['units'], revenue=t['revenue'], last_order_at=t['last'])
+        for t in totals.iterator()
+    ]
+    CustomerSales.objects.bulk_create(
+        rows, batch_size=1000, update_conflicts=True, unique_fields=['user'],
+        update_fields=['orders', 'units', 'revenue', 'last_order_at'],
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0019_orderitem_unit_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_customer_sales, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User 
-from django.contrib.humanize.templatetags.humanize import intcomma
+from .currency import format_vnd
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
 
 class Product(models.Model):
@@ -12,6 +14,7 @@ class Product(models.Model):
         ('Phụ kiện', 'Phụ kiện'),
     ]
 
+    sku = models.CharField("Mã SKU", max_length=64, unique=True, blank=True, null=True)
     name = models.CharField("Tên sản phẩm", max_length=255)
     brand = models.CharField("Hãng", max_length=50, choices=BRAND_CHOICES)
     image = models.ImageField("Ảnh sản phẩm", upload_to="products/", blank=True, null=True)
@@ -19,40 +22,100 @@ class Product(models.Model):
     price = models.DecimalField("Giá bán (VNĐ)", max_digits=10, decimal_places=0)
     delprice = models.DecimalField("Giá trước khi giảm (VNĐ)", max_digits=10, decimal_places=0, blank=True, null=True)
     stock = models.PositiveIntegerField("Tồn kho", default=0)
+    # Số bình luận đang hiển thị, cập nhật bởi products/comments.py
+    comment_count = models.PositiveIntegerField("Số bình luận", default=0, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # product_list: lọc brand + khoảng giá
+            models.Index(fields=['brand', 'price'], name='product_brand_price_idx'),
+            models.Index(fields=['price'], name='product_price_idx'),
+            # API: phân trang cursor theo (updated_at, id) + MAX(updated_at) cho ETag
+            models.Index(fields=['updated_at', 'id'], name='product_updated_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.get_brand_display()})"
 
     def formatted_price(self):
-        return f"{intcomma(int(self.price))} VNĐ"
+        return format_vnd(self.price)
     formatted_price.short_description = "Giá bán"
 
     def formatted_delprice(self):
-        if self.delprice:
-            return f"{intcomma(self.delprice)} VNĐ"
-        return ""
+        return format_vnd(self.delprice) if self.delprice else ""
     formatted_delprice.short_description = "Giá bán trước khi giảm"
 
 
+class OrderQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Tính tổng tiền / tổng số lượng từ OrderItem trong cùng một truy vấn."""
+        return self.annotate(
+            computed_total_price=Coalesce(
+                Sum(F('order_items__quantity') * Coalesce('order_items__unit_price', 'order_items__product__price')),
+                Value(0),
+                output_field=models.DecimalField(max_digits=14, decimal_places=0),
+            ),
+            computed_total_items=Coalesce(Sum('order_items__quantity'), Value(0)),
+        )
+
+    def refresh_totals(self):
+        """Ghi lại các cột tổng của những đơn hàng trong queryset bằng một câu UPDATE."""
+        items = OrderItem.objects.filter(order=OuterRef('pk')).order_by().values('order')
+        return self.update(
+            total_price=Coalesce(
+                Subquery(items.annotate(s=Sum(F('quantity') * Coalesce('unit_price', 'product__price'))).values('s')),
+                Value(0),
+                output_field=models.DecimalField(max_digits=14, decimal_places=0),
+            ),
+            total_items=Coalesce(Subquery(items.annotate(s=Sum('quantity')).values('s')), Value(0)),
+        )
+
+
 class Order(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True)
     date_ordered = models.DateTimeField(auto_now_add=True)
     complete = models.BooleanField(default=False)
-    transaction_id = models.CharField(max_length=200, null=True, blank=True)
+    # Tra cứu đơn theo mã giao dịch (admin, đối soát thanh toán)
+    transaction_id = models.CharField(max_length=200, null=True, blank=True, db_index=True)
+    completed_at = models.DateTimeField("Thanh toán lúc", null=True, blank=True)
+    # Đã cộng vào bảng doanh số (products/analytics.py) -> không cộng lần hai
+    sales_recorded = models.BooleanField(default=False, editable=False)
+
+    # Cột tổng phi chuẩn hóa, cập nhật qua signal của OrderItem (xem products/signals.py)
+    total_price = models.DecimalField("Tổng tiền", max_digits=14, decimal_places=0, default=0)
+    total_items = models.PositiveIntegerField("Tổng số lượng", default=0)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(complete=False),
+                name='unique_open_order_per_user',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'complete'], name='order_user_complete_idx'),
+            # Lịch sử đơn hàng: đơn đã thanh toán của một user, mới nhất trước
+            models.Index(
+                fields=['user', '-completed_at', '-id'],
+                condition=models.Q(complete=True),
+                name='order_history_idx',
+            ),
+            # Dựng lại doanh số theo khoảng ngày
+            models.Index(fields=['completed_at'], condition=models.Q(complete=True), name='order_completed_idx'),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} - {self.user}"
 
-    @property
-    def total_price(self):
-        return sum(item.get_total for item in self.order_items.all())
-
-    @property
-    def total_items(self):
-        return sum(item.quantity for item in self.order_items.all())
+    def update_totals(self):
+        Order.objects.filter(pk=self.pk).refresh_totals()
+        self.refresh_from_db(fields=['total_price', 'total_items'])
 
 
 class OrderItem(models.Model):
@@ -60,19 +123,51 @@ class OrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default=1)
     date_added = models.DateTimeField(auto_now_add=True)
+    # Giá chốt lúc thanh toán; None khi còn trong giỏ (giỏ theo giá hiện tại)
+    unit_price = models.DecimalField("Đơn giá", max_digits=10, decimal_places=0, null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='unique_order_product'),
+        ]
+
+    @property
+    def price(self):
+        return self.product.price if self.unit_price is None else self.unit_price
 
     @property
     def get_total(self):
-        return self.product.price * self.quantity
+        return self.price * self.quantity
 
     @property
     def formatted_price(self):
-        return f"{intcomma(int(self.get_total))} VNĐ"
+        return format_vnd(self.get_total)
 
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
 
 
+class StockReservation(models.Model):
+    """Hàng đang được giữ cho một đơn chưa thanh toán.
+
+    ``Product.stock`` đã bị trừ tại thời điểm giữ hàng; nếu quá ``expires_at``
+    mà đơn chưa hoàn tất thì số lượng được cộng trả lại (products/checkout.py).
+    """
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reservations')
+    quantity = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['order', 'product'], name='unique_reservation_order_product'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} x {self.quantity} (order #{self.order_id})"
+
+
 class ShippingAddress(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="shipping_addresses")
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
@@ -96,6 +191,17 @@ class Blog(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_published = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            # blog_list: ORDER BY created_at DESC, id (cũng là khóa của phân trang cursor)
+            models.Index(fields=['-created_at', 'id'], name='blog_created_idx'),
+            models.Index(
+                fields=['-created_at', 'id'],
+                condition=models.Q(is_published=True),
+                name='blog_published_created_idx',
+            ),
+        ]
+
     def __str__(self):
         return self.title
     
@@ -112,6 +218,17 @@ class Comment(models.Model):
         ordering = ['-created_at']
         verbose_name = 'Bình luận'
         verbose_name_plural = 'Bình luận'
+        indexes = [
+            # product_detail: bình luận đang hiển thị của một sản phẩm, mới nhất trước.
+            # Partial index vì Django sinh "WHERE is_active" (không phải "= true").
+            models.Index(
+                fields=['product', '-created_at'],
+                condition=models.Q(is_active=True),
+                name='comment_product_active_idx',
+            ),
+            # my_profile: bình luận của một user (cả bình luận đang chờ duyệt)
+            models.Index(fields=['user', '-created_at'], name='comment_user_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.product.name[:30]}"
@@ -123,5 +240,193 @@ class Feedback(models.Model):
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='feedback_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Feedback from {self.user.username} - {self.subject}"
+
+class ProductRecommendation(models.Model):
+    """Sản phẩm gợi ý tính trước cho trang chi tiết (xem products/recommendations.py)."""
+    SOURCE_CHOICES = [
+        ('bought', 'Mua cùng'),
+        ('brand', 'Cùng hãng, giá gần'),
+        ('price', 'Giá gần'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommended_in')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField(default=0)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES)
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Tra cứu của product_detail: WHERE product_id = ? ORDER BY rank
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_recommendation_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.recommended_id} (#{self.rank})"
+
+
+class SearchToken(models.Model):
+    """Chỉ mục đảo ngược cho backend tìm kiếm thuần Python (xem products/search.py)."""
+    term = models.CharField(max_length=64)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='search_tokens')
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'product'], name='searchtoken_term_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.product_id}"
+
+
+class ImageDerivative(models.Model):
+    """Bản thu nhỏ / WebP của một ảnh gốc trong storage (xem products/images.py).
+
+    Khóa theo tên file gốc nên dùng chung cho Product.image, Blog.image và
+    users.User.avatar; file phái sinh đặt tên theo hash nội dung.
+    """
+    source = models.CharField(max_length=255)
+    digest = models.CharField(max_length=64)
+    format = models.CharField(max_length=10)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.CharField(max_length=255)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'format', 'width'], name='unique_image_derivative'),
+        ]
+
+    def __str__(self):
+        return f"{self.source} -> {self.file}"
+
+
+class Task(models.Model):
+    """Hàng đợi việc nền lưu trong DB (xem products/tasks.py, ``manage.py runworker``)."""
+    PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Đang chờ"),
+        (RUNNING, "Đang chạy"),
+        (DONE, "Hoàn thành"),
+        (FAILED, "Thất bại"),
+    ]
+
+    name = models.CharField(max_length=100)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)  # lớn hơn chạy trước
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    idempotency_key = models.CharField(max_length=200, unique=True, null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Worker lấy việc: status = pending, run_at <= now, ưu tiên cao trước
+            models.Index(
+                fields=['-priority', 'run_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='task_pending_idx',
+            ),
+            models.Index(fields=['status', 'locked_at'], name='task_status_locked_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+# ====================== DOANH SỐ (ROLLUP) ======================
+class SalesRollup(models.Model):
+    """Các cột chung của bảng doanh số tổng hợp (xem products/analytics.py)."""
+    orders = models.PositiveIntegerField("Số đơn", default=0)
+    units = models.PositiveIntegerField("Số lượng bán", default=0)
+    revenue = models.DecimalField("Doanh thu", max_digits=16, decimal_places=0, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailySales(SalesRollup):
+    date = models.DateField(unique=True)
+
+    class Meta:
+        verbose_name = 'Doanh số theo ngày'
+        verbose_name_plural = 'Doanh số theo ngày'
+
+    def __str__(self):
+        return f"{self.date}: {self.revenue}"
+
+
+class DailyBrandSales(SalesRollup):
+    date = models.DateField()
+    brand = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'brand'], name='unique_daily_brand_sales'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.brand}: {self.revenue}"
+
+
+class DailyProductSales(SalesRollup):
+    date = models.DateField()
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='daily_sales')
+    # Chép từ Product để lọc theo hãng không cần JOIN
+    brand = models.CharField(max_length=50)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'product'], name='unique_daily_product_sales'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'date'], name='daily_product_sales_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} #{self.product_id}: {self.revenue}"
+
+
+class CustomerSales(SalesRollup):
+    """Tổng mua hàng của một user (trang lịch sử đơn hàng / hồ sơ)."""
+    user = models.OneToOneField('auth.User', on_delete=models.CASCADE, primary_key=True, related_name='sales')
+    last_order_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.orders} đơn"
+
+
+class RateLimitCounter(models.Model):
+    """Bộ đếm của products/ratelimit.py khi không có cache dùng chung.
+
+    Một dòng cho mỗi ``(key, window)``: ``key`` = scope + ident + độ dài cửa
+    sổ, ``window`` = số thứ tự cửa sổ (``now // độ dài``).
+    """
+    key = models.CharField(max_length=255)
+    window = models.BigIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['key', 'window'], name='unique_ratelimit_window'),
+        ]
+
     def __str__(self):
-        return f"Feedback from {self.user.username} - {self.subject}"
\ No newline at end of file
+        return f"{self.key}@{self.window}: {self.count}"
@@ -0,0 +1,137 @@
+# products/pagination.py
+"""Phân trang kiểu keyset (cursor): không ``COUNT(*)``, không ``OFFSET``.
+
+Trang kế tiếp được lấy bằng điều kiện ``WHERE (created_at, id) < (...)``
+trên chính các cột sắp xếp nên chi phí không phụ thuộc trang sâu bao nhiêu.
+Cursor là chuỗi base64 mờ (opaque), client chỉ việc gửi lại nguyên văn.
+"""
+import base64
+import json
+
+from django.db.models import Q
+
+NEXT = "n"
+PREV = "p"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(direction, values):
+    raw = json.dumps([direction, values], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in (NEXT, PREV) or not isinstance(values, list):
+        raise InvalidCursor(token)
+    return direction, values
+
+
+class CursorPage:
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(NEXT, self.paginator.key_for(self.object_list[-1]))
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(PREV, self.paginator.key_for(self.object_list[0]))
+
+
+class CursorPaginator:
+    """``CursorPaginator(Blog.objects.all(), 10, ordering=("-created_at", "id"))``
+
+    ``ordering`` phải xác định duy nhất một dòng (nên kết thúc bằng ``id``).
+    """
+
+    def __init__(self, queryset, per_page, ordering=("id",)):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.fields = [name.lstrip("-") for name in self.ordering]
+        self.descending = [name.startswith("-") for name in self.ordering]
+
+    def key_for(self, obj):
+        return [getattr(obj, name) for name in self.fields]
+
+    def _parse_values(self, values):
+        if len(values) != len(self.fields):
+            raise InvalidCursor(values)
+        opts = self.queryset.model._meta
+        try:
+            return [opts.get_field(name).to_python(value) for name, value in zip(self.fields, values)]
+        except Exception:
+            raise InvalidCursor(values)
+
+    def _seek(self, values, forward):
+        """Điều kiện "sau" (forward) hoặc "trước" bộ khóa ``values`` theo ``ordering``."""
+        condition = Q()
+        for i, (name, desc) in enumerate(zip(self.fields, self.descending)):
+            lookup = "lt" if desc == forward else "gt"
+            clause = Q(**{f"{name}__{lookup}": values[i]})
+            for prev_name, prev_value in zip(self.fields[:i], values[:i]):
+                clause &= Q(**{prev_name: prev_value})
+            condition |= clause
+        return condition
+
+    def page(self, cursor=None):
+        """Trả về ``CursorPage``; cursor sai định dạng -> trang đầu tiên."""
+        direction, values = NEXT, None
+        if cursor:
+            try:
+                direction, raw_values = decode_cursor(cursor)
+                values = self._parse_values(raw_values)
+            except InvalidCursor:
+                direction, values = NEXT, None
+
+        forward = direction == NEXT
+        ordering = self.ordering
+        if not forward:
+            ordering = [name[1:] if name.startswith("-") else f"-{name}" for name in ordering]
+
+        qs = self.queryset.order_by(*ordering)
+        if values is not None:
+            qs = qs.filter(self._seek(values, forward))
+
+        rows = list(qs[: self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+
+        if forward:
+            return CursorPage(rows, self, has_next=has_more, has_previous=values is not None)
+        rows.reverse()
+        return CursorPage(rows, self, has_next=True, has_previous=has_more)
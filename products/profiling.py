@@ -0,0 +1,123 @@
+# products/profiling.py
+"""Ghi lại các câu SQL chạy trong một khối code: số lượng, thời gian và
+các truy vấn trùng lặp (dấu hiệu N+1).
+
+Dùng trong middleware (products/middleware.py) và trong test::
+
+    with assert_query_budget(5):
+        client.get(reverse("cart"))
+
+Kết nối Django là riêng từng thread: dưới ASGI, ORM chạy trong thread của
+``sync_to_async`` chứ không phải thread event loop. Vì vậy không gắn
+``execute_wrapper`` theo từng khối code mà gắn sẵn ``_dispatch`` lên mọi kết
+nối (``install``, qua signal ``connection_created``), còn recorder đang hoạt
+động nằm trong ``ContextVar``. asgiref chép context sang thread worker nên
+recorder đi theo request.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?|NULL)\s*,?)+\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """Chuẩn hóa câu SQL: bỏ giá trị cụ thể để gom các truy vấn giống nhau."""
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+_active = ContextVar("query_recorders", default=())
+
+
+class QueryRecorder:
+    """Ghi lại (sql, thời gian) của từng câu truy vấn trên các alias ``using`` (None = mọi alias)."""
+
+    def __init__(self, using=None):
+        self.using = set(using) if using else None
+        self.queries = []
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def total_time(self):
+        """Tổng thời gian DB (giây)."""
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """``{fingerprint: số lần}`` cho các truy vấn chạy nhiều hơn một lần."""
+        counts = Counter(fingerprint(sql) for sql, _ in self.queries)
+        return {fp: n for fp, n in counts.most_common() if n > 1}
+
+
+def _dispatch(execute, sql, params, many, context):
+    recorders = _active.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    alias = context["connection"].alias
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - start
+        for recorder in recorders:
+            if recorder.using is None or alias in recorder.using:
+                recorder.queries.append((sql, duration))
+
+
+def install(connection, **kwargs):
+    """Gắn ``_dispatch`` vào kết nối (receiver của ``connection_created``, gọi lại nhiều lần không sao)."""
+    if _dispatch not in connection.execute_wrappers:
+        # Đứng đầu danh sách: execute_wrapper() của Django pop phần tử cuối
+        connection.execute_wrappers.insert(0, _dispatch)
+
+
+@contextmanager
+def record_queries(using=None):
+    """Ghi lại truy vấn trên mọi kết nối (hoặc chỉ các alias trong ``using``).
+
+    Gồm cả truy vấn chạy ở thread khác nhưng cùng context (``sync_to_async``).
+    """
+    for alias in connections:
+        # Kết nối của thread hiện tại có thể đã mở trước khi signal được nối
+        install(connections[alias])
+    recorder = QueryRecorder(using)
+    token = _active.set((*_active.get(), recorder))
+    try:
+        yield recorder
+    finally:
+        _active.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def format_report(recorder, limit=None):
+    lines = [f"{recorder.count} truy vấn, {recorder.total_time * 1000:.1f} ms"]
+    if limit is not None:
+        lines[0] += f" (ngân sách: {limit})"
+    for fp, n in recorder.duplicates().items():
+        lines.append(f"  {n}x {fp}")
+    return "\n".join(lines)
+
+
+@contextmanager
+def assert_query_budget(limit, using=None):
+    """Test helper: báo lỗi kèm danh sách truy vấn trùng nếu vượt ``limit``."""
+    with record_queries(using) as recorder:
+        yield recorder
+    if recorder.count > limit:
+        raise QueryBudgetExceeded("Vượt ngân sách truy vấn: " + format_report(recorder, limit))
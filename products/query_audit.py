@@ -0,0 +1,146 @@
+# products/query_audit.py
+"""Các trang "nóng" cần chạy EXPLAIN (``manage.py audit_queries``).
+
+Không chép tay truy vấn: mỗi trang trong ``HOT_PAGES`` được gọi thật bằng
+test ``Client``, SQL mà view chạy được bắt qua ``connection.execute_wrapper``
+rồi EXPLAIN đúng câu đó (kèm tham số). Sửa view thì audit tự theo.
+"""
+import re
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from .models import Blog, Order, Product
+from .profiling import fingerprint
+
+# SQLite: "SCAN products_product" (không có "USING ... INDEX") = quét toàn bảng;
+# "SCAN x VIRTUAL TABLE INDEX" là tra cứu qua chỉ mục FTS5, không tính
+_SQLITE_SCAN_RE = re.compile(r"\bSCAN (\w+)(?!.*\b(?:USING\b.*\bINDEX|VIRTUAL TABLE INDEX)\b)")
+_SQLITE_SORT_RE = re.compile(r"USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT)")
+_PG_SCAN_RE = re.compile(r"Seq Scan on (\w+)")
+_PG_SORT_RE = re.compile(r"^\s*(?:->\s*)?Sort\b", re.MULTILINE)
+
+# Tắt cache trang / fragment để view luôn chạm DB; số truy vấn khi không có
+# cache không phản ánh ngân sách thật nên bỏ cảnh báo QUERY_BUDGETS
+AUDIT_SETTINGS = {
+    "ALLOWED_HOSTS": ["testserver"],
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}},
+    "QUERY_BUDGETS": {},
+}
+
+
+@dataclass
+class AuditContext:
+    user: User
+    staff: User
+    product: Product
+    order: Order
+    blog: Blog
+
+
+@dataclass
+class Page:
+    name: str
+    url: object  # ctx -> đường dẫn
+    login: str = ""  # "" / "user" / "staff"
+
+
+def _url(name, *args, **query):
+    path = reverse(name, args=args)
+    return f"{path}?{urlencode(query)}" if query else path
+
+
+HOT_PAGES = [
+    # ====================== SẢN PHẨM ======================
+    Page("product_list", lambda ctx: _url("product_list")),
+    Page("product_list_facets", lambda ctx: _url(
+        "product_list", brand=ctx.product.brand, min_price=1_000_000, max_price=20_000_000, in_stock=1)),
+    Page("product_search", lambda ctx: _url("product_list", q=ctx.product.name.split()[0])),
+    Page("product_list_cursor", lambda ctx: _url("product_list", cursor="")),
+    Page("product_detail", lambda ctx: _url("product_detail", ctx.product.id)),
+    # ====================== GIỎ HÀNG & ĐƠN HÀNG ======================
+    Page("cart", lambda ctx: _url("cart"), login="user"),
+    Page("order_history", lambda ctx: _url("order_history"), login="user"),
+    Page("my_profile", lambda ctx: _url("my_profile"), login="user"),
+    Page("sales_dashboard", lambda ctx: _url("sales_dashboard"), login="staff"),
+    # ====================== BLOG ======================
+    Page("blog_list", lambda ctx: _url("blog_list")),
+    Page("blog_detail", lambda ctx: _url("blog_detail", ctx.blog.id)),
+    # ====================== API ======================
+    Page("api_product_list", lambda ctx: _url("api_product_list", limit=50)),
+    Page("api_product_list_fields", lambda ctx: _url("api_product_list", fields="id,name,price")),
+    Page("api_product_detail", lambda ctx: _url("api_product_detail", ctx.product.id)),
+    Page("api_blog_list", lambda ctx: _url("api_blog_list")),
+    Page("api_blog_detail", lambda ctx: _url("api_blog_detail", ctx.blog.id)),
+]
+
+
+def build_context():
+    """Đối tượng mẫu cho URL; tạo tạm một tài khoản staff (gọi trong transaction sẽ rollback)."""
+    product = Product.objects.order_by("id").first()
+    order = Order.objects.filter(complete=True, user__isnull=False).order_by("id").first()
+    blog = Blog.objects.filter(is_published=True).order_by("id").first()
+    user = order.user if order else User.objects.order_by("id").first()
+    staff = User.objects.filter(is_staff=True, is_active=True).order_by("id").first()
+    if staff is None:
+        staff = User.objects.create_user("audit-staff", is_staff=True)
+    return AuditContext(user=user, staff=staff, product=product, order=order, blog=blog)
+
+
+def capture(client, path):
+    """GET ``path``; trả ``(response, [(sql, params), ...])`` gồm các SELECT, bỏ trùng theo fingerprint."""
+    seen, queries = set(), []
+
+    def wrapper(execute, sql, params, many, context):
+        key = fingerprint(sql)
+        if not many and key not in seen and sql.lstrip().upper().startswith("SELECT"):
+            seen.add(key)
+            queries.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(wrapper):
+        response = client.get(path)
+    return response, queries
+
+
+def explain(sql, params):
+    """Query plan của một câu SQL đã bắt được, dạng text (mỗi bước một dòng)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+        return "\n".join(str(row[-1]) for row in cursor.fetchall())
+
+
+def audit_pages(ctx, pages=None):
+    """Chạy từng trang, trả ``[(page, status, [(sql, plan), ...])]``."""
+    results = []
+    with override_settings(**AUDIT_SETTINGS):
+        for page in pages or HOT_PAGES:
+            client = Client()
+            if page.login:
+                client.force_login(ctx.staff if page.login == "staff" else ctx.user)
+            response, queries = capture(client, page.url(ctx))
+            results.append((page, response.status_code, [(sql, explain(sql, params)) for sql, params in queries]))
+    return results
+
+
+def analyze_plan(plan, vendor):
+    """Trả về ``(problems, notes)``: bảng bị quét toàn bộ, và các bước sort tạm."""
+    problems, notes = [], []
+    if vendor == "sqlite":
+        for line in plan.splitlines():
+            match = _SQLITE_SCAN_RE.search(line)
+            if match:
+                problems.append(f"full scan: {match.group(1)}")
+            sort = _SQLITE_SORT_RE.search(line)
+            if sort:
+                notes.append(f"temp b-tree: {sort.group(1)}")
+    elif vendor == "postgresql":
+        problems.extend(f"full scan: {table}" for table in _PG_SCAN_RE.findall(plan))
+        if _PG_SORT_RE.search(plan):
+            notes.append("explicit sort")
+    return problems, notes
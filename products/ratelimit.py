@@ -0,0 +1,110 @@
+# products/ratelimit.py
+"""Giới hạn tần suất kiểu "sliding window counter".
+
+Mỗi ``(scope, ident)`` có một bộ đếm cho cửa sổ hiện tại và cửa sổ liền
+trước; số lần trong ``window`` giây gần nhất được ước lượng bằng
+
+    trước * (phần cửa sổ trước còn nằm trong khoảng) + hiện tại
+
+nên không bị "xả" gấp đôi ở ranh giới như fixed window.
+
+Bộ đếm phải dùng chung cho mọi process, nếu không mỗi worker gunicorn
+đếm riêng và giới hạn thực tế bị nhân lên theo số worker.
+``RATELIMIT_BACKEND``:
+
+* ``"cache"``: một ``incr`` + một ``get_many`` mỗi lần, không chạm DB.
+  Mặc định khi có cache dùng chung (``CACHE_URL`` Redis/Memcached).
+* ``"db"``: bảng ``RateLimitCounter`` (``UPDATE ... SET count = count + 1``).
+  Mặc định khi cache chỉ là LocMem của từng process.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import RateLimitCounter
+
+PREFIX = "rl"
+
+
+def _use_db():
+    return getattr(settings, "RATELIMIT_BACKEND", "cache") == "db"
+
+
+def _base(scope, ident, window):
+    return f"{PREFIX}:{scope}:{ident}:{window}"
+
+
+def _keys(scope, ident, window, now):
+    index = int(now // window)
+    base = _base(scope, ident, window)
+    return f"{base}:{index}", f"{base}:{index - 1}", (now % window) / window
+
+
+def _estimate(previous, current, elapsed):
+    return previous * (1 - elapsed) + current
+
+
+# ====================== BẢNG RateLimitCounter ======================
+def _db_count(base, index):
+    counts = dict(
+        RateLimitCounter.objects.filter(key=base, window__in=[index, index - 1]).values_list("window", "count")
+    )
+    return counts.get(index - 1, 0), counts.get(index, 0)
+
+
+def _db_hit(base, index):
+    rows = RateLimitCounter.objects.filter(key=base, window=index)
+    if rows.update(count=F("count") + 1):
+        return
+    try:
+        with transaction.atomic():
+            RateLimitCounter.objects.create(key=base, window=index, count=1)
+    except IntegrityError:
+        # Request khác vừa tạo cửa sổ này -> cộng vào đó
+        rows.update(count=F("count") + 1)
+        return
+    # Cửa sổ mới: bỏ các cửa sổ không còn dùng để tính nữa
+    RateLimitCounter.objects.filter(key=base, window__lt=index - 1).delete()
+
+
+# ====================== API ======================
+def count(scope, ident, window, now=None):
+    """Số lần (ước lượng) trong ``window`` giây gần nhất."""
+    now = time.time() if now is None else now
+    current, previous, elapsed = _keys(scope, ident, window, now)
+    if _use_db():
+        return _estimate(*_db_count(_base(scope, ident, window), int(now // window)), elapsed)
+    values = cache.get_many([current, previous])
+    return _estimate(values.get(previous, 0), values.get(current, 0), elapsed)
+
+
+def hit(scope, ident, window, now=None):
+    """Ghi nhận một lần; trả về số lần (ước lượng) kể cả lần này."""
+    now = time.time() if now is None else now
+    if _use_db():
+        _db_hit(_base(scope, ident, window), int(now // window))
+        return count(scope, ident, window, now)
+    current, _, _ = _keys(scope, ident, window, now)
+    # add() chỉ đặt khi chưa có; giữ hai cửa sổ để tính phần cửa sổ trước
+    cache.add(current, 0, timeout=int(window * 2) + 1)
+    try:
+        cache.incr(current)
+    except ValueError:  # khóa vừa hết hạn giữa add() và incr()
+        cache.set(current, 1, timeout=int(window * 2) + 1)
+    return count(scope, ident, window, now)
+
+
+def allow(scope, ident, limit, window):
+    """Ghi nhận một lần và cho biết còn trong giới hạn ``limit`` lần / ``window`` giây không."""
+    return hit(scope, ident, window) <= limit
+
+
+def reset(scope, ident, window):
+    if _use_db():
+        RateLimitCounter.objects.filter(key=_base(scope, ident, window)).delete()
+        return
+    current, previous, _ = _keys(scope, ident, window, time.time())
+    cache.delete_many([current, previous])
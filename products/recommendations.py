@@ -0,0 +1,235 @@
+# products/recommendations.py
+"""Gợi ý "sản phẩm liên quan" tính trước, thay cho truy vấn theo brand mỗi request.
+
+1. Đồng xuất hiện: hai sản phẩm nằm trong cùng một đơn đã thanh toán.
+   Điểm = cosine ``co(a, b) / sqrt(n(a) * n(b))`` với ``n(x)`` là số đơn có x.
+   Tính bằng NumPy (vector hóa: sinh cặp trong giỏ, ``np.unique`` đếm,
+   ``lexsort`` lấy top-k) nếu có NumPy, ngược lại dùng ``Counter``.
+2. Thiếu thì bổ sung sản phẩm cùng hãng có giá gần nhất, rồi giá gần nhất
+   bất kể hãng.
+
+Kết quả ghi vào ``ProductRecommendation`` (``RECOMMENDATIONS_PER_PRODUCT`` dòng
+mỗi sản phẩm); ``for_product`` chỉ là một truy vấn theo chỉ mục
+``(product, rank)``. Làm mới: ``manage.py refresh_recommendations`` và task
+``recommendations.refresh`` sau mỗi lần thanh toán (products/tasks.py). Task
+chỉ tính lại các sản phẩm trong đơn: đếm ``n(x)`` cho các sản phẩm liên quan
+và tìm giá gần nhất bằng truy vấn có ``LIMIT``, không quét cả catalog.
+"""
+import bisect
+import math
+from collections import Counter, defaultdict
+from itertools import permutations
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max
+
+from .cache import bump_generation
+from .models import OrderItem, Product, ProductRecommendation
+
+try:
+    import numpy as np
+except ImportError:  # NumPy là tùy chọn
+    np = None
+
+
+def per_product():
+    return getattr(settings, "RECOMMENDATIONS_PER_PRODUCT", 8)
+
+
+def for_product(product_id, limit=4):
+    """Các sản phẩm gợi ý đã tính trước, theo thứ hạng (queryset lazy)."""
+    return Product.objects.filter(recommended_in__product_id=product_id).order_by("recommended_in__rank")[:limit]
+
+
+# ====================== ĐỒNG XUẤT HIỆN ======================
+def _cooccurrence_numpy(orders, products, freq, targets, k):
+    """``orders``/``products``: hai mảng song song (một dòng OrderItem mỗi phần tử)."""
+    product_ids, p = np.unique(np.asarray(products, dtype=np.int64), return_inverse=True)
+    _, o = np.unique(np.asarray(orders, dtype=np.int64), return_inverse=True)
+    n = len(product_ids)
+    if n < 2:
+        return {}
+
+    order = np.argsort(o, kind="stable")
+    o, p = o[order], p[order]
+    starts = np.flatnonzero(np.r_[True, o[1:] != o[:-1]])
+    sizes = np.diff(np.r_[starts, len(o)])
+    counts_per_product = np.array([freq.get(int(pid), 1) for pid in product_ids], dtype=np.float64)
+
+    # Mọi cặp (trái, phải) trong cùng một giỏ: mỗi phần tử lặp lại size lần
+    per_elem = np.repeat(sizes, sizes)
+    left = np.repeat(p, per_elem)
+    offsets = np.arange(per_elem.sum()) - np.repeat(np.cumsum(per_elem) - per_elem, per_elem)
+    right = p[np.repeat(np.repeat(starts, sizes), per_elem) + offsets]
+    keep = (left != right) & np.isin(product_ids[left], np.fromiter(targets, dtype=np.int64))
+    keys, counts = np.unique(left[keep] * n + right[keep], return_counts=True)
+    a, b = keys // n, keys % n
+    scores = counts / np.sqrt(counts_per_product[a] * counts_per_product[b])
+
+    # Top-k mỗi sản phẩm: sắp theo (a, -score, b) rồi lấy k phần tử đầu mỗi nhóm
+    order = np.lexsort((b, -scores, a))
+    a, b, scores = a[order], b[order], scores[order]
+    group_start = np.flatnonzero(np.r_[True, a[1:] != a[:-1]])
+    rank = np.arange(len(a)) - np.repeat(group_start, np.diff(np.r_[group_start, len(a)]))
+    top = rank < k
+
+    result = defaultdict(list)
+    for src, dst, score in zip(product_ids[a[top]], product_ids[b[top]], scores[top]):
+        result[int(src)].append((int(dst), float(score)))
+    return result
+
+
+def _cooccurrence_python(orders, products, freq, targets, k):
+    baskets = defaultdict(set)
+    for order_id, product_id in zip(orders, products):
+        baskets[order_id].add(product_id)
+    pairs = Counter(
+        (a, b) for basket in baskets.values() for a, b in permutations(basket, 2) if a in targets
+    )
+    ranked = defaultdict(list)
+    for (a, b), count in pairs.items():
+        ranked[a].append((b, count / math.sqrt(freq.get(a, 1) * freq.get(b, 1))))
+    return {a: sorted(items, key=lambda x: (-x[1], x[0]))[:k] for a, items in ranked.items()}
+
+
+def cooccurrence(targets, k):
+    """``{product_id: [(recommended_id, score), ...]}`` cho các sản phẩm ``targets``."""
+    targets = set(targets)
+    paid_items = OrderItem.objects.filter(order__complete=True)
+    # Chỉ tải các đơn có chứa sản phẩm cần tính (kèm mọi dòng của đơn đó)
+    orders = paid_items.filter(product__in=targets).values("order_id")
+    rows = list(paid_items.filter(order__in=orders).values_list("order_id", "product_id"))
+    if not rows:
+        return {}
+    # n(x) đếm trên toàn bộ đơn đã thanh toán (mỗi đơn một dòng / sản phẩm),
+    # nhưng chỉ cho các sản phẩm có mặt trong các đơn vừa tải
+    involved = paid_items.filter(order__in=orders).values("product_id")
+    freq = dict(
+        paid_items.filter(product__in=involved).values("product").annotate(n=Count("id")).values_list("product", "n")
+    )
+    order_ids, product_ids = zip(*rows)
+    compute = _cooccurrence_numpy if np is not None else _cooccurrence_python
+    return compute(order_ids, product_ids, freq, targets, k)
+
+
+# ====================== BỔ SUNG: HÃNG / GIÁ ======================
+class _PriceIndex:
+    """Danh sách sản phẩm sắp theo giá (toàn bộ và theo hãng) để tìm giá gần nhất.
+
+    Tải cả catalog một lần: dùng khi tính cho nhiều sản phẩm (``--full``).
+    """
+
+    def __init__(self):
+        self.by_brand = defaultdict(list)
+        self.all = []
+        for pk, brand, price in Product.objects.order_by("price", "id").values_list("id", "brand", "price"):
+            self.by_brand[brand].append((int(price), pk))
+            self.all.append((int(price), pk))
+
+    def nearest(self, price, exclude, k, brand=None):
+        """Tối đa ``k`` id có giá gần ``price`` nhất, mở rộng dần hai phía từ vị trí chèn."""
+        items = self.all if brand is None else self.by_brand[brand]
+        found = []
+        hi = bisect.bisect_left(items, (price, -1))
+        lo = hi - 1
+        while len(found) < k and (lo >= 0 or hi < len(items)):
+            take_low = hi >= len(items) or (lo >= 0 and price - items[lo][0] <= items[hi][0] - price)
+            if take_low:
+                candidate, lo = items[lo][1], lo - 1
+            else:
+                candidate, hi = items[hi][1], hi + 1
+            if candidate not in exclude:
+                found.append(candidate)
+        return found
+
+
+class _PriceLookup:
+    """Cùng kết quả với ``_PriceIndex`` nhưng hỏi DB cho từng sản phẩm: hai truy
+    vấn ``LIMIT k`` theo chỉ mục giá mỗi lần, thay vì tải cả catalog khi chỉ
+    cần tính vài sản phẩm (task sau mỗi lần thanh toán)."""
+
+    def nearest(self, price, exclude, k, brand=None):
+        products = Product.objects.exclude(pk__in=exclude)
+        if brand is not None:
+            products = products.filter(brand=brand)
+        below = list(products.filter(price__lt=price).order_by("-price", "-id").values_list("price", "id")[:k])
+        above = list(products.filter(price__gte=price).order_by("price", "id").values_list("price", "id")[:k])
+        found = []
+        while len(found) < k and (below or above):
+            take_low = not above or (below and price - int(below[0][0]) <= int(above[0][0]) - price)
+            found.append((below if take_low else above).pop(0)[1])
+        return found
+
+
+# Từ ngần này sản phẩm trở lên thì tải cả catalog rẻ hơn hỏi từng sản phẩm
+PRICE_INDEX_MIN_TARGETS = 50
+
+
+def build(product_ids=None, k=None):
+    """Tính danh sách gợi ý; trả về ``{product_id: [(recommended_id, score, source), ...]}``."""
+    k = k or per_product()
+    products = Product.objects.all()
+    if product_ids is not None:
+        products = products.filter(pk__in=product_ids)
+    targets = {pk: (brand, int(price)) for pk, brand, price in products.values_list("id", "brand", "price")}
+    if not targets:
+        return {}
+
+    bought = cooccurrence(targets, k)
+    index = _PriceIndex() if len(targets) >= PRICE_INDEX_MIN_TARGETS else _PriceLookup()
+    result = {}
+    for pk, (brand, price) in targets.items():
+        recs = [(b, score, "bought") for b, score in bought.get(pk, [])]
+        chosen = {pk} | {b for b, _, _ in recs}
+        if len(recs) < k:
+            for b in index.nearest(price, chosen, k - len(recs), brand=brand):
+                recs.append((b, 0.0, "brand"))
+                chosen.add(b)
+        if len(recs) < k:
+            for b in index.nearest(price, chosen, k - len(recs)):
+                recs.append((b, 0.0, "price"))
+        result[pk] = recs
+    return result
+
+
+def store(result):
+    """Ghi đè gợi ý của các sản phẩm trong ``result``."""
+    rows = [
+        ProductRecommendation(product_id=pk, recommended_id=b, rank=rank, score=score, source=source)
+        for pk, recs in result.items()
+        for rank, (b, score, source) in enumerate(recs)
+    ]
+    with transaction.atomic():
+        ProductRecommendation.objects.filter(product__in=list(result)).delete()
+        ProductRecommendation.objects.bulk_create(rows, batch_size=1000)
+    bump_generation("recommendations")
+    return len(rows)
+
+
+def refresh(product_ids=None, batch_size=2000):
+    """Tính lại và lưu gợi ý (tất cả sản phẩm nếu ``product_ids`` là None). Trả về số dòng đã ghi."""
+    if product_ids is None:
+        product_ids = list(Product.objects.order_by("id").values_list("id", flat=True))
+    product_ids = list(product_ids)
+    written = 0
+    for start in range(0, len(product_ids), batch_size):
+        written += store(build(product_ids[start:start + batch_size]))
+    return written
+
+
+def stale_product_ids():
+    """Sản phẩm cần làm mới: chưa có gợi ý, hoặc nằm trong đơn được thanh toán
+    sau lần tính gần nhất của sản phẩm đó.
+
+    So với lúc thanh toán (``completed_at``), không phải lúc bỏ vào giỏ: hàng
+    nằm trong giỏ từ trước lần tính nhưng thanh toán sau vẫn là mua chung mới.
+    """
+    missing = Product.objects.filter(recommendations__isnull=True).values_list("id", flat=True)
+    changed = (
+        Product.objects.annotate(computed=Max("recommendations__computed_at"))
+        .filter(orderitem__order__complete=True, orderitem__order__completed_at__gt=F("computed"))
+        .values_list("id", flat=True)
+        .distinct()
+    )
+    return set(missing) | set(changed)
@@ -0,0 +1,92 @@
+# products/routers.py
+"""Chia tải đọc sang replica, ghi luôn về DB chính (``default``).
+
+* Chỉ các model "catalog" (sản phẩm, blog, bình luận, gợi ý, ảnh) được đọc
+  từ replica; giỏ hàng / đơn hàng / session / user / task luôn đọc ở
+  ``default`` vì cần dữ liệu mới nhất ngay trong request.
+* Đang ở trong ``transaction.atomic()`` của ``default`` -> đọc ở ``default``.
+* Sticky-after-write: request nào có ghi DB thì ``ReplicaPinMiddleware``
+  đặt cookie ký ``REPLICA_PIN_COOKIE`` trong ``REPLICA_PIN_SECONDS`` giây;
+  các request kế tiếp của cùng trình duyệt đọc hết từ ``default`` để thấy
+  ngay thay đổi của chính mình dù replica còn trễ.
+* Không khai báo replica (``DATABASE_REPLICA_URLS`` rỗng) -> mọi thứ về
+  ``default``, router gần như không tốn gì.
+
+Trạng thái theo request nằm trong ``contextvars`` nên đúng cho cả view
+sync lẫn async (``sync_to_async`` chép context sang thread).
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_MODELS = {
+    "products.product",
+    "products.blog",
+    "products.comment",
+    "products.productrecommendation",
+    "products.imagederivative",
+}
+
+
+class _RequestState:
+    __slots__ = ("pinned", "wrote")
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+_state = ContextVar("db_routing_state", default=None)
+
+
+def begin_request(pinned=False):
+    return _state.set(_RequestState(pinned))
+
+
+def end_request(token):
+    """Kết thúc request; trả về True nếu request đã ghi DB."""
+    state = _state.get()
+    _state.reset(token)
+    return bool(state and state.wrote)
+
+
+def pin_to_primary():
+    """Buộc phần còn lại của request hiện tại đọc từ ``default``."""
+    state = _state.get()
+    if state is not None:
+        state.pinned = True
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+class PrimaryReplicaRouter:
+    def __init__(self, replicas=None):
+        self.replicas = replica_aliases() if replicas is None else list(replicas)
+
+    def db_for_read(self, model, **hints):
+        if not self.replicas or model._meta.label_lower not in REPLICA_MODELS:
+            return DEFAULT_DB_ALIAS
+        state = _state.get()
+        if state is not None and state.pinned:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(self.replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # Ghi xong thì phần còn lại của request cũng đọc ở default
+            state.wrote = state.pinned = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replica là bản sao của default -> quan hệ giữa chúng luôn hợp lệ
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
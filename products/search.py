@@ -0,0 +1,258 @@
+# products/search.py
+"""Chỉ mục tìm kiếm toàn văn cho sản phẩm (tên + mô tả).
+
+Có ba backend, chọn tự động theo cơ sở dữ liệu đang dùng:
+
+* ``sqlite``   – bảng ảo FTS5 ``products_search_fts``, xếp hạng bằng ``bm25``.
+* ``postgres`` – bảng ``products_search_pg`` với cột ``tsvector`` + chỉ mục GIN,
+  xếp hạng bằng ``ts_rank``.
+* ``python``   – chỉ mục đảo ngược thuần Python lưu trong model ``SearchToken``.
+
+Mọi văn bản đều được "gấp dấu" tiếng Việt trước khi đánh chỉ mục
+(``Điện thoại`` -> ``dien thoai``) nên người dùng gõ có dấu hay không dấu
+đều cho cùng kết quả.
+"""
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+
+FTS_TABLE = "products_search_fts"
+PG_TABLE = "products_search_pg"
+
+# Trọng số: một từ khớp trong tên quan trọng hơn trong mô tả.
+NAME_WEIGHT = 10
+DESCRIPTION_WEIGHT = 1
+
+MAX_RESULTS = 1000
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+# ====================== CHUẨN HÓA VĂN BẢN ======================
+def fold(text):
+    """Bỏ dấu tiếng Việt, chuyển về chữ thường."""
+    if not text:
+        return ""
+    text = text.replace("đ", "d").replace("Đ", "D")
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(ch for ch in decomposed if unicodedata.category(ch) != "Mn")
+    return unicodedata.normalize("NFC", stripped).lower()
+
+
+def tokenize(text):
+    """Tách văn bản (đã gấp dấu) thành danh sách từ."""
+    return _TOKEN_RE.findall(fold(text))
+
+
+def document_for(product):
+    """Trả về (tên, mô tả) đã chuẩn hóa để đưa vào chỉ mục."""
+    return " ".join(tokenize(product.name)), " ".join(tokenize(product.description))
+
+
+# ====================== BACKEND ======================
+class PythonBackend:
+    """Chỉ mục đảo ngược: mỗi dòng ``SearchToken`` là (từ, sản phẩm, trọng số)."""
+
+    name = "python"
+
+    def _token_rows(self, product):
+        from .models import SearchToken
+
+        weights = Counter()
+        for term in tokenize(product.name):
+            weights[term[:64]] += NAME_WEIGHT
+        for term in tokenize(product.description):
+            weights[term[:64]] += DESCRIPTION_WEIGHT
+        return [
+            SearchToken(term=term, product_id=product.pk, weight=weight)
+            for term, weight in weights.items()
+        ]
+
+    def index(self, products):
+        from .models import SearchToken
+
+        products = list(products)
+        with transaction.atomic():
+            SearchToken.objects.filter(product_id__in=[p.pk for p in products]).delete()
+            rows = []
+            for product in products:
+                rows.extend(self._token_rows(product))
+            SearchToken.objects.bulk_create(rows, batch_size=1000)
+
+    def remove(self, product_ids):
+        from .models import SearchToken
+
+        SearchToken.objects.filter(product_id__in=list(product_ids)).delete()
+
+    def clear(self):
+        from .models import SearchToken
+
+        SearchToken.objects.all().delete()
+
+    def search(self, terms, limit):
+        from .models import SearchToken
+
+        scores = None
+        for term in terms:
+            term_scores = defaultdict(int)
+            rows = SearchToken.objects.filter(term__startswith=term).values_list("product_id", "weight")
+            for product_id, weight in rows:
+                term_scores[product_id] += weight
+            if scores is None:
+                scores = term_scores
+            else:
+                # Mọi từ khóa đều phải khớp (AND)
+                scores = {pid: s + term_scores[pid] for pid, s in scores.items() if pid in term_scores}
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+
+class SQLiteFTSBackend:
+    """Bảng ảo FTS5, ``rowid`` chính là ``Product.id``."""
+
+    name = "sqlite"
+
+    def index(self, products):
+        rows = [(p.pk, *document_for(p)) for p in products]
+        if not rows:
+            return
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(r[0],) for r in rows])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)", rows
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in product_ids])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def search(self, terms, limit):
+        match = " AND ".join(f'"{term}"*' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}, %s, %s) AS rank FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s ORDER BY rank, rowid LIMIT %s",
+                [NAME_WEIGHT, DESCRIPTION_WEIGHT, match, limit],
+            )
+            # bm25 càng âm càng liên quan -> đổi dấu để điểm cao là tốt
+            return [(pk, -rank) for pk, rank in cursor.fetchall()]
+
+
+class PostgresBackend:
+    """Cột ``tsvector`` có trọng số A (tên) / D (mô tả) + chỉ mục GIN."""
+
+    name = "postgres"
+
+    def index(self, products):
+        rows = [(p.pk, *document_for(p)) for p in products]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {PG_TABLE} (product_id, document) VALUES "
+                "(%s, setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'D')) "
+                "ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document",
+                rows,
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {PG_TABLE} WHERE product_id = ANY(%s)", [list(product_ids)])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {PG_TABLE}")
+
+    def search(self, terms, limit):
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT product_id, ts_rank(document, q) AS rank "
+                f"FROM {PG_TABLE}, to_tsquery('simple', %s) q "
+                f"WHERE document @@ q ORDER BY rank DESC, product_id LIMIT %s",
+                [tsquery, limit],
+            )
+            return cursor.fetchall()
+
+
+BACKENDS = {
+    "python": PythonBackend,
+    "sqlite": SQLiteFTSBackend,
+    "postgres": PostgresBackend,
+}
+
+_backend = None
+
+
+def get_backend():
+    """Chọn backend theo ``settings.PRODUCT_SEARCH_BACKEND`` (mặc định ``auto``)."""
+    global _backend
+    if _backend is not None:
+        return _backend
+
+    choice = getattr(settings, "PRODUCT_SEARCH_BACKEND", "auto")
+    if choice == "auto":
+        tables = connection.introspection.table_names()
+        if connection.vendor == "sqlite" and FTS_TABLE in tables:
+            choice = "sqlite"
+        elif connection.vendor == "postgresql" and PG_TABLE in tables:
+            choice = "postgres"
+        else:
+            choice = "python"
+    _backend = BACKENDS[choice]()
+    return _backend
+
+
+def reset_backend():
+    global _backend
+    _backend = None
+
+
+# ====================== API ======================
+def index_products(products):
+    get_backend().index(products)
+
+
+def remove_products(product_ids):
+    get_backend().remove(product_ids)
+
+
+def search(query, limit=MAX_RESULTS):
+    """Trả về danh sách ``(product_id, điểm)`` xếp theo độ liên quan giảm dần."""
+    terms = tokenize(query)
+    if not terms:
+        return []
+    return get_backend().search(terms, limit)
+
+
+def search_ids(query, limit=MAX_RESULTS):
+    return [pk for pk, _ in search(query, limit)]
+
+
+def rebuild(batch_size=500):
+    """Xóa và đánh chỉ mục lại toàn bộ sản phẩm. Trả về số sản phẩm đã xử lý."""
+    from .models import Product
+
+    backend = get_backend()
+    backend.clear()
+    total = 0
+    batch = []
+    for product in Product.objects.only("id", "name", "description").iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            backend.index(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        backend.index(batch)
+        total += len(batch)
+    return total
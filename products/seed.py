@@ -0,0 +1,114 @@
+# products/seed.py
+"""Sinh dữ liệu mẫu có thể lặp lại (cùng ``seed`` -> cùng dữ liệu) cho
+audit chỉ mục và benchmark."""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from . import comments, search
+from .models import Blog, Comment, Feedback, Order, OrderItem, Product
+
+WORDS = [
+    "laptop", "mỏng", "nhẹ", "pin", "trâu", "màn", "hình", "sắc", "nét", "bàn", "phím",
+    "chuột", "không", "dây", "gaming", "văn", "phòng", "sinh", "viên", "điện", "thoại",
+    "tai", "nghe", "sạc", "nhanh", "bền", "bỉ", "cao", "cấp", "giá", "rẻ",
+]
+DEFAULTS = {
+    "users": 50,
+    "products": 500,
+    "orders": 200,
+    "items_per_order": 3,
+    "comments": 1000,
+    "blogs": 100,
+    "feedbacks": 100,
+}
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def seed(seed=42, prefix="seed", batch_size=1000, **volumes):
+    """Tạo dữ liệu mẫu. ``volumes`` ghi đè ``DEFAULTS``; trả về dict số lượng đã tạo."""
+    counts = {**DEFAULTS, **volumes}
+    rng = random.Random(seed)
+    now = timezone.now()
+    brands = [value for value, _ in Product.BRAND_CHOICES]
+
+    password = make_password("bench-password")
+    User.objects.bulk_create(
+        [User(username=f"{prefix}-user-{i}", password=password) for i in range(counts["users"])],
+        batch_size=batch_size,
+    )
+    users = list(User.objects.filter(username__startswith=f"{prefix}-user-"))
+
+    Product.objects.bulk_create(
+        [
+            Product(
+                sku=f"{prefix}-{i}",
+                name=f"{rng.choice(brands)} {_sentence(rng, 3)} {i}",
+                brand=rng.choice(brands),
+                description=_sentence(rng, 30),
+                price=rng.randrange(100, 50000) * 1000,
+                delprice=rng.choice([None, rng.randrange(100, 60000) * 1000]),
+                stock=rng.randrange(0, 200),
+            )
+            for i in range(counts["products"])
+        ],
+        batch_size=batch_size,
+    )
+    products = list(Product.objects.filter(sku__startswith=f"{prefix}-"))
+    search.index_products(products)
+
+    orders = Order.objects.bulk_create(
+        [
+            Order(user=rng.choice(users), complete=True, transaction_id=f"{prefix}-{i}")
+            for i in range(counts["orders"])
+        ],
+        batch_size=batch_size,
+    )
+    orders = list(Order.objects.filter(transaction_id__startswith=f"{prefix}-"))
+    items = []
+    for order in orders:
+        for product in rng.sample(products, min(counts["items_per_order"], len(products))):
+            items.append(OrderItem(order=order, product=product, quantity=rng.randint(1, 3)))
+    OrderItem.objects.bulk_create(items, batch_size=batch_size)
+    Order.objects.filter(pk__in=[o.pk for o in orders]).refresh_totals()
+
+    Comment.objects.bulk_create(
+        [
+            Comment(
+                product=rng.choice(products),
+                user=rng.choice(users),
+                content=_sentence(rng, 12),
+                is_active=rng.random() > 0.1,
+            )
+            for _ in range(counts["comments"])
+        ],
+        batch_size=batch_size,
+    )
+    # bulk_create không phát signal -> đếm lại comment_count một lần
+    comments.refresh_counts([p.pk for p in products])
+    Blog.objects.bulk_create(
+        [
+            Blog(
+                title=f"{prefix} {_sentence(rng, 5)}",
+                content=_sentence(rng, 200),
+                created_at=now - timedelta(hours=rng.randrange(0, 24 * 365)),
+                is_published=rng.random() > 0.2,
+            )
+            for _ in range(counts["blogs"])
+        ],
+        batch_size=batch_size,
+    )
+    Feedback.objects.bulk_create(
+        [
+            Feedback(user=rng.choice(users), subject=_sentence(rng, 4), message=_sentence(rng, 40))
+            for _ in range(counts["feedbacks"])
+        ],
+        batch_size=batch_size,
+    )
+    return {**counts, "order_items": len(items)}
@@ -0,0 +1,92 @@
+# products/serializers.py
+"""Serializer cho API JSON chỉ đọc (products/api.py).
+
+``?fields=id,name,price`` -> serializer chỉ giữ các field đó và
+``model_columns`` cho biết cột nào cần ``QuerySet.only()``, nên response
+gọn hơn mà SELECT cũng không kéo ``description`` / ``content`` thừa.
+"""
+from django.urls import reverse
+from rest_framework import serializers
+
+from .models import Blog, Product
+from .recommendations import for_product
+
+
+class SparseFieldsMixin:
+    # Field của serializer -> cột model cần tải (mặc định: cùng tên)
+    source_fields = {}
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+    @classmethod
+    def parse_fields(cls, raw):
+        """``"id,name,foo"`` -> ``["id", "name"]`` (bỏ field lạ); None = tất cả."""
+        wanted = {name.strip() for name in (raw or "").split(",")}
+        return [name for name in cls.Meta.fields if name in wanted] or None
+
+    @classmethod
+    def model_columns(cls, fields=None):
+        columns = {"id"}
+        for name in fields or cls.Meta.fields:
+            columns.update(cls.source_fields.get(name, (name,)))
+        return sorted(columns)
+
+    def _absolute(self, path):
+        request = self.context.get("request")
+        return request.build_absolute_uri(path) if request else path
+
+
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    brand_display = serializers.CharField(source="get_brand_display", read_only=True)
+    price = serializers.IntegerField(read_only=True)
+    delprice = serializers.IntegerField(read_only=True, allow_null=True)
+    in_stock = serializers.SerializerMethodField()
+    url = serializers.SerializerMethodField()
+
+    source_fields = {"brand_display": ("brand",), "in_stock": ("stock",), "url": ()}
+
+    class Meta:
+        model = Product
+        fields = [
+            "id", "sku", "name", "brand", "brand_display", "price", "delprice",
+            "stock", "in_stock", "image", "url", "created_at", "updated_at",
+        ]
+
+    def get_in_stock(self, obj):
+        return obj.stock > 0
+
+    def get_url(self, obj):
+        return self._absolute(reverse("product_detail", args=[obj.pk]))
+
+
+class ProductDetailSerializer(ProductSerializer):
+    recommended = serializers.SerializerMethodField()
+
+    source_fields = {**ProductSerializer.source_fields, "recommended": ()}
+
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ["description", "recommended"]
+
+    def get_recommended(self, obj):
+        # Một truy vấn theo chỉ mục (product, rank), xem products/recommendations.py
+        return [
+            {"id": pk, "name": name, "price": int(price)}
+            for pk, name, price in for_product(obj.pk).values_list("id", "name", "price")
+        ]
+
+
+class BlogSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    url = serializers.SerializerMethodField()
+
+    source_fields = {"url": ()}
+
+    class Meta:
+        model = Blog
+        fields = ["id", "title", "content", "image", "url", "created_at", "updated_at"]
+
+    def get_url(self, obj):
+        return self._absolute(reverse("blog_detail", args=[obj.pk]))
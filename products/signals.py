@@ -0,0 +1,121 @@
+# products/signals.py
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from . import comments, images, search, tasks
+from .cache import bump_generation
+from .checkout import release_reservations
+from .models import Blog, Comment, Order, OrderItem, Product, StockReservation
+
+
+def products_changed_in_bulk(product_ids):
+    """Gọi sau các thao tác hàng loạt (bulk_create/update) vốn không phát signal."""
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    search.index_products(Product.objects.filter(pk__in=product_ids).only("id", "name", "description"))
+    Order.objects.filter(complete=False, order_items__product__in=product_ids).refresh_totals()
+    bump_generation("product")
+    for pk in product_ids:
+        bump_generation("product", pk)
+
+
+# ====================== CHỈ MỤC TÌM KIẾM ======================
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields and not {"name", "description"} & set(update_fields):
+        return
+    tasks.index_products.enqueue([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+
+# ====================== TỔNG TIỀN ĐƠN HÀNG ======================
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def refresh_order_totals(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    Order.objects.filter(pk=instance.order_id).refresh_totals()
+
+
+@receiver(post_save, sender=Product)
+def refresh_open_orders_on_price_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Giá sản phẩm đổi -> tính lại các giỏ hàng đang mở có chứa sản phẩm đó."""
+    if raw or created:
+        return
+    if update_fields and "price" not in update_fields:
+        return
+    Order.objects.filter(complete=False, order_items__product=instance).refresh_totals()
+
+
+# ====================== VÔ HIỆU HÓA CACHE ======================
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_cache(sender, instance, **kwargs):
+    bump_generation("product")
+    bump_generation("product", instance.pk)
+
+
+@receiver(post_save, sender=Product)
+def recommend_new_product(sender, instance, created, raw=False, **kwargs):
+    """Sản phẩm mới chưa có gợi ý -> tính ngay bằng task nền (chỉ phần bổ sung hãng/giá)."""
+    if created and not raw:
+        tasks.refresh_recommendations.enqueue([instance.pk], key=f"recommendations:new:{instance.pk}")
+
+
+@receiver(post_save, sender=Product)
+def warm_product_cache(sender, instance, raw=False, **kwargs):
+    # Chỉ có ích khi cache dùng chung: với LocMem chỉ làm nóng cache của một process
+    if not raw and settings.CACHE_SHARED:
+        tasks.warm_product_cache.enqueue([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+def update_comment_count(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        # Sửa trong admin có thể đổi is_active -> đếm lại
+        comments.refresh_counts([instance.product_id])
+    elif instance.is_active:
+        comments.increment(instance.product_id)
+    else:
+        bump_generation("comments", instance.product_id)
+
+
+@receiver(post_delete, sender=Comment)
+def remove_comment_count(sender, instance, **kwargs):
+    comments.refresh_counts([instance.product_id])
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def invalidate_blog_cache(sender, instance, **kwargs):
+    bump_generation("blog")
+    bump_generation("blog", instance.pk)
+
+
+# ====================== ẢNH PHÁI SINH ======================
+def schedule_image_derivatives(sender, instance, raw=False, update_fields=None, **kwargs):
+    field_name, kind = images.IMAGE_FIELDS[sender._meta.label]
+    if raw or (update_fields and field_name not in update_fields):
+        return
+    images.schedule(getattr(instance, field_name).name, kind)
+
+
+for label in images.IMAGE_FIELDS:
+    post_save.connect(schedule_image_derivatives, sender=label, dispatch_uid=f"image-derivatives:{label}")
+
+
+# ====================== GIỮ HÀNG ======================
+@receiver(pre_delete, sender=Order)
+def release_order_reservations(sender, instance, **kwargs):
+    """Xóa đơn chưa thanh toán -> trả lại hàng đang giữ trước khi cascade xóa khoản giữ."""
+    release_reservations(list(StockReservation.objects.filter(order=instance)))
@@ -0,0 +1,244 @@
+# products/tasks.py
+"""Hàng đợi việc nền dùng chính DB làm broker (không cần Redis/RabbitMQ).
+
+* Khai báo: ``@task(priority=..., max_attempts=...)`` rồi gọi
+  ``func.enqueue(*args, key=..., delay=..., **kwargs)``. Dòng ``Task`` được
+  ghi trong transaction của request nên chỉ worker thấy sau khi commit.
+* ``key`` (idempotency key) là duy nhất: enqueue lần hai với cùng key trả
+  về task cũ thay vì tạo thêm.
+* Worker (``manage.py runworker``) lấy việc theo ``priority`` giảm dần rồi
+  ``run_at``; "claim" bằng ``UPDATE ... WHERE status = 'pending'`` nên nhiều
+  worker/process chạy song song không lấy trùng.
+* Lỗi -> thử lại sau ``TASK_RETRY_BACKOFF * 2^(n-1)`` giây (có jitter, tối
+  đa ``TASK_RETRY_BACKOFF_MAX``); hết ``max_attempts`` -> ``failed``.
+* ``TASKS_ALWAYS_EAGER = True``: chạy ngay sau commit, không cần worker
+  (mặc định khi không có cache dùng chung, xem config/settings.py); nhờ vậy
+  chỉ mục tìm kiếm, email, doanh số... vẫn được cập nhật dù không chạy
+  ``runworker``.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import mail_managers, send_mail
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import analytics, images, recommendations, search
+from .cache import get_cached_product
+from .models import Comment, Feedback, Order, Product, Task
+
+logger = logging.getLogger("products.tasks")
+
+REGISTRY = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, priority, max_attempts):
+        self.func = func
+        self.name = name
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def enqueue(self, *args, priority=None, key=None, delay=None, **kwargs):
+        return enqueue(
+            self.name, args, kwargs,
+            priority=self.priority if priority is None else priority,
+            key=key, delay=delay, max_attempts=self.max_attempts,
+        )
+
+
+def task(name=None, priority=0, max_attempts=5):
+    def decorator(func):
+        registered = TaskFunction(func, name or f"{func.__module__}.{func.__name__}", priority, max_attempts)
+        REGISTRY[registered.name] = registered
+        return registered
+    return decorator
+
+
+# ====================== ENQUEUE ======================
+def enqueue(name, args=(), kwargs=None, priority=0, key=None, delay=None, max_attempts=5):
+    """Thêm task vào hàng đợi. Trả về ``Task`` (None khi chạy eager)."""
+    args, kwargs = list(args), kwargs or {}
+    if getattr(settings, "TASKS_ALWAYS_EAGER", False):
+        transaction.on_commit(lambda: _run_eager(name, args, kwargs))
+        return None
+
+    fields = {
+        "name": name,
+        "args": args,
+        "kwargs": kwargs,
+        "priority": priority,
+        "max_attempts": max_attempts,
+        "run_at": timezone.now() + timedelta(seconds=delay or 0),
+    }
+    if not key:
+        return Task.objects.create(**fields)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(idempotency_key=key, **fields)
+    except IntegrityError:
+        return Task.objects.get(idempotency_key=key)
+
+
+def _run_eager(name, args, kwargs):
+    try:
+        REGISTRY[name].func(*args, **kwargs)
+    except Exception:
+        logger.exception("Task %s lỗi (eager)", name)
+
+
+# ====================== WORKER ======================
+def backoff(attempts):
+    """Số giây chờ trước lần thử lại thứ ``attempts``."""
+    base = getattr(settings, "TASK_RETRY_BACKOFF", 10)
+    delay = min(base * 2 ** (attempts - 1), getattr(settings, "TASK_RETRY_BACKOFF_MAX", 3600))
+    return delay + random.uniform(0, delay / 10)
+
+
+def claim(worker_id, limit):
+    """Giành tối đa ``limit`` task đến hạn cho ``worker_id``."""
+    now = timezone.now()
+    candidates = (
+        Task.objects.filter(status=Task.PENDING, run_at__lte=now)
+        .order_by("-priority", "run_at", "id")
+        .values_list("id", flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in list(candidates)
+        if Task.objects.filter(pk=pk, status=Task.PENDING).update(
+            status=Task.RUNNING, locked_by=worker_id, locked_at=now, attempts=F("attempts") + 1,
+        )
+    ]
+    return list(Task.objects.filter(pk__in=claimed).order_by("-priority", "run_at", "id"))
+
+
+def execute(task_row):
+    """Chạy một task đã claim và ghi lại kết quả. Trả về trạng thái mới."""
+    func = REGISTRY.get(task_row.name)
+    now = timezone.now()
+    update = {"locked_by": "", "locked_at": None}
+    try:
+        if func is None:
+            raise LookupError(f"Task chưa đăng ký: {task_row.name}")
+        func.func(*task_row.args, **task_row.kwargs)
+    except Exception as exc:
+        update["last_error"] = traceback.format_exc(limit=20)
+        if task_row.attempts < task_row.max_attempts and not isinstance(exc, LookupError):
+            update.update(status=Task.PENDING, run_at=now + timedelta(seconds=backoff(task_row.attempts)))
+            logger.warning("Task %s #%s lỗi, thử lại lần %s", task_row.name, task_row.pk, task_row.attempts + 1)
+        else:
+            update.update(status=Task.FAILED, finished_at=now)
+            logger.error("Task %s #%s thất bại: %s", task_row.name, task_row.pk, exc)
+    else:
+        update.update(status=Task.DONE, finished_at=now, last_error="")
+    Task.objects.filter(pk=task_row.pk).update(**update)
+    return update["status"]
+
+
+def execute_in_thread(task_row):
+    try:
+        return execute(task_row)
+    finally:
+        close_old_connections()
+
+
+def requeue_stale(timeout=None):
+    """Task ``running`` quá lâu (worker chết giữa chừng) -> trả về hàng đợi."""
+    timeout = timeout or getattr(settings, "TASK_LOCK_TIMEOUT", 600)
+    return Task.objects.filter(
+        status=Task.RUNNING, locked_at__lt=timezone.now() - timedelta(seconds=timeout)
+    ).update(status=Task.PENDING, locked_by="", locked_at=None)
+
+
+def purge_finished(days):
+    return Task.objects.filter(
+        status=Task.DONE, finished_at__lt=timezone.now() - timedelta(days=days)
+    ).delete()[0]
+
+
+def run_pending(worker_id="inline", limit=100):
+    """Chạy tuần tự mọi task đến hạn (test, ``runworker --once``). Trả về số task đã chạy."""
+    count = 0
+    while True:
+        batch = claim(worker_id, limit)
+        if not batch:
+            return count
+        for task_row in batch:
+            execute(task_row)
+            count += 1
+
+
+# ====================== EMAIL ======================
+@task(name="email.welcome", priority=5)
+def send_welcome_email(user_id):
+    user = User.objects.filter(pk=user_id).exclude(email="").first()
+    if user:
+        send_mail(
+            "Chào mừng bạn đến với cửa hàng",
+            f"Xin chào {user.username}, cảm ơn bạn đã đăng ký tài khoản!",
+            None,
+            [user.email],
+        )
+
+
+@task(name="email.order_confirmation", priority=10)
+def send_order_confirmation(order_id):
+    order = Order.objects.select_related("user").get(pk=order_id)
+    if order.user and order.user.email:
+        send_mail(
+            f"Xác nhận đơn hàng {order.transaction_id}",
+            f"Đơn hàng gồm {order.total_items} sản phẩm, tổng {order.total_price:,.0f} VNĐ.",
+            None,
+            [order.user.email],
+        )
+
+
+@task(name="email.feedback")
+def notify_feedback(feedback_id):
+    feedback = Feedback.objects.select_related("user").get(pk=feedback_id)
+    mail_managers(f"Phản hồi mới: {feedback.subject}", f"{feedback.user.username}: {feedback.message}")
+
+
+@task(name="email.comment", priority=-5)
+def notify_comment(comment_id):
+    comment = Comment.objects.select_related("user", "product").get(pk=comment_id)
+    mail_managers(
+        f"Bình luận mới: {comment.product.name}",
+        f"{comment.user.username}: {comment.content}",
+    )
+
+
+# ====================== CHỈ MỤC / ẢNH / GỢI Ý / DOANH SỐ / CACHE ======================
+@task(name="search.index_products", priority=5)
+def index_products(product_ids):
+    search.index_products(Product.objects.filter(pk__in=product_ids).only("id", "name", "description"))
+
+
+@task(name="images.generate")
+def generate_image_derivatives(name, kind):
+    images.generate(name, kind)
+
+
+@task(name="recommendations.refresh", priority=-5)
+def refresh_recommendations(product_ids):
+    recommendations.refresh(product_ids)
+
+
+@task(name="analytics.record_order", priority=-5)
+def record_order_sales(order_id):
+    analytics.record_order(order_id)
+
+
+@task(name="cache.warm_products", priority=-10, max_attempts=1)
+def warm_product_cache(product_ids):
+    for pk in product_ids:
+        get_cached_product(pk)
@@ -0,0 +1,12 @@
+# products/templatetags/currency.py
+from django import template
+
+from ..currency import format_vnd
+
+register = template.Library()
+
+
+@register.filter(is_safe=True)
+def vnd(value):
+    """``{{ product.price|vnd }}`` -> ``1,250,000 VNĐ`` (xem products/currency.py)."""
+    return format_vnd(value)
@@ -0,0 +1,44 @@
+# products/templatetags/responsive_images.py
+from django import template
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+from django.utils.safestring import mark_safe
+
+from ..images import CONTENT_TYPES, derivatives_for
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(field, sizes="100vw", alt="", **attrs):
+    """``<picture>`` với ``srcset`` WebP + ảnh dự phòng từ products/images.py.
+
+    Ví dụ: ``{% responsive_image product.image sizes="(min-width: 768px) 25vw, 100vw" alt=product.name class="card-img-top" %}``
+    """
+    if not field:
+        return ""
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    rows = derivatives_for(field.name)
+    if not rows:
+        return format_html('<img src="{}" alt="{}"{}>', field.url, alt, flatatt(attrs))
+
+    srcsets = {}
+    for fmt, width, url in rows:
+        srcsets.setdefault(fmt, []).append(f"{url} {width}w")
+    fallback_fmt = next(fmt for fmt in srcsets if fmt != "webp") if len(srcsets) > 1 else "webp"
+    fallback = srcsets[fallback_fmt]
+    sources = "".join(
+        format_html('<source type="{}" srcset="{}" sizes="{}">', CONTENT_TYPES[fmt], ", ".join(items), sizes)
+        for fmt, items in srcsets.items()
+        if fmt != fallback_fmt
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}"{}></picture>',
+        mark_safe(sources),
+        fallback[-1].rsplit(" ", 1)[0],
+        ", ".join(fallback),
+        sizes,
+        alt,
+        flatatt(attrs),
+    )
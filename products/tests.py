@@ -1,3 +1,1324 @@
-from django.test import TestCase
+import io
+import json
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from config.cache import cache_config, is_shared
+
+from . import (
+    analytics, benchmark, cart, checkout, comments, facets, importexport, query_audit, ratelimit, recommendations,
+    routers, search, tasks,
+)
+from .admin import EstimatedCountPaginator
+from .currency import format_vnd
+from .benchmark import use_async_views
+from .cache import get_cached_product, version_key
+from .middleware import ReplicaPinMiddleware
+from .models import (
+    Blog, Comment, CustomerSales, DailyBrandSales, DailyProductSales, DailySales, ImageDerivative, Order, OrderItem,
+    Product, RateLimitCounter, StockReservation, Task,
+)
+from .pagination import NEXT, CursorPaginator, encode_cursor
+from .profiling import QueryBudgetExceeded, assert_query_budget, fingerprint
+from .seed import seed
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("buyer", password="secret")
+        order = Order.objects.create(user=cls.user)
+        for i in range(5):
+            product = Product.objects.create(name=f"Laptop {i}", brand="HP", price=1000 + i, stock=10)
+            OrderItem.objects.create(order=order, product=product, quantity=2)
+            Comment.objects.create(product=product, user=cls.user, content="Sản phẩm tốt")
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_fingerprint_groups_same_query(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a'"),
+            fingerprint("SELECT * FROM t WHERE id = 42 AND name = 'bb'"),
+        )
+
+    def test_cart_does_not_query_per_item(self):
+        with assert_query_budget(5) as recorder:
+            response = self.client.get(reverse("cart"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(recorder.duplicates(), {})
+
+    def test_cart_writes_fit_their_budget(self):
+        product = Product.objects.first()
+        newcomer = User.objects.create_user("newcomer", password="secret")
+        for user in (self.user, newcomer):  # giỏ đã có hàng / giỏ chưa tồn tại
+            self.client.force_login(user)
+            with assert_query_budget(settings.QUERY_BUDGETS["update_item"]):
+                response = self.client.post(
+                    reverse("update_item"), json.dumps({"productId": product.pk, "action": "add"}),
+                    content_type="application/json",
+                )
+            self.assertEqual(response.status_code, 200)
+            with assert_query_budget(settings.QUERY_BUDGETS["add_to_cart"]):
+                self.client.post(reverse("add_to_cart", args=[product.pk]))
+            order = Order.objects.with_totals().get(user=user, complete=False)
+            self.assertEqual(response.json()["cart_total"], order.total_items - 1)
+            self.assertEqual((order.total_items, order.total_price),
+                             (order.computed_total_items, order.computed_total_price))
+
+    def test_budget_exceeded_reports_duplicates(self):
+        with self.assertRaises(QueryBudgetExceeded) as ctx:
+            with assert_query_budget(1):
+                for item in OrderItem.objects.all():
+                    item.product.name
+        self.assertIn("5x", str(ctx.exception))
+
+    def test_debug_headers(self):
+        with self.settings(DEBUG=True):
+            response = self.client.get(reverse("product_list"))
+        self.assertIn("X-Query-Count", response)
+        self.assertIn("db;dur=", response["Server-Timing"])
+
+
+class OrderTotalsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("totals", password="pw")
+        cls.laptop = Product.objects.create(name="Laptop T", brand="HP", price=10_000_000, stock=10)
+        cls.mouse = Product.objects.create(name="Chuột T", brand="Phụ kiện", price=200_000, stock=10)
+
+    def assert_totals(self, order, items, price):
+        stored = Order.objects.with_totals().get(pk=order.pk)
+        self.assertEqual((order.total_items, order.total_price), (items, price))
+        self.assertEqual((stored.total_items, stored.total_price), (items, price))
+        self.assertEqual((stored.computed_total_items, stored.computed_total_price), (items, price))
+
+    def test_stored_totals_follow_add_update_remove(self):
+        order = cart.add_item(self.user, self.laptop, 2)
+        self.assert_totals(order, 2, 20_000_000)
+        order = cart.add_item(self.user, self.mouse)
+        self.assert_totals(order, 3, 20_200_000)
+        order = cart.remove_item(self.user, self.laptop)
+        self.assert_totals(order, 2, 10_200_000)
+        order = cart.remove_item(self.user, self.mouse)  # số lượng về 0 -> xóa dòng
+        self.assert_totals(order, 1, 10_000_000)
+
+        item = OrderItem.objects.get(order=order, product=self.laptop)
+        self.assert_totals(cart.set_quantity(item, 4), 4, 40_000_000)
+        self.assert_totals(cart.delete_item(item), 0, 0)
+
+        # Ghi thẳng qua model (admin, shell): signal tính lại
+        OrderItem.objects.create(order=order, product=self.mouse, quantity=3)
+        order.refresh_from_db()
+        self.assert_totals(order, 3, 600_000)
+
+    def test_reconcile_fixes_drifted_orders(self):
+        order = cart.add_item(self.user, self.laptop, 2)
+        paid = Order.objects.create(user=User.objects.create_user("paid-totals"), complete=True)
+        OrderItem.objects.create(order=paid, product=self.mouse, quantity=1)
+        # update() không phát signal -> cột tổng lệch
+        Order.objects.filter(pk__in=[order.pk, paid.pk]).update(total_items=99, total_price=1)
+
+        out = io.StringIO()
+        call_command("reconcile_order_totals", "--dry-run", stdout=out)
+        self.assertIn(f"Order #{order.pk}", out.getvalue())
+        self.assertEqual(Order.objects.get(pk=order.pk).total_items, 99)
+
+        call_command("reconcile_order_totals", "--open-only", stdout=io.StringIO())
+        order.refresh_from_db()
+        self.assert_totals(order, 2, 20_000_000)
+        self.assertEqual(Order.objects.get(pk=paid.pk).total_items, 99)
+
+        call_command("reconcile_order_totals", "--batch-size", "1", stdout=io.StringIO())
+        paid.refresh_from_db()
+        self.assert_totals(paid, 1, 200_000)
+        out = io.StringIO()
+        call_command("reconcile_order_totals", stdout=out)
+        self.assertIn("Không có đơn hàng nào bị lệch", out.getvalue())
+
+
+class QueryAuditTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("auditor", password="secret")
+        product = Product.objects.create(name="Laptop Audit", brand="HP", price=1000, stock=3)
+        order = Order.objects.create(user=user, complete=True)
+        OrderItem.objects.create(order=order, product=product, quantity=1)
+        Blog.objects.create(title="Bài viết", content="Nội dung")
+
+    def test_audit_explains_sql_the_views_run(self):
+        ctx = query_audit.build_context()
+        results = {page.name: (status, queries) for page, status, queries in query_audit.audit_pages(ctx)}
+        self.assertEqual(set(results), {page.name for page in query_audit.HOT_PAGES})
+        for name, (status, queries) in results.items():
+            with self.subTest(page=name):
+                self.assertEqual(status, 200)
+                self.assertTrue(queries)
+                self.assertTrue(all(plan for _, plan in queries))
+        # Đúng truy vấn của view: đếm facet, tổng đơn của profile đọc từ CustomerSales
+        self.assertTrue(any("FILTER (WHERE" in sql for sql, _ in results["product_list_facets"][1]))
+        self.assertTrue(any('"products_customersales"' in sql for sql, _ in results["my_profile"][1]))
+
+    def test_fts_lookup_is_not_a_full_scan(self):
+        plan = "SCAN products_search_fts VIRTUAL TABLE INDEX 0:M2\nSCAN products_product"
+        self.assertEqual(query_audit.analyze_plan(plan, "sqlite")[0], ["full scan: products_product"])
+
+
+class ConcurrentCartTests(TransactionTestCase):
+    """Nhiều thread cùng thêm một sản phẩm vào giỏ của cùng một user."""
+
+    THREADS = 8
+    CLICKS = 10
+
+    def setUp(self):
+        self.user = User.objects.create_user("clicker", password="secret")
+        self.product = Product.objects.create(name="Chuột", brand="Other", price=150000, stock=100)
+
+    def _hammer(self, barrier, errors):
+        try:
+            barrier.wait()
+            for _ in range(self.CLICKS):
+                cart.add_item(self.user, self.product)
+        except Exception as exc:  # pragma: no cover - được báo lại ở assert
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    def test_no_lost_increments_or_duplicate_orders(self):
+        barrier = threading.Barrier(self.THREADS)
+        errors = []
+        threads = [threading.Thread(target=self._hammer, args=(barrier, errors)) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        order = Order.objects.get(user=self.user, complete=False)
+        item = order.order_items.get()
+        self.assertEqual(item.quantity, self.THREADS * self.CLICKS)
+        self.assertEqual(order.total_items, self.THREADS * self.CLICKS)
+        self.assertEqual(order.total_price, self.product.price * self.THREADS * self.CLICKS)
+
+
+class CheckoutRaceTests(TransactionTestCase):
+    """Thêm vào giỏ đúng lúc giỏ đó đang được thanh toán."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("racer", password="secret")
+        self.paid = Product.objects.create(name="Laptop", brand="HP", price=1_000_000, stock=5)
+        self.late = Product.objects.create(name="Chuột", brand="Other", price=100_000, stock=5)
+        cart.add_item(self.user, self.paid)
+        self.order = cart.get_open_order(self.user)
+
+    def test_add_waiting_on_checkout_goes_to_a_new_cart(self):
+        locked, release = threading.Event(), threading.Event()
+        reserve_order = checkout.reserve_order
+
+        def slow_reserve(order):
+            # complete_checkout đang giữ khóa đơn hàng
+            result = reserve_order(order)
+            locked.set()
+            release.wait(5)
+            return result
+
+        def run(func, *args):
+            try:
+                func(*args)
+            finally:
+                connection.close()
+
+        with mock.patch.object(checkout, "reserve_order", slow_reserve):
+            payer = threading.Thread(target=run, args=(checkout.complete_checkout, self.order))
+            payer.start()
+            self.assertTrue(locked.wait(5))
+            adder = threading.Thread(target=run, args=(cart.add_item, self.user, self.late))
+            adder.start()
+            adder.join(0.3)  # add_item đang chờ khóa của checkout
+            release.set()
+            payer.join()
+            adder.join()
+
+        paid = Order.objects.get(pk=self.order.pk)
+        self.assertTrue(paid.complete)
+        self.assertEqual(list(paid.order_items.values_list("product_id", flat=True)), [self.paid.pk])
+        self.assertEqual(paid.total_price, self.paid.price)
+        fresh = Order.objects.get(user=self.user, complete=False)
+        self.assertEqual(list(fresh.order_items.values_list("product_id", flat=True)), [self.late.pk])
+        self.assertEqual(fresh.total_items, 1)
+
+    def test_item_of_paid_order_is_not_changed(self):
+        item = self.order.order_items.get()
+        checkout.complete_checkout(self.order)
+        self.assertIsNone(cart.set_quantity(item, 3))
+        self.assertIsNone(cart.delete_item(item))
+        self.assertEqual(OrderItem.objects.get(pk=item.pk).quantity, 1)
+
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("shopper", password="secret")
+        self.product = Product.objects.create(name="Tai nghe", brand="Other", price=200000, stock=3)
+        cart.add_item(self.user, self.product, quantity=2)
+        self.client.force_login(self.user)
+
+    def test_checkout_page_reserves_stock_and_post_completes_order(self):
+        self.client.get(reverse("checkout"))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+        response = self.client.post(reverse("checkout"), {"address": "11 Hoa Cau", "city": "HCM", "zipcode": "70000"})
+        self.assertRedirects(response, reverse("my_profile"))
+        order = Order.objects.get(user=self.user, complete=True)
+        self.assertTrue(order.transaction_id)
+        self.assertEqual(order.shippingaddress_set.get().city, "HCM")
+        self.assertFalse(StockReservation.objects.exists())
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+
+    def test_blank_address_keeps_order_open(self):
+        self.client.get(reverse("checkout"))
+        response = self.client.post(reverse("checkout"), {"address": " ", "city": "HCM", "zipcode": ""})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.context["errors"]), {"address", "zipcode"})
+        self.assertContains(response, 'value="HCM"', status_code=400)
+        order = Order.objects.get(user=self.user)
+        self.assertFalse(order.complete)
+        self.assertFalse(order.shippingaddress_set.exists())
+        # Hàng vẫn chỉ đang được giữ (như lúc vào trang), chưa bị trừ cho đơn đã thanh toán
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertEqual(StockReservation.objects.get().quantity, 2)
+
+    def test_expired_reservation_returns_stock(self):
+        order = cart.get_open_order(self.user)
+        checkout.reserve_order(order)
+        released = checkout.release_expired(now=timezone.now() + timedelta(days=1))
+        self.assertEqual(released, 1)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 3)
+
+    def test_out_of_stock_rolls_back(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=1)
+        response = self.client.post(reverse("checkout"), {"address": "x", "city": "y", "zipcode": "z"})
+        self.assertRedirects(response, reverse("cart"), fetch_redirect_response=False)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 1)
+        self.assertFalse(Order.objects.filter(complete=True).exists())
+
+
+class AsyncViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("async-buyer", password="secret")
+        cls.product = Product.objects.create(name="Laptop A", brand="HP", price=1000, stock=10)
+        cls.related = Product.objects.create(name="Laptop B", brand="HP", price=2000, stock=10)
+        Comment.objects.create(product=cls.product, user=cls.user, content="Máy chạy rất êm")
+        recommendations.refresh()
+
+    def setUp(self):
+        switch = use_async_views()
+        switch.__enter__()
+        self.addCleanup(switch.__exit__, None, None, None)
+
+    async def test_product_list_and_detail(self):
+        response = await self.async_client.get(reverse("product_list"))
+        self.assertEqual(response.resolver_match.func.__module__, "products.async_views")
+        self.assertContains(response, "Laptop B")
+
+        response = await self.async_client.get(reverse("product_detail", args=[self.product.id]))
+        self.assertContains(response, "Máy chạy rất êm")
+        self.assertContains(response, "Laptop B")
+
+        response = await self.async_client.get(reverse("product_detail", args=[999999]))
+        self.assertEqual(response.status_code, 404)
+
+    async def test_update_item_and_cart(self):
+        await self.async_client.aforce_login(self.user)
+        for _ in range(2):
+            response = await self.async_client.post(
+                reverse("update_item"),
+                json.dumps({"productId": self.product.id, "action": "add"}),
+                content_type="application/json",
+            )
+        self.assertEqual(response.json()["cart_total"], 2)
+
+        response = await self.async_client.get(reverse("cart"))
+        self.assertContains(response, "Laptop A")
+
+
+    async def test_query_budget_counts_queries_from_sync_to_async(self):
+        # ORM trong view async chạy qua sync_to_async, trên kết nối của thread khác
+        await self.async_client.aforce_login(self.user)
+        with self.settings(DEBUG=True):
+            response = await self.async_client.get(reverse("cart"))
+        self.assertGreater(int(response["X-Query-Count"]), 0)
+        # Chỉ xem giỏ thì không tạo Order rỗng
+        self.assertFalse(await Order.objects.filter(user=self.user).aexists())
+
+        with self.settings(QUERY_BUDGETS={"cart": 1}, QUERY_BUDGET_STRICT=True):
+            client = AsyncClient()
+            await client.aforce_login(self.user)
+            with self.assertLogs("products.querybudget", "WARNING"), self.assertRaises(QueryBudgetExceeded):
+                await client.get(reverse("cart"))
+
+class BenchmarkDriverTests(TransactionTestCase):
+    """Driver ASGI chạy ORM ở thread khác -> cần dữ liệu đã commit."""
+
+    def setUp(self):
+        seed(products=30, users=3, orders=5, comments=10, blogs=2, feedbacks=1)
+        self.data = benchmark.BenchData()
+        cache.clear()
+
+    def test_asgi_counts_queries_like_wsgi(self):
+        for async_views in (False, True):
+            for name in ("browse", "detail", "cart", "update_item"):
+                with self.subTest(scenario=name, async_views=async_views):
+                    wsgi, asgi = benchmark.probe_queries(benchmark.SCENARIOS[name], self.data, async_views=async_views)
+                    self.assertGreater(wsgi, 0)
+                    self.assertEqual(asgi, wsgi)
+        result = benchmark.run_asgi(benchmark.SCENARIOS["cart"], self.data, requests=4, concurrency=2)
+        self.assertGreater(result.mean_queries, 0)
+
+    def test_mismatch_is_reported(self):
+        with mock.patch.object(benchmark, "probe_queries", return_value=(4, 9)):
+            self.assertEqual(
+                benchmark.query_mismatches([benchmark.SCENARIOS["cart"]], self.data), ["cart: wsgi 4 truy vấn, asgi 9"]
+            )
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, TASKS_ALWAYS_EAGER=True)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _upload(self, size=(1200, 800)):
+        from PIL import Image
+
+        out = BytesIO()
+        Image.new("RGB", size, "red").save(out, "PNG")
+        return SimpleUploadedFile("photo.png", out.getvalue(), content_type="image/png")
+
+    def test_upload_generates_hashed_webp_and_fallback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Laptop", brand="HP", price=1000, image=self._upload())
+
+        rows = ImageDerivative.objects.filter(source=product.image.name)
+        self.assertEqual(
+            sorted(rows.values_list("format", "width")),
+            [("jpeg", 320), ("jpeg", 640), ("jpeg", 960), ("webp", 320), ("webp", 640), ("webp", 960)],
+        )
+        self.assertEqual(len({row.digest for row in rows}), 1)
+        self.assertTrue(all(row.file.startswith(f"derivatives/{row.digest}-") for row in rows))
+
+        html = Template("{% load responsive_images %}{% responsive_image p.image alt=p.name %}").render(
+            Context({"p": product})
+        )
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn("960w", html)
+        self.assertNotIn(product.image.url, html)
+
+    def test_small_image_is_not_upscaled(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Chuột", brand="HP", price=1000, image=self._upload((200, 100)))
+        self.assertEqual(
+            set(ImageDerivative.objects.filter(source=product.image.name).values_list("width", "height")),
+            {(200, 100)},
+        )
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        with open(f"{media_root}/clip.bin", "wb") as f:
+            f.write(bytes(range(256)) * 4)
+        self.url = f"{settings.MEDIA_URL}clip.bin"
+
+    def test_full_file_and_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(len(b"".join(response.streaming_content)), 1024)
+        again = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(again.status_code, 304)
+
+    def test_byte_ranges(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/1024")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(b"".join(response.streaming_content), bytes(range(10, 20)))
+
+        tail = self.client.get(self.url, HTTP_RANGE="bytes=-4")
+        self.assertEqual(b"".join(tail.streaming_content), bytes(range(252, 256)))
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="bytes=2000-").status_code, 416)
+        # If-Range cũ hơn file -> gửi lại cả file
+        stale = self.client.get(self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE="Mon, 01 Jan 2001 00:00:00 GMT")
+        self.assertEqual(stale.status_code, 200)
+
+    def test_path_traversal_is_rejected(self):
+        self.assertEqual(self.client.get(f"{settings.MEDIA_URL}../manage.py").status_code, 400)
+        self.assertEqual(self.client.get(f"{settings.MEDIA_URL}missing.png").status_code, 404)
+
+
+class CurrencyFormatTests(SimpleTestCase):
+    def test_matches_intcomma(self):
+        from decimal import Decimal
+
+        from django.contrib.humanize.templatetags.humanize import intcomma
+
+        for value in (0, 999, 1000, 1_250_000, Decimal("15990000"), -50_000):
+            self.assertEqual(format_vnd(value), f"{intcomma(int(value))} VNĐ")
+        self.assertEqual(format_vnd(None), "")
+
+    def test_template_filter(self):
+        html = Template("{% load currency %}{{ p.price|vnd }}|{{ p.delprice|vnd }}").render(
+            Context({"p": Product(price=1_500_000, delprice=None)})
+        )
+        self.assertEqual(html, "1,500,000 VNĐ|")
+
+
+@tasks.task(name="test.flaky", max_attempts=2)
+def flaky_task(log, fail=False):
+    if fail:
+        raise RuntimeError("boom")
+    TaskQueueTests.calls.append(log)
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class TaskQueueTests(TestCase):
+    calls = []
+
+    def setUp(self):
+        TaskQueueTests.calls = []
+
+    def test_idempotency_key_deduplicates(self):
+        first = flaky_task.enqueue("a", key="same")
+        second = flaky_task.enqueue("b", key="same")
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.filter(name="test.flaky").count(), 1)
+
+    def test_priority_order_and_completion(self):
+        flaky_task.enqueue("low", priority=-1)
+        flaky_task.enqueue("high", priority=10)
+        flaky_task.enqueue("later", delay=3600)
+        self.assertEqual(tasks.run_pending(), 2)
+        self.assertEqual(self.calls, ["high", "low"])
+        self.assertEqual(Task.objects.filter(status=Task.DONE).count(), 2)
+        self.assertEqual(Task.objects.get(args=["later"]).status, Task.PENDING)
+
+    def test_retry_with_backoff_then_fail(self):
+        row = flaky_task.enqueue("x", fail=True)
+        with self.assertLogs("products.tasks", "WARNING"):
+            tasks.run_pending()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (Task.PENDING, 1))
+        self.assertGreater(row.run_at, timezone.now())
+        self.assertIn("boom", row.last_error)
+
+        Task.objects.filter(pk=row.pk).update(run_at=timezone.now())
+        with self.assertLogs("products.tasks", "ERROR"):
+            tasks.run_pending()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), (Task.FAILED, 2))
+
+    def test_checkout_enqueues_confirmation(self):
+        user = User.objects.create_user("mailer", email="m@example.com", password="secret")
+        product = Product.objects.create(name="Laptop", brand="HP", price=1000, stock=5)
+        cart.add_item(user, product)
+        order = checkout.complete_checkout(cart.get_open_order(user), address="1 Lê Lợi")
+        self.assertTrue(Task.objects.filter(idempotency_key=f"order-confirmation:{order.pk}").exists())
+
+        tasks.run_pending()
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(order.transaction_id, mail.outbox[0].subject)
+
+
+class TaskWithoutWorkerTests(TestCase):
+    """Không có cache dùng chung (LocMem): task chạy ngay trong process web."""
+
+    def test_new_product_is_searchable_without_worker(self):
+        self.assertTrue(settings.TASKS_ALWAYS_EAGER)
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(name="Bàn phím cơ", brand="Phụ kiện", price=900_000, stock=5)
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(search.search_ids("ban phim"), [product.pk])
+
+    def test_runworker_requires_shared_cache(self):
+        with self.assertRaises(CommandError):
+            call_command("runworker", "--once")
+
+
+class RecommendationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user("shopper", password="secret")
+        cls.a, cls.b, cls.c, cls.d, cls.e = [
+            Product.objects.create(name=name, brand=brand, price=price)
+            for name, brand, price in [
+                ("A", "HP", 1000), ("B", "HP", 5000), ("C", "Lenovo", 9000),
+                ("D", "HP", 1100), ("E", "Xiaomi", 1050),
+            ]
+        ]
+        for basket in [(cls.a, cls.b), (cls.a, cls.b), (cls.a, cls.c), (cls.b, cls.c)]:
+            order = Order.objects.create(user=user, complete=True)
+            for product in basket:
+                OrderItem.objects.create(order=order, product=product)
+
+    def test_bought_together_then_brand_then_price(self):
+        recommendations.refresh()
+        recs = list(
+            self.a.recommendations.order_by("rank").values_list("recommended__name", "source")
+        )
+        self.assertEqual(recs[:4], [("B", "bought"), ("C", "bought"), ("D", "brand"), ("E", "price")])
+
+        with self.assertNumQueries(1):
+            related = [p.name for p in recommendations.for_product(self.a.id, limit=2)]
+        self.assertEqual(related, ["B", "C"])
+
+    def test_price_lookup_matches_full_index(self):
+        index, lookup = recommendations._PriceIndex(), recommendations._PriceLookup()
+        for price, brand, exclude in [(1000, "HP", {self.a.pk}), (1050, None, set()), (9000, None, {self.c.pk}),
+                                      (100, "Lenovo", set()), (7000, None, {self.b.pk, self.c.pk})]:
+            with self.subTest(price=price, brand=brand):
+                self.assertEqual(
+                    lookup.nearest(price, exclude, 3, brand=brand), index.nearest(price, exclude, 3, brand=brand)
+                )
+        # Vài sản phẩm (task sau thanh toán): không tải cả catalog
+        with mock.patch.object(recommendations, "_PriceIndex") as full_index:
+            recs = recommendations.build([self.a.pk])
+        full_index.assert_not_called()
+        self.assertEqual([b for b, _, _ in recs[self.a.pk][:4]], [self.b.pk, self.c.pk, self.d.pk, self.e.pk])
+
+    def test_numpy_and_python_agree(self):
+        if recommendations.np is None:
+            self.skipTest("NumPy không được cài")
+        orders = [1, 1, 2, 2, 3, 3, 3]
+        products = [10, 11, 10, 11, 10, 12, 11]
+        freq = {10: 3, 11: 3, 12: 1}
+        fast = recommendations._cooccurrence_numpy(orders, products, freq, {10, 11, 12}, 2)
+        slow = recommendations._cooccurrence_python(orders, products, freq, {10, 11, 12}, 2)
+        self.assertEqual(set(fast), set(slow))
+        for pk in slow:
+            self.assertEqual([b for b, _ in fast[pk]], [b for b, _ in slow[pk]])
+            for (_, x), (_, y) in zip(fast[pk], slow[pk]):
+                self.assertAlmostEqual(x, y)
+
+    def test_incremental_refresh_picks_up_new_products(self):
+        recommendations.refresh()
+        self.assertEqual(recommendations.stale_product_ids(), set())
+        new = Product.objects.create(name="F", brand="HP", price=1200)
+        self.assertEqual(recommendations.stale_product_ids(), {new.id})
+
+    def test_cart_filled_before_refresh_but_paid_after_is_stale(self):
+        order = Order.objects.create(user=User.objects.create_user("slow-payer"))
+        OrderItem.objects.create(order=order, product=self.d)
+        OrderItem.objects.create(order=order, product=self.e)
+        OrderItem.objects.filter(order=order).update(date_added=timezone.now() - timedelta(hours=1))
+        recommendations.refresh()
+        self.assertEqual(recommendations.stale_product_ids(), set())
+        Order.objects.filter(pk=order.pk).update(complete=True, completed_at=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(recommendations.stale_product_ids(), {self.d.id, self.e.id})
+
+
+class FacetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for name, brand, price, stock in [
+            ("L1", "Lenovo", 4_000_000, 0),
+            ("L2", "Lenovo", 12_000_000, 3),
+            ("H1", "HP", 6_000_000, 1),
+            ("H2", "HP", 25_000_000, 0),
+        ]:
+            Product.objects.create(name=name, brand=brand, price=price, stock=stock)
+
+    def counts(self, **params):
+        filters = facets.parse_filters(params)
+        with self.assertNumQueries(1):
+            return facets.facet_counts(Product.objects.all(), filters)
+
+    def test_each_facet_ignores_its_own_selection(self):
+        result = self.counts(brand="HP", in_stock="1")
+        brands = {b["value"]: b["count"] for b in result["brands"]}
+        # Hãng: chỉ áp dụng bộ lọc còn hàng
+        self.assertEqual((brands["Lenovo"], brands["HP"], result["brand_total"]), (1, 1, 2))
+        # Còn hàng: chỉ áp dụng hãng HP
+        self.assertEqual(result["in_stock"], 1)
+        prices = {p["key"]: p["count"] for p in result["prices"]}
+        self.assertEqual(prices, {"under-5m": 0, "5m-10m": 1, "10m-20m": 0, "over-20m": 0})
+
+    def test_price_bucket_link_selects_bucket(self):
+        result = self.counts(price="5m-10m")
+        selected = [p["key"] for p in result["prices"] if p["selected"]]
+        self.assertEqual(selected, ["5m-10m"])
+        self.assertEqual(result["brand_total"], 1)
+        # Tự nhập đúng cận của khoảng: không phải chọn khoảng
+        result = self.counts(min_price="5000000", max_price="10000000")
+        self.assertEqual([p["key"] for p in result["prices"] if p["selected"]], [])
+        response = self.client.get(reverse("product_list"), {"price": "5m-10m"})
+        self.assertContains(response, "price=10m-20m")
+        self.assertContains(response, 'name="price" value="5m-10m"')
+
+    def test_boundary_price_lands_in_one_bucket(self):
+        Product.objects.create(name="B1", brand="HP", price=10_000_000, stock=1)
+        prices = {p["key"]: p["count"] for p in self.counts()["prices"]}
+        self.assertEqual(prices, {"under-5m": 1, "5m-10m": 1, "10m-20m": 2, "over-20m": 1})
+        self.assertEqual(sum(prices.values()), Product.objects.count())
+
+        def names(**params):
+            return set(facets.apply(Product.objects.all(), facets.parse_filters(params)).values_list("name", flat=True))
+
+        # Link khoảng giá -> danh sách khớp số đếm (nửa mở)
+        self.assertEqual(names(price="5m-10m"), {"H1"})
+        self.assertEqual(names(price="10m-20m"), {"L2", "B1"})
+        # min / max tự nhập gồm cả hai đầu, kể cả khi trùng cận của một khoảng
+        self.assertEqual(names(min_price="5000000", max_price="10000000"), {"H1", "B1"})
+        self.assertEqual(names(price="5m-10m", min_price="5000000", max_price="10000000"), {"H1", "B1"})
+
+    def test_invalid_price_is_ignored(self):
+        response = self.client.get(reverse("product_list"), {"min_price": "abc", "brand": "Lenovo"})
+        self.assertContains(response, "Lenovo (2)")
+        self.assertContains(response, "L2")
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # id tăng dần ngược với độ liên quan: "phím" trong mô tả < trong tên
+        cls.desc = Product.objects.create(name="Chuột không dây", brand="Phụ kiện", price=300_000,
+                                          description="Đi kèm bàn phím mini")
+        cls.name = Product.objects.create(name="Bàn phím cơ", brand="Phụ kiện", price=900_000)
+        cls.other = Product.objects.create(name="Điện thoại", brand="Other", price=5_000_000,
+                                           description="Màn hình lớn")
+
+    def tearDown(self):
+        search.reset_backend()
+
+    def backends(self):
+        tables = connection.introspection.table_names()
+        available = ["python"]
+        if connection.vendor == "sqlite" and search.FTS_TABLE in tables:
+            available.append("sqlite")
+        if connection.vendor == "postgresql" and search.PG_TABLE in tables:
+            available.append("postgres")
+        return available
+
+    def test_backends_fold_diacritics_match_prefix_and_rank_name_first(self):
+        for backend in self.backends():
+            with self.subTest(backend=backend), override_settings(PRODUCT_SEARCH_BACKEND=backend):
+                search.reset_backend()
+                self.assertEqual(search.rebuild(), 3)
+                self.assertEqual(search.get_backend().name, backend)
+                self.assertEqual(search.search_ids("dien thoai"), [self.other.pk])
+                self.assertEqual(search.search_ids("ĐIỆN"), [self.other.pk])
+                # Tiền tố + mọi từ đều phải khớp
+                self.assertEqual(search.search_ids("ban ph"), [self.name.pk, self.desc.pk])
+                self.assertEqual(search.search_ids("phim khong"), [self.desc.pk])
+                self.assertEqual(search.search_ids("!!!"), [])
+                search.remove_products([self.name.pk])
+                self.assertEqual(search.search_ids("phim"), [self.desc.pk])
+
+    def test_sqlite_uses_fts5_when_available(self):
+        if connection.vendor != "sqlite" or search.FTS_TABLE not in connection.introspection.table_names():
+            self.skipTest("SQLite không có FTS5")
+        search.reset_backend()
+        self.assertEqual(search.get_backend().name, "sqlite")
+
+    def test_listing_keeps_relevance_order(self):
+        search.rebuild()
+        response = self.client.get(reverse("product_list"), {"q": "phím"})
+        self.assertEqual([p.pk for p in response.context["page_obj"]], [self.name.pk, self.desc.pk])
+        # Bộ lọc vẫn áp dụng trên kết quả đã xếp hạng
+        response = self.client.get(reverse("product_list"), {"q": "phím", "max_price": "500000"})
+        self.assertEqual([p.pk for p in response.context["page_obj"]], [self.desc.pk])
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        # Ba bài cùng created_at: thứ tự phải phân định bằng id
+        for i, minutes in enumerate([0, 5, 5, 5, 10, 20, 30]):
+            Blog.objects.create(title=f"Bài {i}", content="...", created_at=now - timedelta(minutes=minutes))
+        cls.expected = list(Blog.objects.order_by("-created_at", "id").values_list("pk", flat=True))
+
+    def paginator(self, queryset=None):
+        return CursorPaginator(queryset if queryset is not None else Blog.objects.all(), 3,
+                               ordering=("-created_at", "id"))
+
+    def test_walks_tied_keys_forward_and_back_without_gaps(self):
+        pages, page = [], self.paginator().page()
+        while True:
+            pages.append([b.pk for b in page])
+            if not page.has_next():
+                break
+            page = self.paginator().page(page.next_cursor)
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(p) for p in pages], [3, 3, 1])
+        # Trang cuối: không còn trang sau, không có next_cursor
+        self.assertIsNone(page.next_cursor)
+        self.assertTrue(page.has_previous())
+
+        back = []
+        while page.has_previous():
+            page = self.paginator().page(page.previous_cursor)
+            back.insert(0, [b.pk for b in page])
+        self.assertEqual(back, pages[:-1])
+        self.assertFalse(page.has_previous())
+
+    def test_invalid_or_tampered_cursor_falls_back_to_first_page(self):
+        first = [b.pk for b in self.paginator().page()]
+        for cursor in [
+            "!!!not-base64",
+            encode_cursor("x", [str(timezone.now()), 1]),  # hướng lạ
+            encode_cursor(NEXT, [1]),  # thiếu cột
+            encode_cursor(NEXT, ["không phải ngày", "abc"]),  # sai kiểu
+            encode_cursor(NEXT, "abc"),
+        ]:
+            with self.subTest(cursor=cursor):
+                page = self.paginator().page(cursor)
+                self.assertEqual([b.pk for b in page], first)
+                self.assertFalse(page.has_previous())
+        response = self.client.get(reverse("blog_list"), {"cursor": "!!!not-base64"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_empty_queryset(self):
+        page = self.paginator(Blog.objects.none()).page()
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_other_pages())
+        self.assertIsNone(page.next_cursor)
+        self.assertIsNone(page.previous_cursor)
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter(replicas=["replica1"])
+
+    def test_catalog_reads_use_replica_cart_reads_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Product), "replica1")
+        self.assertEqual(self.router.db_for_read(Order), "default")
+        self.assertEqual(self.router.db_for_write(Product), "default")
+        self.assertFalse(self.router.allow_migrate("replica1", "products"))
+
+    def test_write_pins_rest_of_request(self):
+        token = routers.begin_request()
+        try:
+            self.assertEqual(self.router.db_for_read(Product), "replica1")
+            self.router.db_for_write(Order)
+            self.assertEqual(self.router.db_for_read(Product), "default")
+        finally:
+            self.assertTrue(routers.end_request(token))
+        self.assertEqual(self.router.db_for_read(Product), "replica1")
+
+    def test_reads_inside_primary_transaction_use_primary(self):
+        with mock.patch.object(connection, "in_atomic_block", True):
+            self.assertEqual(self.router.db_for_read(Product), "default")
+
+    def test_middleware_sets_pin_cookie_after_write(self):
+        def view(request):
+            self.router.db_for_write(Order)
+            return HttpResponse()
+
+        def reader(request):
+            return HttpResponse(self.router.db_for_read(Product))
+
+        factory = RequestFactory()
+        with mock.patch.object(routers, "replica_aliases", return_value=["replica1"]):
+            response = ReplicaPinMiddleware(view)(factory.post("/"))
+            cookie = response.cookies["dbpin"]
+            self.assertEqual(cookie["max-age"], 5)
+
+            request = factory.get("/")
+            request.COOKIES["dbpin"] = cookie.value
+            self.assertEqual(ReplicaPinMiddleware(reader)(request).content, b"default")
+            self.assertEqual(ReplicaPinMiddleware(reader)(factory.get("/")).content, b"replica1")
+
+
+class CatalogApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [
+            Product.objects.create(name=f"API {i}", brand="HP", price=1_000_000 * (i + 1), stock=i, description="x" * 50)
+            for i in range(5)
+        ]
+
+    def test_sparse_fields(self):
+        response = self.client.get(reverse("api_product_list"), {"fields": "id,name,price,bogus"})
+        row = response.json()["results"][0]
+        self.assertEqual(row, {"id": self.products[0].pk, "name": "API 0", "price": 1_000_000})
+
+    def test_cursor_pages_and_polls_for_changes(self):
+        url = reverse("api_product_list")
+        first = self.client.get(url, {"limit": 3, "fields": "id"}).json()
+        second = self.client.get(first["next"]).json()
+        self.assertTrue(first["has_more"])
+        self.assertEqual(len(first["results"]) + len(second["results"]), 5)
+        self.assertFalse(second["has_more"])
+
+        # Sản phẩm vừa sửa xuất hiện khi gọi lại "next" của trang cuối
+        self.assertEqual(self.client.get(second["next"]).json()["results"], [])
+        self.products[0].save()
+        changed = self.client.get(second["next"]).json()["results"]
+        self.assertEqual(changed, [{"id": self.products[0].pk}])
+
+    def test_not_modified_skips_serialization(self):
+        url = reverse("api_product_detail", args=[self.products[1].pk])
+        response = self.client.get(url)
+        self.assertEqual(response.json()["description"], "x" * 50)
+        etag = response["ETag"]
+        self.assertTrue(response["Last-Modified"])
+
+        with mock.patch("products.api.ProductDetailSerializer.to_representation") as serialize:
+            with self.assertNumQueries(1):
+                cached = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(cached.status_code, 304)
+        serialize.assert_not_called()
+
+        self.products[1].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_stock_change_invalidates_etag(self):
+        product = self.products[2]
+        url = reverse("api_product_detail", args=[product.pk])
+        etag = self.client.get(url)["ETag"]
+        list_etag = self.client.get(reverse("api_product_list"))["ETag"]
+
+        buyer = User.objects.create_user("api-buyer", password="pw")
+        cart.add_item(buyer, product)
+        checkout.reserve_order(cart.get_open_order(buyer))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["stock"], product.stock - 1)
+        self.assertEqual(
+            self.client.get(reverse("api_product_list"), HTTP_IF_NONE_MATCH=list_etag).status_code, 200
+        )
+
+    def test_list_etag_and_missing_product(self):
+        url = reverse("api_product_list")
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(reverse("api_product_detail", args=[999999])).status_code, 404)
+
+
+class GuestCartTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.laptop = Product.objects.create(name="Laptop G", brand="HP", price=10_000_000, stock=5)
+        cls.mouse = Product.objects.create(name="Mouse G", brand="Phụ kiện", price=200_000, stock=5)
+        cls.user = User.objects.create_user("guest2user", password="pw-12345")
+
+    def test_compact_encoding(self):
+        self.assertEqual(cart.encode_lines({15: 3, 12: 1, 9: 0}), "12:1,15:3")
+        self.assertEqual(cart.decode_lines("12:1,x:2,15:3,7:-1"), {12: 1, 15: 3})
+
+    def test_guest_cart_lives_in_session(self):
+        self.client.get(reverse("add_to_cart", args=[self.laptop.pk]))
+        self.client.get(reverse("add_to_cart", args=[self.laptop.pk]))
+        self.client.post(reverse("update_quantity", args=[self.mouse.pk]), {"quantity": "3"})
+        self.assertEqual(self.client.session[cart.SESSION_KEY], f"{self.laptop.pk}:2,{self.mouse.pk}:3")
+        self.assertFalse(Order.objects.exists())
+
+        response = self.client.get(reverse("cart"))
+        self.assertEqual(response.context["order"].total_price, 20_600_000)
+        self.client.get(reverse("remove_from_cart", args=[self.mouse.pk]))
+        self.assertEqual(self.client.session[cart.SESSION_KEY], f"{self.laptop.pk}:2")
+
+    def test_login_merges_into_open_order(self):
+        cart.add_item(self.user, self.laptop)
+        self.client.get(reverse("add_to_cart", args=[self.laptop.pk]))
+        self.client.get(reverse("add_to_cart", args=[self.mouse.pk]))
+
+        self.client.post(reverse("login"), {"username": "guest2user", "password": "pw-12345"})
+        order = Order.objects.get(user=self.user, complete=False)
+        self.assertEqual(
+            dict(order.order_items.values_list("product__name", "quantity")), {"Laptop G": 2, "Mouse G": 1}
+        )
+        self.assertEqual(order.total_items, 3)
+        self.assertNotIn(cart.SESSION_KEY, self.client.session)
+
+    def test_browsing_catalog_does_not_write(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("product_list"))
+            self.client.get(reverse("product_detail", args=[self.laptop.pk]))
+        writes = [q["sql"] for q in queries if q["sql"].split()[0] in ("INSERT", "UPDATE", "DELETE")]
+        self.assertEqual(writes, [])
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+
+
+class CatalogCacheTests(TestCase):
+    """Ghi dữ liệu -> tăng thế hệ -> trang đã cache của khách không còn được dùng."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name="Laptop Cache", brand="HP", price=1_000_000, stock=5)
+        cls.user = User.objects.create_user("cached-buyer", password="pw")
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def assert_cached(self, url):
+        self.get(url)
+        self.assertEqual(self.get(url)[1], 0)
+
+    def test_product_save_invalidates_list_and_detail(self):
+        list_url, detail_url = reverse("product_list"), reverse("product_detail", args=[self.product.pk])
+        self.assert_cached(list_url)
+        self.assert_cached(detail_url)
+        before = version_key(("product",), ("product", self.product.pk))
+        self.product.name = "Laptop Mới"
+        self.product.save()
+        self.assertNotEqual(version_key(("product",), ("product", self.product.pk)), before)
+        for url in (list_url, detail_url):
+            response, queries = self.get(url)
+            self.assertGreater(queries, 0)
+            self.assertContains(response, "Laptop Mới")
+
+    def test_stock_change_invalidates_detail(self):
+        url = reverse("product_detail", args=[self.product.pk])
+        self.assert_cached(url)
+        cart.add_item(self.user, self.product, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            checkout.complete_checkout(cart.get_open_order(self.user), address="1 Lê Lợi")
+        response, queries = self.get(url)
+        self.assertGreater(queries, 0)
+        self.assertContains(response, "3 sản phẩm")
+        self.assertEqual(get_cached_product(self.product.pk).stock, 3)
+
+    def test_comment_invalidates_detail(self):
+        url = reverse("product_detail", args=[self.product.pk])
+        self.assert_cached(url)
+        Comment.objects.create(product=self.product, user=self.user, content="Máy chạy rất êm")
+        response, queries = self.get(url)
+        self.assertGreater(queries, 0)
+        self.assertContains(response, "Máy chạy rất êm")
+        self.assertContains(response, "Bình luận (1)")
+
+
+class CommentModerationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(name="Commented", brand="HP", price=1_000_000, stock=1)
+        cls.user = User.objects.create_user("commenter", password="pw")
+        cls.admin = User.objects.create_superuser("moderator", "m@example.com", "pw")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_follows_create_and_bulk_moderation(self):
+        for i in range(3):
+            Comment.objects.create(product=self.product, user=self.user, content=f"comment {i}")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.comment_count, 3)
+
+        pks = list(Comment.objects.values_list("pk", flat=True)[:2])
+        # Lấy product_id, UPDATE bình luận, UPDATE đếm lại
+        with self.assertNumQueries(3):
+            self.assertEqual(comments.set_active(Comment.objects.filter(pk__in=pks), False), 2)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.comment_count, 1)
+
+    def test_admin_hide_action(self):
+        for i in range(3):
+            Comment.objects.create(product=self.product, user=self.user, content=f"comment {i}")
+        self.client.force_login(self.admin)
+        pks = list(Comment.objects.values_list("pk", flat=True)[:2])
+        self.client.post(reverse("admin:products_comment_changelist"), {
+            "action": "hide_comments", "_selected_action": pks,
+        })
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.comment_count, 1)
+        self.assertEqual(Comment.objects.filter(is_active=False).count(), 2)
+
+    @override_settings(COMMENT_MODERATION=True)
+    def test_moderated_comment_waits_for_approval(self):
+        self.client.force_login(self.user)
+        self.client.post(reverse("add_comment", args=[self.product.pk]), {"content": "chờ duyệt nhé"})
+        comment = Comment.objects.get()
+        self.assertFalse(comment.is_active)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).comment_count, 0)
+
+        self.assertEqual(comments.set_active(Comment.objects.all(), True), 1)
+        self.assertEqual(Product.objects.get(pk=self.product.pk).comment_count, 1)
+
+    def test_paginated_comments(self):
+        for i in range(12):
+            Comment.objects.create(product=self.product, user=self.user, content=f"comment {i:02d}")
+        first = comments.page(self.product.pk)
+        self.assertEqual(len(first), 10)
+        second = comments.page(self.product.pk, first.next_cursor)
+        self.assertEqual([c.content for c in second], ["comment 01", "comment 00"])
+
+        response = self.client.get(reverse("product_detail", args=[self.product.pk]), {"comments": first.next_cursor})
+        self.assertContains(response, "Bình luận (12)")
+        self.assertContains(response, "comment 00")
+        self.assertNotContains(response, "comment 11")
+
+    def test_comment_posts_are_rate_limited(self):
+        self.client.force_login(self.user)
+        url = reverse("add_comment", args=[self.product.pk])
+        for i in range(settings.COMMENT_RATE_LIMIT + 2):
+            self.client.post(url, {"content": f"spam spam {i}"})
+        self.assertEqual(Comment.objects.count(), settings.COMMENT_RATE_LIMIT)
+
+    def test_sliding_window_weights_previous_window(self):
+        for backend in ("cache", "db"):
+            with self.subTest(backend=backend), self.settings(RATELIMIT_BACKEND=backend):
+                cache.clear()
+                for _ in range(4):
+                    ratelimit.hit("test", 1, 60, now=600)
+                # Nửa cửa sổ sau: 4 lần của cửa sổ trước chỉ còn tính một nửa
+                self.assertEqual(ratelimit.count("test", 1, 60, now=690), 2)
+                self.assertEqual(ratelimit.count("test", 1, 60, now=720), 0)
+
+    def test_db_counter_keeps_only_two_windows(self):
+        with self.settings(RATELIMIT_BACKEND="db"):
+            for now in (0, 60, 120, 180):
+                ratelimit.hit("test", 1, 60, now=now)
+            self.assertEqual(
+                list(RateLimitCounter.objects.order_by("window").values_list("window", flat=True)), [2, 3]
+            )
+            ratelimit.reset("test", 1, 60)
+            self.assertFalse(RateLimitCounter.objects.exists())
+
+
+class AdminPerformanceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin2", "a@example.com", "pw")
+        cls.product = Product.objects.create(name="Bàn phím cơ", brand="Phụ kiện", price=900_000, stock=50)
+        cls.other = Product.objects.create(name="Tai nghe", brand="Phụ kiện", price=500_000, stock=50)
+        search.index_products([cls.product, cls.other])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def add_orders(self, n):
+        for _ in range(n):
+            order = Order.objects.create(user=User.objects.create_user(f"buyer{User.objects.count()}"))
+            OrderItem.objects.create(order=order, product=self.product, quantity=2)
+
+    def changelist_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_orderitem_changelist_has_no_per_row_queries(self):
+        url = reverse("admin:products_orderitem_changelist")
+        self.add_orders(2)
+        few = self.changelist_queries(url)
+        self.add_orders(6)
+        self.assertEqual(self.changelist_queries(url), few)
+
+    @override_settings(ADMIN_EXACT_COUNT_LIMIT=3)
+    def test_large_tables_use_estimated_and_capped_counts(self):
+        self.add_orders(6)
+        admin_site = admin.site._registry[OrderItem]
+        request = RequestFactory().get("/")
+        queryset = admin_site.get_queryset(request).order_by("-pk")
+        # Không lọc -> ước lượng theo rowid, không COUNT(*)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(EstimatedCountPaginator(queryset, 100).count, OrderItem.objects.order_by("-pk")[0].pk)
+        self.assertNotIn("COUNT", queries[0]["sql"])
+        # Có lọc -> đếm nhưng dừng ở ngưỡng + 1
+        self.assertEqual(EstimatedCountPaginator(queryset.filter(quantity=2), 100).count, 4)
+
+    def test_search_uses_product_index_not_text_scan(self):
+        user = User.objects.create_user("reviewer")
+        Comment.objects.create(product=self.product, user=user, content="rất tốt")
+        Comment.objects.create(product=self.other, user=user, content="bàn phím tốt hơn")
+        response = self.client.get(reverse("admin:products_comment_changelist"), {"q": "ban phim"})
+        self.assertEqual([c.product_id for c in response.context["cl"].result_list], [self.product.pk])
+
+
+@override_settings(TASKS_ALWAYS_EAGER=False)
+class SalesRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("manager", password="pw", is_staff=True)
+        cls.buyer = User.objects.create_user("buyer", password="pw")
+        cls.phone = Product.objects.create(name="Điện thoại", brand="Apple", price=1_000_000, stock=100)
+        cls.case = Product.objects.create(name="Ốp lưng", brand="Phụ kiện", price=50_000, stock=100)
+
+    def order(self, days_ago=0, **items):
+        order = Order.objects.create(
+            user=self.buyer, complete=True, completed_at=timezone.now() - timedelta(days=days_ago),
+        )
+        for name, quantity in items.items():
+            OrderItem.objects.create(order=order, product=getattr(self, name), quantity=quantity)
+        Order.objects.filter(pk=order.pk).update(total_items=sum(items.values()))
+        return order
+
+    def snapshot(self):
+        return (
+            sorted(DailySales.objects.values_list("date", "orders", "units", "revenue")),
+            sorted(DailyBrandSales.objects.values_list("date", "brand", "orders", "units", "revenue")),
+            sorted(DailyProductSales.objects.values_list("date", "product_id", "orders", "units", "revenue")),
+        )
+
+    def test_incremental_matches_rebuild_and_never_double_counts(self):
+        orders = [self.order(phone=1, case=2), self.order(case=1), self.order(days_ago=1, phone=2)]
+        for order in orders:
+            self.assertTrue(analytics.record_order(order.pk))
+        self.assertFalse(analytics.record_order(orders[0].pk))
+        incremental = self.snapshot()
+
+        today = timezone.localdate()
+        self.assertEqual(analytics.build(today - timedelta(days=1), today), 3)
+        self.assertEqual(self.snapshot(), incremental)
+        # Đã được build đánh dấu -> task đến muộn không cộng lại
+        late = self.order(phone=1)
+        analytics.build(today, today)
+        self.assertFalse(analytics.record_order(late.pk))
+
+        day = DailySales.objects.get(date=today)
+        self.assertEqual((day.orders, day.units, day.revenue), (3, 5, 2_150_000))
+        self.assertEqual(DailyBrandSales.objects.get(date=today, brand="Phụ kiện").orders, 2)
+        self.assertEqual(CustomerSales.objects.get(user=self.buyer).orders, 4)
+
+    def test_numpy_and_python_aggregation_agree(self):
+        if analytics.np is None:
+            self.skipTest("NumPy chưa cài")
+        for items in ({"phone": 1, "case": 2}, {"case": 1}):
+            self.order(**items)
+        self.order(days_ago=3, phone=2, case=1)
+        rows = analytics._rows(Order.objects.all())
+        self.assertEqual(analytics._aggregate_numpy(rows), analytics._aggregate_python(rows))
+
+    def test_checkout_task_records_sales(self):
+        cart.add_item(self.buyer, self.case, quantity=3)
+        checkout.complete_checkout(cart.get_open_order(self.buyer))
+        tasks.run_pending()
+        self.assertEqual(DailySales.objects.get().units, 3)
+
+    def test_rebuild_uses_price_paid_not_current_price(self):
+        cart.add_item(self.buyer, self.phone, quantity=2)
+        order = checkout.complete_checkout(cart.get_open_order(self.buyer))
+        self.assertEqual(order.order_items.get().unit_price, 1_000_000)
+        tasks.run_pending()
+
+        self.phone.price = 1_500_000
+        self.phone.save()
+        today = timezone.localdate()
+        analytics.build(today, today)
+        self.assertEqual(DailySales.objects.get(date=today).revenue, 2_000_000)
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, 2_000_000)
+        self.assertEqual(order.order_items.get().get_total, 2_000_000)
+
+    def test_profile_counts_order_without_waiting_for_worker(self):
+        cart.add_item(self.buyer, self.case)
+        checkout.complete_checkout(cart.get_open_order(self.buyer))
+        self.client.force_login(self.buyer)
+        response = self.client.get(reverse("my_profile"))
+        self.assertEqual(response.context["total_orders"], 1)
+
+    def test_dashboard_reads_only_rollups(self):
+        analytics.record_order(self.order(phone=1, case=2).pk)
+        self.client.force_login(self.staff)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("sales_dashboard"), {"days": 7})
+        self.assertEqual(response.context["totals"]["revenue"], 1_100_000)
+        self.assertEqual(response.context["products"][0]["product_id"], self.phone.pk)
+        self.assertFalse([q for q in queries if "products_orderitem" in q["sql"]])
+
+    def test_order_history_pages_and_prefetches(self):
+        for days_ago in range(12):
+            analytics.record_order(self.order(days_ago=days_ago, case=1).pk)
+        self.client.force_login(self.buyer)
+        response = self.client.get(reverse("order_history"))
+        page = response.context["page_obj"]
+        self.assertEqual(len(page.object_list), 10)
+        self.assertEqual(response.context["stats"].orders, 12)
+        older = self.client.get(reverse("order_history"), {"cursor": page.next_cursor})
+        self.assertEqual(len(older.context["page_obj"].object_list), 2)
+
+
+class ProductImportTests(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(
+            sku="LT-01", name="Laptop", brand="HP", description="Mô tả cũ", price=1_000_000, delprice=1_200_000, stock=10,
+        )
+
+    def run_import(self, text, fmt="csv"):
+        return importexport.import_products(io.StringIO(text), fmt)
+
+    def test_only_columns_in_file_are_updated(self):
+        result = self.run_import("sku,price,description\nLT-01,900000,\n")
+        self.assertEqual((result.updated, result.failed), (1, 0))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.price, 900_000)
+        self.assertEqual(
+            (self.product.name, self.product.description, self.product.delprice, self.product.stock),
+            ("Laptop", "Mô tả cũ", 1_200_000, 10),
+        )
+
+    def test_new_product_needs_required_columns(self):
+        result = self.run_import('{"sku": "NEW-1", "brand": "HP"}\n{"sku": "NEW-2", "name": "Chuột", "brand": "Khác", "price": 99000}\n', "jsonl")
+        self.assertEqual((result.created, result.failed), (1, 1))
+        self.assertIn("name", result.errors[0][1][0])
+        self.assertEqual(Product.objects.get(sku="NEW-2").stock, 0)
+
+    def test_stock_counts_reserved_units(self):
+        user = User.objects.create_user("holder", password="pw")
+        cart.add_item(user, self.product, quantity=3)
+        checkout.reserve_order(cart.get_open_order(user))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+
+        exported = "".join(importexport.iter_export(Product.objects.all(), "csv"))
+        self.assertIn("LT-01,Laptop,HP,Mô tả cũ,1000000,1200000,10", exported)
+        # Nhập lại đúng số đã xuất: không đổi gì
+        self.run_import(exported)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 7)
+
+        result = self.run_import("sku,stock\nLT-01,2\n")
+        self.assertEqual(result.failed, 1)
+        self.assertIn("stock", result.errors[0][1][0])
+        self.run_import("sku,stock\nLT-01,20\n")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 17)
+
+
+class CacheConfigTests(SimpleTestCase):
+    def test_backend_from_url(self):
+        self.assertEqual(cache_config("")["BACKEND"], "django.core.cache.backends.locmem.LocMemCache")
+        redis = cache_config("redis://cache:6379/1,redis://replica:6379/1")
+        self.assertEqual(redis["LOCATION"], ["redis://cache:6379/1", "redis://replica:6379/1"])
+        memcached = cache_config("memcached://a:11211,b:11211")
+        self.assertEqual(memcached["LOCATION"], ["a:11211", "b:11211"])
+        self.assertTrue(is_shared(memcached))
+        self.assertFalse(is_shared(cache_config("locmem://")))
+        with self.assertRaises(ValueError):
+            cache_config("ftp://cache")
@@ -1,21 +1,30 @@
 # products/urls.py
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+# settings.ASYNC_VIEWS: các endpoint catalog / giỏ hàng dùng bản async (chạy dưới ASGI)
+catalog = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     # ====================== TRANG CHỦ & SẢN PHẨM ======================
-    path('', views.product_list, name='product_list'),
-    path('product/<int:product_id>/', views.product_detail, name='product_detail'),
+    path('', catalog.product_list, name='product_list'),
+    path('product/<int:product_id>/', catalog.product_detail, name='product_detail'),
     
     # ====================== BÌNH LUẬN ======================
     path('product/<int:product_id>/comment/add/', views.add_comment, name='add_comment'),
     
     # ====================== GIỎ HÀNG ======================
-    path('cart/', views.cart, name='cart'),
-    path('update_item/', views.update_item, name='update_item'),  # AJAX
+    path('cart/', catalog.cart, name='cart'),
+    path('update_item/', catalog.update_item, name='update_item'),  # AJAX
     path('add-to-cart/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('remove-item/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('update-quantity/<int:item_id>/', views.update_quantity, name='update_quantity'),
+    path('checkout/', views.checkout, name='checkout'),
+
+    # ====================== ĐƠN HÀNG & DOANH SỐ ======================
+    path('orders/', views.order_history, name='order_history'),
+    path('dashboard/sales/', views.sales_dashboard, name='sales_dashboard'),
     
     # ====================== BLOG ======================
     path('blogs/', views.blog_list, name='blog_list'),
@@ -26,4 +35,10 @@ urlpatterns = [
     path('profile/', views.my_profile, name='my_profile'),
     path('edit_profile/', views.edit_profile, name='edit_profile'),
     path('feedback/', views.submit_feedback, name='submit_feedback'),
+
+    # ====================== API (JSON, chỉ đọc) ======================
+    path('api/products/', api.product_list, name='api_product_list'),
+    path('api/products/<int:product_id>/', api.product_detail, name='api_product_detail'),
+    path('api/blogs/', api.blog_list, name='api_blog_list'),
+    path('api/blogs/<int:pk>/', api.blog_detail, name='api_blog_detail'),
 ]
\ No newline at end of file
@@ -1,67 +1,127 @@
 # products/views.py
 from django.shortcuts import render, get_object_or_404, redirect
 from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import JsonResponse, Http404
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
-from .models import Product, Order, OrderItem, Comment, Feedback, Blog
+from django.conf import settings
+from django.db.models import Case, When, IntegerField, Prefetch, prefetch_related_objects
+from django.utils.functional import SimpleLazyObject
+from .models import Product, Order, OrderItem, Comment, CustomerSales, Feedback, Blog
+from . import analytics
+from . import cart as cart_service
+from . import comments as comment_service
+from . import facets
+from . import checkout as checkout_service
+from . import ratelimit
+from . import recommendations
+from . import search
+from . import tasks
+from .cache import cache_anonymous_page, cache_timeout, get_cached_product, version_key
+from .pagination import CursorPaginator
 import json
+from datetime import timedelta
+
+from django.utils import timezone
 
 
 # ====================== SẢN PHẨM ======================
+def use_cursor_pagination(request):
+    """Bật phân trang cursor qua settings.CATALOG_PAGINATION = "cursor" hoặc ?cursor=..."""
+    return settings.CATALOG_PAGINATION == "cursor" or "cursor" in request.GET
+
+
+def filter_catalog(request):
+    """Áp dụng tìm kiếm & bộ lọc (products/facets.py) từ query string.
+
+    Trả về ``(products, base, filters)``: ``base`` mới chỉ lọc theo từ khóa,
+    dùng để đếm facet. Dùng chung cho bản sync và async (products/async_views.py).
+    """
+    filters = facets.parse_filters(request.GET)
+    base = Product.objects.all().order_by("id")
+
+    # Tìm kiếm (chỉ mục toàn văn, xếp theo độ liên quan)
+    if filters.query:
+        ranked_ids = search.search_ids(filters.query)
+        base = base.filter(pk__in=ranked_ids).order_by(
+            Case(
+                *[When(pk=pk, then=position) for position, pk in enumerate(ranked_ids)],
+                output_field=IntegerField(),
+            )
+        )
+
+    # Lọc thương hiệu / giá / còn hàng
+    return facets.apply(base, filters), base, filters
+
+
+def catalog_context(filters, facet_counts):
+    return {
+        "facets": facet_counts,
+        "selected_brand": filters.brand or "all",
+        "query": filters.query,
+        # Ô nhập chỉ hiện giá tự nhập, không hiện cận của khoảng giá đang chọn
+        "min_price": None if filters.price_bucket else filters.min_price,
+        "max_price": None if filters.price_bucket else filters.max_price,
+        "price_bucket": filters.price_bucket,
+        "in_stock": filters.in_stock,
+    }
+
+
+@cache_anonymous_page(lambda request: [("product",), ("images",)])
 def product_list(request):
-    """Danh sách sản phẩm có tìm kiếm & lọc"""
-    products = Product.objects.all().order_by("id")
-
-    # Tìm kiếm
-    query = request.GET.get("q")
-    if query:
-        products = products.filter(Q(name__icontains=query) | Q(description__icontains=query))
-
-    # Lọc thương hiệu
-    brand = request.GET.get("brand")
-    if brand and brand != "all":
-        products = products.filter(brand=brand)
-
-    # Lọc giá
-    min_price = request.GET.get("min_price")
-    max_price = request.GET.get("max_price")
-    if min_price:
-        products = products.filter(price__gte=min_price)
-    if max_price:
-        products = products.filter(price__lte=max_price)
-
-    # Phân trang
-    paginator = Paginator(products, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-
-    brands = dict(Product.BRAND_CHOICES).keys()
+    """Danh sách sản phẩm có tìm kiếm, lọc & đếm facet"""
+    products, base, filters = filter_catalog(request)
+    query = filters.query
+
+    # Phân trang: cursor (keyset) hoặc offset truyền thống.
+    # Kết quả tìm kiếm xếp theo độ liên quan nên luôn dùng offset.
+    cursor_mode = use_cursor_pagination(request) and not query
+    if cursor_mode:
+        page_obj = CursorPaginator(products, 12, ordering=("id",)).page(request.GET.get("cursor"))
+        page_range = None
+    else:
+        paginator = Paginator(products, 12)
+        page_obj = paginator.get_page(request.GET.get("page"))
+        page_range = paginator.get_elided_page_range(page_obj.number, on_each_side=2, on_ends=1)
 
     context = {
+        **catalog_context(filters, facets.facet_counts(base, filters)),
         "page_obj": page_obj,
-        "brands": brands,
-        "selected_brand": brand or "all",
-        "query": query,
-        "min_price": min_price,
-        "max_price": max_price,
+        "page_range": page_range,
+        "cursor_mode": cursor_mode,
+        "cache_timeout": cache_timeout(),
+        "images_version": version_key(("images",)),
     }
     return render(request, "products/product_list.html", context)
 
 
+@cache_anonymous_page(lambda request, product_id: [
+    ("product", product_id), ("comments", product_id), ("product",), ("images",), ("recommendations",),
+])
 def product_detail(request, product_id):
     """Chi tiết sản phẩm + bình luận"""
-    product = get_object_or_404(Product, pk=product_id)
-    related = Product.objects.filter(brand=product.brand).exclude(pk=product.id)[:4]
-    
-    # Lấy bình luận đang hoạt động
-    comments = product.comments.filter(is_active=True)
+    product = get_cached_product(product_id)
+    if product is None:
+        raise Http404("Không tìm thấy sản phẩm")
+    # Các queryset dưới đây là lazy: nếu fragment trong template đã có
+    # trong cache thì chúng không bao giờ được thực thi.
+    related = recommendations.for_product(product.id)
+
+    # Bình luận đang hiển thị, phân trang cursor (?comments=...); chỉ truy vấn
+    # khi fragment chưa có trong cache
+    comments_cursor = request.GET.get("comments", "")
+    comments_page = SimpleLazyObject(lambda: comment_service.page(product.id, comments_cursor or None))
 
     context = {
         "product": product,
         "related_products": related,
-        "comments": comments,
+        "comments_page": comments_page,
+        "comments_cursor": comments_cursor,
+        "cache_timeout": cache_timeout(),
+        "comments_version": version_key(("comments", product.id)),
+        "catalog_version": version_key(("product",), ("recommendations",)),
+        "images_version": version_key(("images",)),
     }
     return render(request, "products/product_detail.html", context)
 
@@ -75,17 +135,24 @@ def add_comment(request, product_id):
     if request.method == "POST":
         content = request.POST.get("content", "").strip()
 
-        if not content:
+        if not ratelimit.allow("comment", request.user.pk, settings.COMMENT_RATE_LIMIT, settings.COMMENT_RATE_WINDOW):
+            messages.error(request, "Bạn bình luận quá nhanh, vui lòng thử lại sau ít phút.")
+        elif not content:
             messages.error(request, "Vui lòng nhập nội dung bình luận.")
         elif len(content) < 5:
             messages.error(request, "Bình luận phải có ít nhất 5 ký tự.")
         else:
-            Comment.objects.create(
+            comment = Comment.objects.create(
                 product=product,
                 user=request.user,
-                content=content
+                content=content,
+                is_active=not comment_service.requires_approval(),
             )
-            messages.success(request, "Bình luận của bạn đã được gửi thành công!")
+            tasks.notify_comment.enqueue(comment.pk)
+            if comment.is_active:
+                messages.success(request, "Bình luận của bạn đã được gửi thành công!")
+            else:
+                messages.success(request, "Bình luận của bạn đã được gửi và đang chờ duyệt.")
 
     return redirect("product_detail", product_id=product_id)
 
@@ -93,14 +160,16 @@ def add_comment(request, product_id):
 
 
 # ====================== GIỎ HÀNG ======================
-@login_required
+# Khách chưa đăng nhập: giỏ nằm trong session (products/cart.py), không ghi DB.
 def cart(request):
-    order, _ = Order.objects.get_or_create(user=request.user, complete=False)
-    items = order.order_items.all()
+    if not request.user.is_authenticated:
+        order = cart_service.guest_cart(request.session)
+        return render(request, "products/cart.html", {"order": order, "items": order.items})
+    order = cart_service.peek_open_order(request.user)
+    items = order.order_items.select_related("product") if order.pk else []
     return render(request, "products/cart.html", {"order": order, "items": items})
 
 
-@login_required
 def update_item(request):
     """AJAX: thêm / giảm số lượng trong giỏ hàng"""
     if request.method == "POST":
@@ -109,67 +178,158 @@ def update_item(request):
         action = data.get("action")
 
         product = get_object_or_404(Product, id=product_id)
-        order, _ = Order.objects.get_or_create(user=request.user, complete=False)
-        order_item, created = OrderItem.objects.get_or_create(order=order, product=product)
-
-        if action == "add":
-            order_item.quantity += 1
-        elif action == "remove":
-            order_item.quantity -= 1
-
-        if order_item.quantity <= 0:
-            order_item.delete()
+        if action not in ("add", "remove"):
+            return JsonResponse({"error": "Invalid action"}, status=400)
+
+        if not request.user.is_authenticated:
+            try:
+                if action == "add":
+                    cart_service.guest_add_item(request.session, product.pk)
+                else:
+                    cart_service.guest_remove_item(request.session, product.pk)
+            except ValueError as exc:
+                return JsonResponse({"error": str(exc)}, status=400)
+            order = cart_service.guest_cart(request.session)
+        elif action == "add":
+            order = cart_service.add_item(request.user, product)
         else:
-            order_item.save()
+            order = cart_service.remove_item(request.user, product)
 
-        return JsonResponse({"status": "success", "cart_total": order.get_cart_items})
+        return JsonResponse({
+            "status": "success",
+            "cart_total": order.total_items,
+            "cart_price": int(order.total_price),
+        })
 
     return JsonResponse({"error": "Invalid request"}, status=400)
 
 
-@login_required
 def add_to_cart(request, product_id):
     product = get_object_or_404(Product, id=product_id)
-    order, _ = Order.objects.get_or_create(user=request.user, complete=False)
-    order_item, created = OrderItem.objects.get_or_create(order=order, product=product)
-    if not created:
-        order_item.quantity += 1
-    order_item.save()
+    if request.user.is_authenticated:
+        cart_service.add_item(request.user, product)
+    else:
+        try:
+            cart_service.guest_add_item(request.session, product.pk)
+        except ValueError as exc:
+            messages.error(request, str(exc))
+            return redirect("cart")
     messages.success(request, f"Đã thêm {product.name} vào giỏ hàng!")
     return redirect("cart")
 
 
-@login_required
 def remove_from_cart(request, item_id):
-    item = get_object_or_404(OrderItem, id=item_id, order__user=request.user, order__complete=False)
-    item.delete()
+    # Với khách, item_id là id sản phẩm (xem cart_service.GuestItem)
+    if not request.user.is_authenticated:
+        cart_service.guest_set_quantity(request.session, item_id, 0)
+    else:
+        item = get_object_or_404(OrderItem, id=item_id, order__user=request.user, order__complete=False)
+        cart_service.delete_item(item)
     messages.info(request, "Đã xóa sản phẩm khỏi giỏ hàng.")
     return redirect("cart")
 
 
-@login_required
 def update_quantity(request, item_id):
-    item = get_object_or_404(OrderItem, id=item_id, order__user=request.user, order__complete=False)
+    if request.user.is_authenticated:
+        item = get_object_or_404(OrderItem, id=item_id, order__user=request.user, order__complete=False)
     if request.method == "POST":
         qty = request.POST.get("quantity", "1")
         try:
-            new_qty = int(qty)
-            if new_qty > 0:
-                item.quantity = new_qty
-                item.save()
+            if request.user.is_authenticated:
+                cart_service.set_quantity(item, int(qty))
             else:
-                item.delete()
+                cart_service.guest_set_quantity(request.session, item_id, int(qty))
         except ValueError:
             messages.error(request, "Số lượng không hợp lệ.")
     return redirect("cart")
 
 
-# ====================== BLOG ======================
-def blog_list(request):
-    blogs = Blog.objects.all().order_by('-created_at')
-    return render(request, 'blog/blog_list.html', {'blogs': blogs})
+# ====================== THANH TOÁN ======================
+# Trường bắt buộc của địa chỉ giao hàng (state không bắt buộc)
+SHIPPING_REQUIRED = {"address": "Địa chỉ", "city": "Thành phố", "zipcode": "Mã bưu chính"}
 
 
+@login_required
+def checkout(request):
+    """Giữ hàng khi vào trang thanh toán, chốt đơn khi gửi địa chỉ giao hàng."""
+    order = cart_service.get_open_order(request.user)
+    shipping, errors = {}, {}
+
+    if request.method == "POST":
+        shipping = {name: request.POST.get(name, "").strip() for name in ("address", "city", "state", "zipcode")}
+        errors = {name: f"{label} không được để trống." for name, label in SHIPPING_REQUIRED.items()
+                  if not shipping[name]}
+        if not errors:
+            try:
+                order = checkout_service.complete_checkout(order, **shipping)
+            except checkout_service.CheckoutError as exc:
+                messages.error(request, str(exc))
+                return redirect("cart")
+            messages.success(request, f"Đặt hàng thành công! Mã giao dịch: {order.transaction_id}")
+            return redirect("my_profile")
+
+    # GET, hoặc địa chỉ thiếu: (gia hạn) giữ hàng và hiện lại form, đơn vẫn mở
+    try:
+        expires_at = checkout_service.reserve_order(order)
+    except checkout_service.CheckoutError as exc:
+        messages.error(request, str(exc))
+        return redirect("cart")
+
+    items = order.order_items.select_related("product")
+    order.refresh_from_db(fields=["total_price", "total_items"])
+    return render(request, "shipping.html", {
+        "order": order, "items": items, "expires_at": expires_at, "shipping": shipping, "errors": errors,
+    }, status=400 if errors else 200)
+
+
+# ====================== LỊCH SỬ ĐƠN HÀNG & DOANH SỐ ======================
+@login_required
+def order_history(request):
+    """Đơn đã thanh toán của user (cursor, chỉ mục order_history_idx) + tổng từ CustomerSales."""
+    orders = Order.objects.filter(user=request.user, complete=True)
+    page_obj = CursorPaginator(orders, 10, ordering=("-completed_at", "-id")).page(request.GET.get("cursor"))
+    prefetch_related_objects(
+        page_obj.object_list, Prefetch("order_items", queryset=OrderItem.objects.select_related("product"))
+    )
+    return render(request, "products/order_history.html", {
+        "page_obj": page_obj,
+        "stats": CustomerSales.objects.filter(user=request.user).first(),
+    })
+
+
+@staff_member_required
+def sales_dashboard(request):
+    """Doanh số ``?days=`` ngày gần nhất, chỉ đọc các bảng rollup."""
+    try:
+        days = max(1, min(int(request.GET.get("days", 30)), 366))
+    except ValueError:
+        days = 30
+    end = timezone.localdate()
+    start = end - timedelta(days=days - 1)
+    return render(request, "products/sales_dashboard.html", {
+        **analytics.report(start, end),
+        "start": start,
+        "end": end,
+        "days_choice": days,
+    })
+
+
+# ====================== BLOG ======================
+def blog_list(request):
+    blogs = Blog.objects.all()
+    cursor_mode = use_cursor_pagination(request)
+    if cursor_mode:
+        page_obj = CursorPaginator(blogs, 10, ordering=('-created_at', 'id')).page(request.GET.get('cursor'))
+    else:
+        page_obj = Paginator(blogs.order_by('-created_at', 'id'), 10).get_page(request.GET.get('page'))
+    return render(request, 'blog/blog_list.html', {
+        'blogs': page_obj,
+        'page_obj': page_obj,
+        'cursor_mode': cursor_mode,
+    })
+
+
+@cache_anonymous_page(lambda request, pk: [("blog", pk), ("images",)])
 def blog_detail(request, pk):
     blog = get_object_or_404(Blog, pk=pk)
     return render(request, 'blog/blog_detail.html', {'blog': blog})
@@ -217,13 +377,15 @@ def blog_delete(request, pk):
 def my_profile(request):
     user = request.user
 
-    # Lấy tất cả bình luận của user hiện tại (đã active hoặc chưa đều hiển thị ở profile cá nhân)
-    user_comments = Comment.objects.filter(user=user, is_active=True).order_by('-created_at')
+    # Tất cả bình luận của user (cả bình luận đang chờ duyệt), tải một lần kèm sản phẩm
+    user_comments = list(Comment.objects.filter(user=user).select_related('product').order_by('-created_at'))
     user_feedbacks = Feedback.objects.filter(user=user).order_by('-created_at')
 
-    # Các thống kê khác (tùy chọn)
-    total_orders = Order.objects.filter(user=user, complete=True).count()
-    total_comments = user_comments.count()
+    # Số đơn đã thanh toán lấy từ bảng tổng hợp (products/analytics.py);
+    # checkout ghi dòng này ngay trong transaction, migration 0020 điền đơn cũ
+    stats = CustomerSales.objects.filter(user=user).first()
+    total_orders = stats.orders if stats else 0
+    total_comments = len(user_comments)
 
     context = {
         'profile_user': user,
@@ -269,11 +431,12 @@ def submit_feedback(request):
         if not subject or not message:
             messages.error(request, "Vui lòng điền đầy đủ thông tin phản hồi.")
         else:
-            Feedback.objects.create(
+            feedback = Feedback.objects.create(
                 user=request.user,
                 subject=subject,
                 message=message
             )
+            tasks.notify_feedback.enqueue(feedback.pk)
             messages.success(request, "Cảm ơn bạn đã gửi phản hồi!")
 
         return redirect('my_profile')
@@ -0,0 +1,29 @@
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.contrib.auth.models import User
+
+from .models import Profile
+
+# Thay UserAdmin mặc định bằng bản có Profile
+admin.site.unregister(User)
+
+
+class ProfileInline(admin.StackedInline):
+    model = Profile
+    can_delete = False
+    fields = ('display_name', 'age', 'avatar')
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    inlines = (ProfileInline,)
+    list_display = ('username', 'email', 'display_name', 'is_staff', 'is_active', 'date_joined')
+    # Profile đọc cùng User trong một JOIN, không truy vấn riêng cho từng dòng
+    list_select_related = ('profile',)
+    show_full_result_count = False
+
+    @admin.display(description='Tên hiển thị', ordering='profile__display_name')
+    def display_name(self, obj):
+        profile = getattr(obj, 'profile', None)
+        return profile.display_name if profile else ''
+
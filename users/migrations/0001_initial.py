@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+# Bảng users_user có thể đã được tạo bằng `migrate --run-syncdb` khi app
+# chưa có migration -> chạy `manage.py migrate users --fake-initial` lần đầu.
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(blank=True, default='Anonymous', max_length=100)),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('age', models.IntegerField(blank=True, default=18, null=True)),
+                ('avatar', models.ImageField(blank=True, default='avatars/default.png', null=True, upload_to='avatars/')),
+            ],
+        ),
+    ]
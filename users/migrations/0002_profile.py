@@ -0,0 +1,26 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:25
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Profile',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('display_name', models.CharField(blank=True, max_length=100, verbose_name='Tên hiển thị')),
+                ('age', models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Tuổi')),
+                ('avatar', models.ImageField(blank=True, upload_to='avatars/')),
+                ('legacy_id', models.PositiveBigIntegerField(blank=True, null=True, unique=True)),
+            ],
+        ),
+    ]
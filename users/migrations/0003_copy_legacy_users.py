@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import migrations
+from django.db.models.functions import Lower
+
+BATCH = 1000
+
+
+def copy_legacy_users(apps, schema_editor):
+    """users.User -> Profile của auth.User có cùng email (không phân biệt hoa thường).
+
+    Email chưa có tài khoản -> tạo auth.User (username = email, mật khẩu không
+    dùng được). Chạy lại an toàn: bản ghi đã chuyển (``legacy_id``) được bỏ qua.
+    """
+    LegacyUser = apps.get_model('users', 'User')
+    AuthUser = apps.get_model('auth', 'User')
+    Profile = apps.get_model('users', 'Profile')
+
+    done = Profile.objects.exclude(legacy_id=None).values('legacy_id')
+    legacy = LegacyUser.objects.exclude(pk__in=done).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(legacy.filter(pk__gt=last_pk)[:BATCH])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+
+        emails = {row.email.lower() for row in batch}
+
+        def accounts_by_email():
+            return dict(
+                AuthUser.objects.annotate(email_lower=Lower('email'))
+                .filter(email_lower__in=emails).order_by('-pk').values_list('email_lower', 'pk')
+            )
+
+        accounts = accounts_by_email()
+        taken = set(AuthUser.objects.filter(username__in=[row.email for row in batch]).values_list('username', flat=True))
+        new_accounts = {}
+        for row in batch:
+            key = row.email.lower()
+            if key not in accounts and key not in new_accounts:
+                username = row.email if row.email not in taken else f"{row.email[:140]}-{row.pk}"
+                taken.add(username)
+                new_accounts[key] = AuthUser(username=username, email=row.email, password=make_password(None))
+        if new_accounts:
+            AuthUser.objects.bulk_create(new_accounts.values())
+            accounts = accounts_by_email()
+
+        seen = set(Profile.objects.filter(user__in=accounts.values()).values_list('user_id', flat=True))
+        profiles = []
+        for row in batch:
+            user_id = accounts[row.email.lower()]
+            if user_id in seen:
+                continue
+            seen.add(user_id)
+            avatar = row.avatar.name or ''
+            profiles.append(Profile(
+                user_id=user_id,
+                display_name='' if row.name == 'Anonymous' else row.name,
+                age=row.age if row.age and row.age > 0 else None,
+                avatar='' if avatar == 'avatars/default.png' else avatar,
+                legacy_id=row.pk,
+            ))
+        Profile.objects.bulk_create(profiles)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_profile'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_legacy_users, migrations.RunPython.noop),
+    ]
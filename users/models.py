@@ -1,6 +1,13 @@
+from django.conf import settings
 from django.db import models
 
+
 class User(models.Model):
+    """Bảng người dùng cũ, tách rời ``auth.User``.
+
+    Dữ liệu đã được chuyển sang ``Profile`` (migration 0003); chỉ còn giữ
+    để đọc lại khi cần, code mới dùng ``auth.User`` + ``user.profile``.
+    """
     name = models.CharField(max_length=100, default='Anonymous', blank=True)
     email = models.EmailField(unique=True)
     age = models.IntegerField(default=18, blank=True, null=True)
@@ -8,3 +15,21 @@ class User(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class Profile(models.Model):
+    """Thông tin thêm của ``auth.User`` (1-1, khóa chính chính là user_id).
+
+    Đọc cùng user trong một truy vấn: ``User.objects.select_related('profile')``.
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='profile'
+    )
+    display_name = models.CharField("Tên hiển thị", max_length=100, blank=True)
+    age = models.PositiveSmallIntegerField("Tuổi", blank=True, null=True)
+    avatar = models.ImageField(upload_to='avatars/', blank=True)
+    # id trong bảng users_user cũ (nếu được chuyển từ đó)
+    legacy_id = models.PositiveBigIntegerField(blank=True, null=True, unique=True)
+
+    def __str__(self):
+        return self.display_name or str(self.user)
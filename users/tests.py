@@ -0,0 +1,84 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from products.models import Order
+
+from .models import Profile
+
+
+class UserDirectoryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user("staff", password="pw", is_staff=True)
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def add_users(self, n, prefix="member"):
+        start = User.objects.count()
+        users = User.objects.bulk_create([User(username=f"{prefix}{start + i:03d}") for i in range(n)])
+        Profile.objects.bulk_create([Profile(user=u, display_name=f"Tên {u.username}") for u in users])
+
+    def list_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("user_list"), params)
+        return response, [q["sql"] for q in queries if "auth_user" in q["sql"] and "django_session" not in q["sql"]]
+
+    def test_list_is_one_projected_query_and_paginates(self):
+        self.add_users(3)
+        few = len(self.list_queries()[1])
+        self.add_users(60)
+        response, sql = self.list_queries()
+        self.assertEqual(len(sql), few)
+        listing = [s for s in sql if "users_profile" in s][0]
+        self.assertNotIn('"password"', listing)
+        page = response.context["page_obj"]
+        self.assertEqual(len(page.object_list), 50)
+        self.assertTrue(page.object_list[0].profile.display_name.startswith("Tên"))
+        self.assertEqual(len(self.client.get(reverse("user_list"), {"cursor": page.next_cursor}).context["page_obj"].object_list), 14)
+
+    def test_search_by_prefix(self):
+        self.add_users(3)
+        self.add_users(2, prefix="khach")
+        response, _ = self.list_queries(q="KHACH")
+        self.assertEqual([u.username for u in response.context["page_obj"]], ["khach004", "khach005"])
+
+    def test_invalid_age_is_a_field_error(self):
+        member = User.objects.create_user("member")
+        Profile.objects.create(user=member, age=30)
+        for age in ("abc", "-1", "40000"):
+            with self.subTest(age=age):
+                response = self.client.post(reverse("user_create"), {"username": f"new{age}", "age": age})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("age", response.context["errors"])
+                self.assertNotIn("Username", str(list(response.context["messages"])))
+                self.assertFalse(User.objects.filter(username=f"new{age}").exists())
+                response = self.client.post(reverse("user_update", args=[member.pk]), {"email": "x@y.vn", "age": age})
+                self.assertEqual(response.status_code, 400)
+        member.refresh_from_db()
+        self.assertEqual((member.email, member.profile.age), ("", 30))
+        self.client.post(reverse("user_update", args=[member.pk]), {"age": " 31 "})
+        self.assertEqual(Profile.objects.get(user=member).age, 31)
+
+    def test_delete_deactivates_instead_of_cascading(self):
+        member = User.objects.create_user("leaving")
+        Order.objects.create(user=member, complete=True)
+        self.client.post(reverse("user_delete", args=[member.pk]))
+        member.refresh_from_db()
+        self.assertFalse(member.is_active)
+        self.assertTrue(Order.objects.filter(user=member).exists())
+
+    def test_forms_render_fields(self):
+        member = User.objects.create_user("member", email="m@x.vn")
+        Profile.objects.create(user=member, display_name="Thành viên", age=30)
+        response = self.client.get(reverse("user_update", args=[member.pk]))
+        for field in ('name="email"', 'value="m@x.vn"', 'value="Thành viên"', 'value="30"', 'name="avatar"'):
+            self.assertContains(response, field)
+        self.assertNotContains(response, 'name="username"')
+        response = self.client.get(reverse("user_create"))
+        self.assertContains(response, 'name="username"')
+        self.assertNotContains(response, 'value="m@x.vn"')
+        self.assertContains(self.client.get(reverse("user_delete", args=[member.pk])), "member")
@@ -1,40 +1,114 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from .models import User
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.shortcuts import render, redirect, get_object_or_404
+
+from products.pagination import CursorPaginator
+from .models import Profile
+
+PER_PAGE = 50
+MAX_AGE = 32767  # PositiveSmallIntegerField (SQLite không tự chặn)
+# Cột cần cho trang danh sách (không tải password, last_login...)
+LIST_COLUMNS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'date_joined',
+    'profile__display_name', 'profile__avatar',
+)
+
+
+def _accounts():
+    # User + Profile trong một truy vấn (LEFT JOIN), thay cho hai lần tra cứu mỗi người
+    return User.objects.select_related('profile')
+
 
 @login_required
 def user_list(request):
-    users = User.objects.all()
-    return render(request, 'users/user_list.html', {'users': users})
+    """Danh sách user: tìm theo tiền tố username / email / tên hiển thị, phân trang cursor."""
+    users = _accounts().only(*LIST_COLUMNS)
+    q = request.GET.get('q', '').strip()
+    if q:
+        users = users.filter(
+            Q(username__istartswith=q) | Q(email__istartswith=q) | Q(profile__display_name__istartswith=q)
+        )
+    page_obj = CursorPaginator(users, PER_PAGE, ordering=('username', 'id')).page(request.GET.get('cursor'))
+    return render(request, 'users/user_list.html', {'page_obj': page_obj, 'q': q})
 
-@login_required
+
+def _clean_age(request):
+    """Tuổi trong form: bỏ trống -> None, còn lại phải là số nguyên 0..MAX_AGE."""
+    value = request.POST.get('age', '').strip()
+    if not value:
+        return None
+    try:
+        age = int(value)
+    except ValueError:
+        raise ValidationError("Tuổi phải là số nguyên.")
+    if not 0 <= age <= MAX_AGE:
+        raise ValidationError(f"Tuổi phải trong khoảng 0 - {MAX_AGE}.")
+    return age
+
+
+def _form_error(request, context, field, error):
+    # Lỗi của một field: báo qua messages và trả lại form với mã 400
+    messages.error(request, ' '.join(error.messages))
+    return render(request, 'users/user_form.html', {**context, 'errors': {field: error.messages}}, status=400)
+
+
+def _save_profile(request, user, age):
+    profile = getattr(user, 'profile', None) or Profile(user=user)
+    profile.display_name = request.POST.get('name', profile.display_name).strip()
+    profile.age = age
+    if 'avatar' in request.FILES:
+        profile.avatar = request.FILES['avatar']
+    profile.save()
+
+
+@staff_member_required
 def user_create(request):
     if request.method == 'POST':
-        name = request.POST.get('name', 'Anonymous')
-        email = request.POST.get('email')
-        age = request.POST.get('age', 18)
-        avatar = request.FILES.get('avatar')
-        User.objects.create(name=name or 'Anonymous', email=email, age=age or 18, avatar=avatar)
+        email = request.POST.get('email', '').strip()
+        username = request.POST.get('username', '').strip() or email
+        try:
+            age = _clean_age(request)
+        except ValidationError as error:
+            return _form_error(request, {'action': 'create'}, 'age', error)
+        try:
+            with transaction.atomic():
+                # Mật khẩu không dùng được: người dùng tự đặt lại sau
+                user = User.objects.create_user(username=username, email=email)
+                _save_profile(request, user, age)
+        except (IntegrityError, ValueError):
+            messages.error(request, "Username đã tồn tại hoặc không hợp lệ.")
+            return render(request, 'users/user_form.html', {'action': 'create'})
         return redirect('user_list')
     return render(request, 'users/user_form.html', {'action': 'create'})
 
-@login_required
+
+@staff_member_required
 def user_update(request, pk):
-    user = get_object_or_404(User, pk=pk)
+    user = get_object_or_404(_accounts(), pk=pk)
     if request.method == 'POST':
-        user.name = request.POST.get('name', user.name)
-        user.email = request.POST.get('email', user.email)
-        user.age = request.POST.get('age', user.age)
-        if 'avatar' in request.FILES:
-            user.avatar = request.FILES['avatar']
-        user.save()
+        try:
+            age = _clean_age(request)
+        except ValidationError as error:
+            return _form_error(request, {'action': 'update', 'user': user}, 'age', error)
+        with transaction.atomic():
+            user.email = request.POST.get('email', user.email)
+            user.save(update_fields=['email'])
+            _save_profile(request, user, age)
         return redirect('user_list')
     return render(request, 'users/user_form.html', {'action': 'update', 'user': user})
 
-@login_required
+
+@staff_member_required
 def user_delete(request, pk):
     user = get_object_or_404(User, pk=pk)
     if request.method == 'POST':
-        user.delete()
+        # Khóa tài khoản thay vì xóa: đơn hàng / bình luận vẫn trỏ tới user
+        user.is_active = False
+        user.save(update_fields=['is_active'])
         return redirect('user_list')
     return render(request, 'users/user_confirm_delete.html', {'user': user})